@@ -1,17 +1,51 @@
+import time
+_import_start = time.perf_counter()
+
+import argparse
+import os
 import pygame
 import sys
 import settings
-from settings import WIDTH, HEIGHT, FPS, BLOCK_SIZE, HEALTH_REGEN_RATE, STAMINA_REGEN_RATE, MANA_REGEN_RATE
-from player import Player, Block, Object, handle_move, handle_ledge_grab
-from gui import draw, get_background, UI, spawn_monsters_on_surfaces
+from settings import WIDTH, HEIGHT, FPS, BLOCK_SIZE
+from player import Player, Block, Object, get_block_image, TERRAIN_PATH
+from gui import draw_world_layer, scale_to_window, present_world, get_background, window_to_render, UI
 from monster import *
-from world_gen import WorldGenerator
-
-points = 0
-
-pygame.init()
-pygame.display.set_caption("my-style Platformer")
-window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+from game import Game
+from controls import KeyboardInput, respawn
+from perf import StartupReport, FrameStats, PhaseTimer, count_surfaces
+from renderer import RenderThread, draw_snapshot
+from overlay import PerfOverlay, HISTORY
+from metrics import recorder_from
+from tracing import tracer
+from hitches import HitchDetector
+from replay import InputRecorder
+from framedump import FrameRecorder, FORMATS as FRAME_FORMATS
+import rng
+from profiling import ProfileCapture, SamplingProfiler, DEFAULT_FRAMES, DEFAULT_INTERVAL_MS
+from assets import assets
+from atlas import ensure_atlas
+
+IMPORT_TIME = time.perf_counter() - _import_start
+
+window = None
+
+def init_display():
+    """Initialise pygame and open the game window."""
+    global window
+    pygame.init()
+    pygame.display.set_caption("my-style Platformer")
+    window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+    return window
+
+def make_world_surface(window):
+    """
+    Offscreen surface the world is rendered into at RENDER_WIDTH x RENDER_HEIGHT,
+    or None when that already matches the window and it can be drawn directly.
+    """
+    size = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+    if window.get_size() == size:
+        return None
+    return pygame.Surface(size).convert()
 
 def validate_classes():
     required = {
@@ -27,47 +61,22 @@ def validate_classes():
     if missing:
         raise ImportError(f"Required class(es) not found: {', '.join(missing)}")
 
-def reset_game():
-    """Reset game state for respawn."""
-    objects = []
-    monsters = []
-    
-    # Starting platform only (no ground)
-    starting_platform_y = settings.HEIGHT - BLOCK_SIZE * 4
-    
-    # Create small starting platform
-    for i in range(5):
-        objects.append(Block(i * BLOCK_SIZE, starting_platform_y, BLOCK_SIZE))
-    
-    player = Player(100, starting_platform_y - 60, 50, 50)
-    player.x_vel = 0
-    player.y_vel = 0
-    
-    ui = UI(player, objects)
-    
-    world_gen = WorldGenerator(BLOCK_SIZE)
-    
-    # Generate large initial world with all platforms
-    print("Generating world platforms...")
-    initial_blocks = world_gen.generate_region(-WIDTH * 2, WIDTH * 20, starting_platform_y)
-    objects.extend(initial_blocks)
-    print(f"Generated {len(initial_blocks)} platform blocks")
-    
-    # Spawn initial monsters on all available blocks
-    available_blocks = [o for o in objects if isinstance(o, Block)]
-    if available_blocks:
-        initial_monster_count = min(15, len(available_blocks) // 10)
-        initial_monsters = spawn_monsters_on_surfaces(
-            available_blocks, 
-            num_monsters=initial_monster_count, 
-            monster_size=(40, 40)
-        )
-        monsters_list = initial_monsters
-        print(f"Spawned {len(initial_monsters)} initial monsters")
-    else:
-        monsters_list = []
-    
-    return player, objects, monsters_list, ui, world_gen, starting_platform_y
+def startup_asset_paths():
+    """Images needed before the first frame."""
+    sprite_atlas, _ = ensure_atlas(os.path.join("Assets", "MainCharacter", ""), 32, 32, True)
+    return [sprite_atlas, TERRAIN_PATH, os.path.join("Assets", "Background", "Blue.png")]
+
+def draw_loading_screen(window, loaded, total):
+    """Draw a simple progress bar while assets decode in the background."""
+    window.fill((0, 0, 0))
+    bar = pygame.Rect(0, 0, settings.WIDTH // 2, 24)
+    bar.center = (settings.WIDTH // 2, settings.HEIGHT // 2)
+    pygame.draw.rect(window, (200, 200, 200), bar, 2)
+    if total:
+        fill = bar.inflate(-6, -6)
+        fill.width = int(fill.width * loaded / total)
+        pygame.draw.rect(window, (100, 200, 100), fill)
+    pygame.display.update()
 
 def draw_death_screen(window):
     """Draw death screen with respawn button."""
@@ -91,46 +100,97 @@ def draw_death_screen(window):
     # Add a border to make it more clickable-looking
     pygame.draw.rect(window, (200, 200, 200), button_rect, 2)
     window.blit(button_text, button_text.get_rect(center=button_rect.center))
+    count_surfaces(3)
     
     return button_rect
 
-def main():
-    global window, points
+def draw_world(game, renderer, world_surface, bg_image, timer=None):
+    """
+    Draw the world and HUD for this tick; returns how many objects were culled.
+    With a RenderThread the world is snapshotted and drawn in the background,
+    and the newest finished frame (usually the previous tick's) is presented.
+    """
+    if renderer is None:
+        target = window if world_surface is None else world_surface
+        culled = draw_world_layer(target, bg_image, game.player, game.objects, game.camera_x,
+                                  game.monsters, game.camera_y)
+        scale_to_window(window, target)
+    else:
+        snapshot = game.snapshot(bg_image)
+        renderer.submit(snapshot)
+        culled = snapshot.culled
+        scale_to_window(window, renderer.acquire_frame(wait=True))
+    if timer:
+        timer.lap("world")
+    game.ui.draw(window, game.camera_x)
+    if timer:
+        timer.lap("hud")
+    return culled
+
+def capture_world_frame(game, bg_image):
+    """Render the current world once into a new surface, used as the backdrop while paused."""
+    frame = pygame.Surface((settings.RENDER_WIDTH, settings.RENDER_HEIGHT)).convert()
+    draw_snapshot(frame, game.snapshot(bg_image))
+    return frame
+
+def main(startup_report=False, threaded_render=None, frame_stats=False, metrics=None, metrics_max_mb=None,
+         profile_frames=DEFAULT_FRAMES, sample_profile=None, sample_interval_ms=DEFAULT_INTERVAL_MS,
+         hitch_log=None, record=None, record_frames=None, record_frames_size=None, record_frames_format="raw"):
+    global window
+    report = StartupReport(_import_start)
+    report.add("imports", IMPORT_TIME)
     validate_classes()
 
+    with report.phase("display init"):
+        init_display()
+
     clock = pygame.time.Clock()
-    background, bg_image = get_background("Blue.png")
+    with report.phase("asset load"):
+        assets.preload(startup_asset_paths())
+        while not assets.done():
+            draw_loading_screen(window, *assets.progress())
+            pygame.event.pump()
+            pygame.time.wait(5)
+        assets.poll()
+        background, bg_image = get_background("Blue.png")
+        Player.ensure_sprites_loaded()
+        get_block_image(BLOCK_SIZE)
     initial_w, initial_h = settings.WIDTH, settings.HEIGHT
-
-    # Game state
-    player, objects, monsters, ui, world_gen, starting_y = reset_game()
-    
-    # Monster spawning
-    MONSTER_SPAWN_INTERVAL = 5.0
-    MAX_MONSTERS = 20
-    monster_spawn_timer = 0.0
-    
-    # Boss timer (3 minutes)
-    #BOSS_TIMER = 180.0
-   # boss_countdown = BOSS_TIMER
-    #boss_spawned = False
-   # arena_bounds = None
-    
-    # Camera
-    camera_x = 0
-    camera_y = 0
-    
-    # Death system - far below starting position
-    DEATH_LINE_Y = starting_y + BLOCK_SIZE * 15
-    is_dead = False
+    world_surface = make_world_surface(window)
+    if threaded_render is None:
+        threaded_render = settings.THREADED_RENDER
+    renderer = RenderThread((settings.RENDER_WIDTH, settings.RENDER_HEIGHT)) if threaded_render else None
+    stats = FrameStats() if frame_stats else None  # unbounded, so only kept when asked for
+    controls = KeyboardInput()
+    overlay = PerfOverlay()
+    profiler = ProfileCapture(profile_frames)
+    sampler = SamplingProfiler(sample_profile, sample_interval_ms).start() if sample_profile else None
+    # Per-frame metrics recording (--metrics or $GAME_METRICS), tracing
+    # (--trace or $GAME_TRACE) and the hitch log keep a phase timer running
+    # for the whole session; the overlay shares it when shown. Hitches are
+    # detected whenever a timer is running.
+    recorder = recorder_from(metrics, metrics_max_mb)
+    hitches = HitchDetector(path=hitch_log)
+    session_timer = PhaseTimer(keep=HISTORY) if recorder or tracer.enabled or hitch_log else None
+
+    # --record: every tick's input goes to an InputRecorder for replay.py
+    input_log = InputRecorder(record) if record else None
+    # --record-frames: every drawn frame goes to a FrameRecorder's writer thread
+    frame_log = FrameRecorder(record_frames, record_frames_size, record_frames_format) if record_frames else None
+
+    # Game state; streaming starts once the first frame is on screen
+    game = Game(report)
+    game.timer = session_timer
     respawn_button = None
     
-    # Generation tracking
-    last_gen_right = settings.WIDTH * 2
-    GENERATE_AHEAD = settings.WIDTH * 2
-    
     run = True
     fixed_dt = 1.0 / settings.FPS
+
+    # Pause: menus open or window unfocused. Simulation freezes, the loop drops
+    # to PAUSED_FPS and only the menu is redrawn, over a cached world frame.
+    focused = True
+    paused = False
+    paused_frame = None
     
     # Pre-render timer font and surface to prevent flickering
     timer_font = pygame.font.Font(None, 48)
@@ -138,268 +198,247 @@ def main():
     timer_text_surface = None
 
     while run:
-        clock.tick(settings.FPS)
+        clock.tick(settings.PAUSED_FPS if paused else settings.FPS)
+        frame_start = time.perf_counter()
+        if game.timer:
+            game.timer.start_frame()
+            hitches.start_frame(game)
+        if overlay.enabled:
+            overlay.start_frame()
         dt = fixed_dt
 
-        for event in pygame.event.get():
+        frame = controls.poll()
+        handled = []  # events given to the Game this tick, for the input recording
+        for event in frame.events:
             if event.type == pygame.QUIT:
                 run = False
                 break
-                
+
+            if event.type == pygame.WINDOWFOCUSLOST:
+                focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                focused = True
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                game.timer = overlay.toggle(session_timer) or session_timer
+                continue
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                if profiler.trigger():
+                    print(f"profiling the next {profiler.frames} frames...")
+                    hitches.note("profile capture started")
+                continue
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F5 and sampler:
+                print(f"{sampler.samples} stack samples written to", sampler.write())
+                hitches.note("stack samples written")
+                continue
+
             if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                # Player attack - instantly kill monsters on left click
-                if not is_dead and not ui.inventory_open and not ui.options_open:
-                    mouse_pos = pygame.mouse.get_pos()
-                    # Check if any monster was clicked
-                    monsters_to_remove = []
-                    for m in monsters:
-                        if m.rect.collidepoint(mouse_pos):
-                            monsters_to_remove.append(m)
-                    points= points + 10
-                    # Remove killed monsters
-                    for m in monsters_to_remove:
-                        monsters.remove(m)
-                
-                if is_dead and respawn_button and respawn_button.collidepoint(event.pos):
-                    player, objects, monsters, ui, world_gen, starting_y = reset_game()
-                    is_dead = False
+                if game.is_dead and respawn_button and respawn_button.collidepoint(event.pos):
+                    # respawning goes through the Game as an event so recordings replay it
+                    event = respawn()
+                    hitches.note("respawn")
                     #boss_spawned = False
                     #boss_countdown = BOSS_TIMER
                     #arena_bounds = None
-                    monster_spawn_timer = 0.0
-                    DEATH_LINE_Y = starting_y + BLOCK_SIZE * 15
-                    points = 0
-                    continue
-                    
-                if ui.inventory_open:
-                    mx, my = event.pos
-                    for tab_name, rect in ui.tab_rects.items():
-                        if rect.collidepoint(mx, my):
-                            ui.inventory_tab = tab_name
-                            break
-                elif ui.options_open:
+
+                elif game.ui.options_open and not game.ui.inventory_open:
                     mx, my = event.pos
-                    action = ui.handle_options_click(mx, my)
+                    action = game.ui.handle_options_click(mx, my)
                     if action:
                         if "set_resolution" in action:
                             new_w, new_h = action["set_resolution"]
                             settings.WIDTH, settings.HEIGHT = new_w, new_h
-                            flags = pygame.FULLSCREEN | pygame.SCALED if ui.fullscreen else 0
+                            flags = pygame.FULLSCREEN | pygame.SCALED if game.ui.fullscreen else 0
                             window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT), flags)
+                            world_surface = make_world_surface(window)
                             background, bg_image = get_background("Blue.png")
+                            hitches.note(f"resolution change to {new_w}x{new_h}")
                         if "toggle_fullscreen" in action:
-                            ui.fullscreen = action["toggle_fullscreen"]
-                            if ui.fullscreen:
+                            game.ui.fullscreen = action["toggle_fullscreen"]
+                            if game.ui.fullscreen:
                                 info = pygame.display.Info()
                                 settings.WIDTH, settings.HEIGHT = info.current_w, info.current_h
                                 window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT), pygame.FULLSCREEN | pygame.SCALED)
                             else:
                                 settings.WIDTH, settings.HEIGHT = initial_w, initial_h
                                 window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+                            world_surface = make_world_surface(window)
                             background, bg_image = get_background("Blue.png")
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_i:
-                    ui.toggle_inventory()
-                elif event.key == pygame.K_o:
-                    ui.toggle_options()
-                elif event.key == pygame.K_TAB and ui.inventory_open:
-                    ui.cycle_tab()
-                elif event.key == pygame.K_SPACE and player.jump_count < 2 and not player.holding:
-                    player.jump()
-                elif event.key == pygame.K_q:
-                    player.dash()
-                elif event.key == pygame.K_e:
-                    player.stomp()
-
-        if not is_dead:
-            # Regeneration
-            ui.health = min(ui.max_health, ui.health + HEALTH_REGEN_RATE * dt)
-            ui.stamina = min(ui.max_stamina, ui.stamina + STAMINA_REGEN_RATE * dt)
-            ui.mana = min(ui.max_mana, ui.mana + MANA_REGEN_RATE * dt)
-
-            # Update player physics
-            player.loop(settings.FPS, dt)
-
-            # Handle stomp collisions after physics update
-            if player.stomping:
-                collided_blocks = []
-                for obj in objects[:]:
-                    if pygame.sprite.collide_mask(player, obj) and isinstance(obj, Block):
-                        collided_blocks.append(obj)
-                for obj in collided_blocks:
-                    objects.remove(obj)
-
-                monsters_to_remove = []
-                for m in monsters[:]:
-                    if pygame.sprite.collide_mask(player, m):
-                        monsters_to_remove.append(m)
-                for m in monsters_to_remove:
-                    monsters.remove(m)
-                if monsters_to_remove:
-                    points += 10
-                    ui.points += 10
-
-                if collided_blocks or monsters_to_remove:
-                    player.stomping = False
-                    player.y_vel = -player.GRAVITY * 12  # Even higher bounce jump
-                    player.stomp_timer = 0.0
-                    player.stomp_cooldown_timer = 0.0
-            
-            #Wenn der Spieler dasht,d dann werden Monster dabei getötet
-            if player.dashing:
-                monsters_to_remove = []
-                for m in monsters[:]:
-                    if pygame.sprite.collide_mask(player, m):
-                        monsters_to_remove.append(m)
-                for m in monsters_to_remove:
-                    monsters.remove(m)
-                if monsters_to_remove:
-                    points += 10
-                    ui.points += 10
-
-            handle_move(player, objects)
-            handle_ledge_grab(player, objects, dt, BLOCK_SIZE)
-
-            # Camera follows player both horizontally and vertically
-            player_x = player.rect.centerx
-            player_y = player.rect.centery
-            
-            target_camera_x = int(player_x - settings.WIDTH // 2)
-            target_camera_y = int(player_y - settings.HEIGHT // 2)
-            
-            # Smooth camera following
-            camera_x += (target_camera_x - camera_x) * 0.15
-            camera_y += (target_camera_y - camera_y) * 0.15
-
-            # Generate new sections ahead of player if needed
-            if player_x + GENERATE_AHEAD > last_gen_right:
-                new_blocks = world_gen.generate_region(
-                    last_gen_right,
-                    last_gen_right + settings.WIDTH * 5,
-                    starting_y
-                )
-                objects.extend(new_blocks)
-                last_gen_right += settings.WIDTH * 5
-                
-                # Spawn monsters on new blocks
-                if new_blocks and len(monsters) < MAX_MONSTERS:
-                    new_monsters = spawn_monsters_on_surfaces(new_blocks, num_monsters=5, monster_size=(40, 40))
-                    monsters.extend(new_monsters)
-
-            # Cleanup far objects
-            cleanup_x = player_x - settings.WIDTH * 3
-            for obj in objects[:]:
-                if isinstance(obj, Block) and obj.rect.x < cleanup_x:
-                    if obj in objects:
-                        objects.remove(obj)
-
-            # Monster spawning on platforms
-            monster_spawn_timer += dt
-            if monster_spawn_timer >= MONSTER_SPAWN_INTERVAL:
-                monster_spawn_timer = 0.0
-                if len(monsters) < MAX_MONSTERS:
-                    # Find blocks near player for spawning
-                    blocks_near = [o for o in objects if isinstance(o, Block) 
-                                 and abs(o.rect.centerx - player_x) < settings.WIDTH * 3]
-                    
-                    if blocks_near:
-                        # Filter out blocks that already have monsters
-                        def block_has_monster(b):
-                            for m in monsters:
-                                if (m.rect.bottom == b.rect.top and 
-                                    abs(m.rect.centerx - b.rect.centerx) <= b.rect.width // 2):
-                                    return True
-                            return False
-                        
-                        available_blocks = [b for b in blocks_near if not block_has_monster(b)]
-                        if available_blocks:
-                            to_spawn = min(5, MAX_MONSTERS - len(monsters))
-                            new_monsters = spawn_monsters_on_surfaces(
-                                available_blocks, 
-                                num_monsters=to_spawn,
-                                monster_size=(40, 40)
-                            )
-                            monsters.extend(new_monsters)
-
-            # Update monsters
-            for m in monsters[:]:
-                m.update(dt, objects, player)
-                
-                # Check if monster fell off world
-                if m.rect.y > DEATH_LINE_Y:
-                    monsters.remove(m)
+                            hitches.note("fullscreen " + ("on" if game.ui.fullscreen else "off"))
                     continue
-                
-                # Apply damage when monster touches player
-                if m.rect.colliderect(player.rect):
-                    damage_dealt = m.DAMAGE * dt
-                    ui.health = max(0.0, ui.health - damage_dealt)
-                    # Trigger damage flash
-                    ui.damage_flash = min(1.0, ui.damage_flash + 0.3)
-
-            # Boss countdown
-            #if not boss_spawned:
-                #boss_countdown -= dt
-                #if boss_countdown <= 0:
-                    # Create arena at current position
-                    #arena_width = int(settings.WIDTH * 2)
-                    #left_bound = player_x - arena_width // 4
-                    #right_bound = left_bound + arena_width
-
-                    # Clear existing monsters
-                    #monsters.clear()
-
-                    # Create arena walls
-                    #left_wall = Object(left_bound - 48, -settings.HEIGHT * 2, 
-                                     #48, settings.HEIGHT * 6, name="ArenaWall")
-                    #right_wall = Object(right_bound, -settings.HEIGHT * 2, 
-                                      #48, settings.HEIGHT * 6, name="ArenaWall")
-                    
-                    #for wall in (left_wall, right_wall):
-                        #wall.image.fill((255, 0, 0))
-                        #wall.mask = pygame.mask.from_surface(wall.image)
-                        #objects.append(wall)
-
-                    # Spawn boss in center of arena
-                    #boss = Boss(left_bound + arena_width // 2, starting_y - 100)
-                    #monsters.append(boss)
-                    #boss_spawned = True
-                    #arena_bounds = (left_bound, right_bound)
-
-            # Check for death
-            if player.rect.bottom > DEATH_LINE_Y or ui.health <= 0:
-                is_dead = True
-
-            # Update minimap with monsters
-            ui.update_minimap(player, objects, int(camera_x), int(camera_y), monsters)
-
-            # Draw world
-            draw(window, background, bg_image, player, objects, camera_x, ui,
-                 monsters=monsters, camera_y=camera_y)
-
-            # Draw boss countdown without flickering
- #           if not boss_spawned:
-  #              timer_str = f"Boss: {int(boss_countdown) // 60:02d}:{int(boss_countdown) % 60:02d}"
-   #             # Only re-render if text changed
-    #            if timer_str != last_timer_text:
-     #               timer_text_surface = timer_font.render(timer_str, True, (255, 0, 0))
-      #              last_timer_text = timer_str
-       #         
-        #        if timer_text_surface:
-         #           window.blit(timer_text_surface, 
-          #                    (settings.WIDTH // 2 - timer_text_surface.get_width() // 2, 20))
 
-        else:
+                elif not game.ui.inventory_open:
+                    # an attack: the Game hit-tests it against the world, drawn at the render size
+                    event = pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=event.button,
+                                               pos=window_to_render(window, event.pos))
+
+            handled.append(event)
+            game.handle_event(event)
+        timer = game.timer
+        if timer:
+            timer.lap("events")
+
+        paused = game.paused or not focused
+        if paused:
+            # Redraw only when input arrives; the world frame is rendered once on entry
+            if paused_frame is None or frame.events:
+                if paused_frame is None:
+                    paused_frame = capture_world_frame(game, bg_image)
+                present_world(window, paused_frame, game.ui, game.camera_x)
+                if game.is_dead:
+                    respawn_button = draw_death_screen(window)
+                pygame.display.update()
+            if input_log:
+                input_log.tick(frame, handled, game, stepped=False)
+            hitches.discard_frame()
+            continue
+        paused_frame = None
+
+        game.streaming = report.time_to_first_frame is not None
+        game.step(frame, dt)
+        if input_log:
+            input_log.tick(frame, handled, game, stepped=True)
+        if game.streaming and game.world.complete and report.time_to_full_world is None:
+            report.full_world()
+            if startup_report:
+                print(report.format())
+
+        # Update minimap with monsters
+        if not game.is_dead:
+            game.ui.update_minimap(game.player, game.objects, int(game.camera_x), int(game.camera_y), game.monsters)
+        if timer:
+            timer.lap("minimap")
+
+        # Draw world
+        culled = draw_world(game, renderer, world_surface, bg_image, timer)
+
+        # Draw boss countdown without flickering
+ #       if not boss_spawned:
+  #          timer_str = f"Boss: {int(boss_countdown) // 60:02d}:{int(boss_countdown) % 60:02d}"
+   #         # Only re-render if text changed
+    #        if timer_str != last_timer_text:
+     #           timer_text_surface = timer_font.render(timer_str, True, (255, 0, 0))
+      #          last_timer_text = timer_str
+       #     
+        #    if timer_text_surface:
+         #       window.blit(timer_text_surface, 
+          #                (settings.WIDTH // 2 - timer_text_surface.get_width() // 2, 20))
+
+        if game.is_dead:
             # Death screen
-            draw(window, background, bg_image, player, objects, camera_x, ui,
-                 monsters=monsters, camera_y=camera_y)
             respawn_button = draw_death_screen(window)
+        if frame_log:
+            frame_log.capture(window)
+            if timer:
+                timer.lap("capture")
+        if overlay.enabled:
+            overlay.draw(window, game.ui.minimap_rect, hitches.reports)
 
         pygame.display.update()
-
+        if timer:
+            timer.end_frame()
+            hitches.end_frame(game, timer)
+        else:
+            hitches.discard_frame()  # F3 switched timing off this frame
+        if overlay.enabled:
+            overlay.end_frame(objects=len(game.objects), monsters=len(game.monsters), culled=culled)
+        if recorder:
+            recorder.sample(game, timer, culled=culled)
+        if profiler.active:
+            written = profiler.end_frame()
+            if written:
+                print("profile written to", ", ".join(written))
+        report.first_frame()
+        if stats:
+            stats.add(time.perf_counter() - frame_start)
+
+    if renderer is not None:
+        renderer.stop()
+    if recorder:
+        recorder.close()
+    hitches.close()
+    if input_log:
+        input_log.close()
+        print(f"recorded {input_log.ticks} ticks of input to {record} (seed {rng.current_seed()})")
+    if frame_log:
+        frame_log.close()
+        print(frame_log.format())
+    if hitch_log:
+        print(f"{hitches.count} hitches over {hitches.frames} frames logged to {hitch_log}")
+    if tracer.enabled:
+        print("trace written to", tracer.save())
+    if sampler:
+        path = sampler.stop()
+        print(f"{sampler.samples} stack samples written to {path} "
+              f"(sampling overhead {sampler.overhead() * 100:.1f}%)")
+    if stats:
+        print(stats.format())
     pygame.quit()
     sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print a breakdown of startup phases and time to first frame")
+    parser.add_argument("--render-size", metavar="WxH",
+                        help="internal render resolution, scaled to the window (default: window size)")
+    parser.add_argument("--threaded-render", action="store_true", default=None,
+                        help="draw the world on a background thread from per-tick snapshots")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="print mean/p95/p99 frame work time on exit")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="record per-frame metrics to PATH (.jsonl or .csv; also $GAME_METRICS)")
+    parser.add_argument("--metrics-max-mb", type=float,
+                        help="rotate the metrics file at this size (default 64)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write a Chrome trace-event timeline to PATH on exit (also $GAME_TRACE)")
+    parser.add_argument("--profile-frames", type=int, default=DEFAULT_FRAMES,
+                        help="frames covered by an F4 cProfile/tracemalloc capture")
+    parser.add_argument("--sample-profile", metavar="PATH",
+                        help="sample the main thread's stack in the background and write folded stacks to PATH")
+    parser.add_argument("--sample-interval", type=float, default=DEFAULT_INTERVAL_MS, metavar="MS",
+                        help="milliseconds between stack samples (default %(default)s)")
+    parser.add_argument("--hitch-log", metavar="PATH",
+                        help="append a JSON report for every frame over twice the frame budget to PATH")
+    parser.add_argument("--record", metavar="PATH",
+                        help="record every tick's input to PATH for replay.py")
+    parser.add_argument("--record-frames", metavar="DIR",
+                        help="write every simulated frame to DIR from a background thread (see framedump.py)")
+    parser.add_argument("--record-frames-size", metavar="WxH",
+                        help="downscale recorded frames to WxH (default: window size)")
+    parser.add_argument("--record-frames-format", choices=FRAME_FORMATS, default="raw",
+                        help="frames.raw plus frames.json, or a PNG per frame (default %(default)s)")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="replay an input recording in the window (headless with --headless) and exit")
+    parser.add_argument("--seed", type=int,
+                        help="seed for the gameplay random streams (default: random)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the simulation without a window as fast as possible (see headless.py)")
+    parser.add_argument("--ticks", type=int, default=settings.FPS * 60,
+                        help="ticks to simulate with --headless")
+    args = parser.parse_args()
+    if args.profile_frames < 1:
+        parser.error("--profile-frames must be at least 1")
+    if args.trace:
+        tracer.start(args.trace)
+    if args.render_size:
+        settings.RENDER_WIDTH, settings.RENDER_HEIGHT = (int(v) for v in args.render_size.lower().split("x"))
+    record_frames_size = None
+    if args.record_frames_size:
+        record_frames_size = tuple(int(v) for v in args.record_frames_size.lower().split("x"))
+    if args.seed is not None:
+        rng.seed(args.seed)
+    if args.replay:
+        from replay import run_replay
+        result = run_replay(args.replay, window=not args.headless)
+        print(result.format())
+        sys.exit(1 if result.divergence is not None else 0)
+    if args.headless:
+        from headless import run_headless
+        print(run_headless(args.ticks).format())
+        sys.exit()
+    main(startup_report=args.startup_report, threaded_render=args.threaded_render,
+         frame_stats=args.frame_stats, metrics=args.metrics, metrics_max_mb=args.metrics_max_mb,
+         profile_frames=args.profile_frames, sample_profile=args.sample_profile,
+         sample_interval_ms=args.sample_interval, hitch_log=args.hitch_log,
+         record=args.record, record_frames=args.record_frames, record_frames_size=record_frames_size,
+         record_frames_format=args.record_frames_format)
\ No newline at end of file
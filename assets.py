@@ -0,0 +1,170 @@
+"""
+Central asset cache.
+
+Every image load and every derived surface (cropped tiles, scaled and
+flipped animation frames, masks) goes through the shared `assets`
+manager, keyed by path and transform, so each is decoded and built once.
+PNG decoding can run on a background thread pool; conversion to the
+display format always happens on the main thread once a window exists.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from tracing import tracer
+
+DEFAULT_BUDGET = 64 * 1024 * 1024  # bytes of pixel data kept cached
+
+
+def _display_ready():
+    return pygame.display.get_init() and pygame.display.get_surface() is not None
+
+
+def _on_main_thread():
+    return threading.current_thread() is threading.main_thread()
+
+
+def size_of(value):
+    """Approximate bytes of pixel data held by a cached value."""
+    if isinstance(value, pygame.Surface):
+        return value.get_pitch() * value.get_height()
+    if isinstance(value, pygame.mask.Mask):
+        w, h = value.get_size()
+        return w * h // 8
+    if isinstance(value, dict):
+        return sum(size_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(size_of(v) for v in value)
+    return 0
+
+
+class _Entry:
+    __slots__ = ("value", "size", "display_ready")
+
+    def __init__(self, value, display_ready):
+        self.value = value
+        self.size = size_of(value)
+        self.display_ready = display_ready
+
+
+class AssetManager:
+    """
+    LRU cache of decoded images and derived surfaces with a memory budget.
+    - image(path): decoded (and, once a window exists, converted) Surface
+    - get(key, build): any derived value, built once per key
+    - preload(paths): decode in the background; progress() reports how far it got
+    Entries built before the window existed are rebuilt on first use after
+    it opens, so everything ends up in the display's pixel format.
+    """
+    def __init__(self, budget=DEFAULT_BUDGET, workers=2):
+        self.budget = budget
+        self.workers = workers
+        self.entries = OrderedDict()
+        self.used = 0
+        self.pending = {}  # path -> Future of a decoded Surface
+        self.requested = 0
+        self.completed = 0
+        self._pool = None
+        # guards entries, used and pending; decoding and building happen outside it
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="asset-decode")
+        return self._pool
+
+    def _store(self, key, value, display_ready):
+        entry = _Entry(value, display_ready)
+        with self._lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.used -= old.size
+            self.entries[key] = entry
+            self.used += entry.size
+            # evict least recently used entries, but never the one just stored
+            while self.used > self.budget and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.used -= evicted.size
+        return value
+
+    def _lookup(self, key):
+        rebuild = _display_ready() and _on_main_thread()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if not entry.display_ready and rebuild:
+                # built before the window existed: rebuild in display format
+                return None
+            self.entries.move_to_end(key)
+        return entry
+
+    def get(self, key, build):
+        """Return the cached value for key, calling build() to create it on a miss."""
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry.value
+        ready = _display_ready() and _on_main_thread()
+        return self._store(key, build(), ready)
+
+    def image(self, path):
+        """Return the decoded image at path, converted for the display when possible."""
+        key = ("image", path)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry.value
+        with self._lock:
+            future = self.pending.pop(path, None)
+            if future is not None:
+                self.completed += 1  # counted with the pop, so progress() never dips
+        if future is not None:
+            with tracer.span("wait_decode", "assets", {"path": path}):
+                surface = future.result()
+        else:
+            surface = self._decode(path)
+        ready = _display_ready() and _on_main_thread()
+        if ready:
+            with tracer.span("convert", "assets", {"path": path}):
+                surface = surface.convert_alpha()
+        return self._store(key, surface, ready)
+
+    def _decode(self, path):
+        with tracer.span("decode", "assets", {"path": path}):
+            return pygame.image.load(path)
+
+    def preload(self, paths):
+        """Start decoding paths on the thread pool; returns immediately."""
+        for path in paths:
+            with self._lock:
+                if ("image", path) in self.entries or path in self.pending:
+                    continue
+                self.pending[path] = self._executor().submit(self._decode, path)
+                self.requested += 1
+
+    def poll(self):
+        """Move finished background decodes into the cache (call on the main thread)."""
+        with self._lock:
+            pending = list(self.pending.items())
+        for path, future in pending:
+            if future.done():
+                self.image(path)
+
+    def progress(self):
+        """Return (loaded, requested) for background loads, for a loading screen."""
+        with self._lock:
+            done = self.completed + sum(1 for f in self.pending.values() if f.done())
+            return done, self.requested
+
+    def done(self):
+        with self._lock:
+            return all(f.done() for f in self.pending.values())
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.used = 0
+
+
+assets = AssetManager()
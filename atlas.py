@@ -0,0 +1,129 @@
+"""
+Sprite atlas disk cache.
+
+The build step slices every sprite sheet in a directory into frames,
+scales them with scale2x, adds flipped left-facing copies and packs the
+result into one atlas PNG plus a JSON index under .cache/atlas. The cache
+is rebuilt when a source image's mtime changes. At runtime the atlas is
+loaded once and every frame is a subsurface view into it, with its
+collision mask computed once at load.
+
+    python atlas.py    # (re)build the MainCharacter atlas
+"""
+import json
+import os
+from os import listdir
+from os.path import isfile, join
+
+import pygame
+
+from assets import assets
+from tracing import tracer
+
+CACHE_DIR = join(".cache", "atlas")
+ATLAS_VERSION = 1
+
+
+def _cache_paths(path, width, height, direction):
+    name = "_".join(part for part in path.replace("\\", "/").split("/") if part)
+    base = join(CACHE_DIR, f"{name}_{width}x{height}{'_dir' if direction else ''}")
+    return base + ".png", base + ".json"
+
+
+def _sources(path):
+    return {f: os.path.getmtime(join(path, f))
+            for f in sorted(listdir(path)) if isfile(join(path, f)) and f.endswith(".png")}
+
+
+def _slice_frames(path, width, height, direction):
+    """Decode the sheets in path and return {animation name: [frame Surfaces]}."""
+    animations = {}
+    for image in _sources(path):
+        img = pygame.image.load(join(path, image))
+        sprites = []
+        for i in range(img.get_width() // width):
+            surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+            rect = pygame.Rect(i * width, 0, width, height)
+            surface.blit(img, (0, 0), rect)
+            sprites.append(pygame.transform.scale2x(surface))
+
+        key_base = image.replace(".png", "")
+        if direction:
+            animations[key_base + "_right"] = sprites
+            animations[key_base + "_left"] = [pygame.transform.flip(s, True, False) for s in sprites]
+        else:
+            animations[key_base] = sprites
+    return animations
+
+
+def build_atlas(path, width, height, direction=False):
+    """Pack all processed frames of path into an atlas PNG and JSON index; returns their paths."""
+    png_path, index_path = _cache_paths(path, width, height, direction)
+    animations = _slice_frames(path, width, height, direction)
+    fw, fh = width * 2, height * 2
+    columns = max((len(frames) for frames in animations.values()), default=1)
+    atlas = pygame.Surface((max(1, columns * fw), max(1, len(animations) * fh)), pygame.SRCALPHA, 32)
+
+    index = {}
+    for row, (name, frames) in enumerate(sorted(animations.items())):
+        rects = []
+        for col, frame in enumerate(frames):
+            atlas.blit(frame, (col * fw, row * fh))
+            rects.append([col * fw, row * fh, fw, fh])
+        index[name] = rects
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # write to temporary names first so a crash never leaves a half-written cache
+    pygame.image.save(atlas, png_path + ".tmp.png")
+    with open(index_path + ".tmp", "w") as f:
+        json.dump({"version": ATLAS_VERSION, "sources": _sources(path), "animations": index}, f)
+    os.replace(png_path + ".tmp.png", png_path)
+    os.replace(index_path + ".tmp", index_path)
+    return png_path, index_path
+
+
+def _load_index(path, width, height, direction):
+    png_path, index_path = _cache_paths(path, width, height, direction)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != ATLAS_VERSION or index.get("sources") != _sources(path):
+        return None
+    if not os.path.exists(png_path):
+        return None
+    return png_path, index
+
+
+def ensure_atlas(path, width, height, direction=False):
+    """Return (atlas PNG path, index), rebuilding the cache if it is missing or stale."""
+    loaded = _load_index(path, width, height, direction)
+    if loaded is None:
+        build_atlas(path, width, height, direction)
+        loaded = _load_index(path, width, height, direction)
+    return loaded
+
+
+def load_atlas(path, width, height, direction=False):
+    """
+    Return ({animation name: [frames]}, {frame: mask}) for the sheets in path,
+    building the atlas cache first if it is missing or stale.
+    """
+    def build():
+        with tracer.span("load_atlas", "assets", {"path": path}):
+            png_path, index = ensure_atlas(path, width, height, direction)
+            atlas = assets.image(png_path)
+            frames = {}
+            masks = {}
+            for name, rects in index["animations"].items():
+                frames[name] = [atlas.subsurface(pygame.Rect(r)) for r in rects]
+                for frame in frames[name]:
+                    masks[frame] = pygame.mask.from_surface(frame)
+            return frames, masks
+    return assets.get(("atlas", path, width, height, direction), build)
+
+
+if __name__ == "__main__":
+    png, index = build_atlas(join("Assets", "MainCharacter", ""), 32, 32, True)
+    print(f"wrote {png} and {index}")
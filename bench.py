@@ -0,0 +1,316 @@
+"""
+Scenario benchmarks for the game loop.
+
+Each scenario drives a Game with scripted input and a fixed seed through
+the same step/draw/HUD calls the windowed loop makes (on SDL's dummy
+driver), timing every frame by phase: input, physics, collision,
+generation, ai, draw, hud and present. Results are written as JSON and
+can be compared against a saved baseline; regressions make the run exit
+with status 1. Every scenario starts from its own freshly built world.
+Replays check the recording's state hashes as they go, and one that
+diverges also fails the run: its timings are of some other session.
+
+    python bench.py                          # every scenario
+    python bench.py idle dash_spam --scale 0.1
+    python bench.py --save-baseline          # record bench_baseline.json
+    python bench.py --baseline bench_baseline.json
+    python bench.py --replay run.rec         # a recorded session (MAIN.py --record)
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import rng
+import settings
+from controls import ScriptedInput, key_down, sprint_right
+from game import Game
+from gui import get_background, draw_world_layer, scale_to_window
+from monster import Monster
+from perf import PhaseTimer
+from player import Block, Player, get_block_image
+from replay import Recording, ReplayInput
+
+DEFAULT_OUT = "bench_results.json"
+# Game.step's fine-grained laps, merged into the phases the benchmark reports
+PHASE_GROUPS = {
+    "player": "physics",
+    "move": "collision",
+    "ledge": "collision",
+    "generation": "generation",
+    "cleanup": "generation",
+    "spawning": "ai",
+    "monsters": "ai",
+}
+DEFAULT_BASELINE = "bench_baseline.json"
+
+
+class Scenario:
+    def __init__(self, name, ticks, script, description, setup=None, resolution=None,
+                 stress=False, seed=1234, recording=None):
+        self.name = name
+        self.ticks = ticks
+        self.script = script
+        self.description = description
+        self.setup = setup
+        self.resolution = resolution  # window and render size; None keeps settings
+        self.stress = stress
+        self.seed = seed
+        self.recording = recording  # replay this input recording instead of running script
+
+
+def idle(tick):
+    return (), []
+
+
+def dash_spam(tick):
+    events = []
+    if tick % 15 == 0:
+        events.append(key_down(pygame.K_q))
+    if tick % 60 == 30:
+        events.append(key_down(pygame.K_SPACE))
+    return (pygame.K_d,), events
+
+
+def stomp_chain(tick):
+    phase = tick % 45
+    if phase == 0:
+        return (pygame.K_d,), [key_down(pygame.K_SPACE)]
+    if phase == 20:
+        return (pygame.K_d,), [key_down(pygame.K_e)]
+    return (pygame.K_d,), []
+
+
+def replay_scenario(path):
+    name = "replay:" + os.path.splitext(os.path.basename(path))[0]
+    return Scenario(name, None, None, f"replay of {path}", recording=path)
+
+
+def add_monsters(count):
+    def setup(game):
+        blocks = [o for o in game.objects if isinstance(o, Block)]
+        for i in range(count):
+            b = blocks[i % len(blocks)]
+            game.monsters.append(Monster(b.rect.x, b.rect.y - 40 - (i // len(blocks)) % 8, 40, 40))
+    return setup
+
+
+def grow_world(blocks):
+    def setup(game):
+        world = game.world
+        while sum(isinstance(o, Block) for o in game.objects) < blocks:
+            world.ahead += world.generator.section_pixels * 100
+            world.update(game.player.rect.centerx, game.objects)
+    return setup
+
+
+SCENARIOS = {s.name: s for s in (
+    Scenario("idle", 1800, idle, "stand still on the start platform for 30 s"),
+    Scenario("sprint_right", settings.FPS * 600, sprint_right, "hold D and jump once a second for 10 min"),
+    Scenario("dash_spam", 1800, dash_spam, "run right dashing every 15 ticks"),
+    Scenario("stomp_chain", 1800, stomp_chain, "jump and stomp in a loop while running right"),
+    Scenario("monsters_5k", 600, idle, "5,000 monsters around the start", setup=add_monsters(5000),
+             stress=True),
+    Scenario("blocks_100k", 300, sprint_right, "100k generated blocks in the active world",
+             setup=grow_world(100000), stress=True),
+    Scenario("hd_1080", 1800, sprint_right, "sprint right at 1920x1080", resolution=(1920, 1080),
+             stress=True),
+)}
+
+
+def run_scenario(scenario, scale=1.0, draw=True):
+    """Run one scenario and return its summary dict."""
+    saved = (settings.WIDTH, settings.HEIGHT, settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+    if scenario.resolution:
+        settings.WIDTH, settings.HEIGHT = scenario.resolution
+        settings.RENDER_WIDTH, settings.RENDER_HEIGHT = scenario.resolution
+    recording = Recording.load(scenario.recording) if scenario.recording else None
+    try:
+        if recording:
+            recording.apply_settings()
+        window = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+        render_size = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+        target = window if window.get_size() == render_size else pygame.Surface(render_size).convert()
+        _, bg_image = get_background("Blue.png")
+        Player.ensure_sprites_loaded()
+        get_block_image(settings.BLOCK_SIZE)
+
+        if recording:
+            source = ReplayInput(recording)
+            ticks = min(len(recording.frames), max(60, int(len(recording.frames) * scale)))
+        else:
+            rng.seed(scenario.seed)
+            source = ScriptedInput(scenario.script)
+            ticks = max(60, int(scenario.ticks * scale))
+        # its own starting world, so scenarios (and replays) never start from
+        # a world an earlier scenario played on or built at another resolution
+        game = Game(own_world=True)
+        if scenario.setup:
+            scenario.setup(game)
+        timer = game.timer = PhaseTimer(groups=PHASE_GROUPS)
+        dt = 1.0 / settings.FPS
+        deaths = 0
+        checked = 0
+        divergence = None
+        start = time.perf_counter()
+        for tick in range(ticks):
+            timer.start_frame()
+            frame = source.poll()
+            for event in frame.events:
+                game.handle_event(event)
+            timer.lap("input")
+            if game.is_dead and not recording:  # recordings carry their own respawns
+                deaths += 1
+                game.reset()
+                if scenario.setup:
+                    scenario.setup(game)
+                timer.lap("respawn")
+            if frame.streaming is not None:
+                game.streaming = frame.streaming
+            if frame.step:
+                game.step(frame, dt)
+            if draw:
+                draw_world_layer(target, bg_image, game.player, game.objects, game.camera_x,
+                                 game.monsters, game.camera_y)
+                scale_to_window(window, target)
+                timer.lap("draw")
+                game.ui.update_minimap(game.player, game.objects, int(game.camera_x),
+                                       int(game.camera_y), game.monsters)
+                game.ui.draw(window, game.camera_x)
+                timer.lap("hud")
+                pygame.display.update()
+                timer.lap("present")
+            timer.end_frame()
+            expected = recording.hashes.get(tick) if recording else None
+            if expected is not None and divergence is None:
+                checked += 1
+                if game.state_hash() != expected:
+                    divergence = tick
+        elapsed = time.perf_counter() - start
+    finally:
+        settings.WIDTH, settings.HEIGHT, settings.RENDER_WIDTH, settings.RENDER_HEIGHT = saved
+
+    result = timer.summary()
+    result.update({
+        "description": scenario.description,
+        "ticks": ticks,
+        "seconds": elapsed,
+        "ticks_per_s": ticks / elapsed if elapsed else 0.0,
+        "deaths": deaths,
+        "objects": len(game.objects),
+        "monsters": len(game.monsters),
+    })
+    if recording:
+        result["checkpoints"] = checked
+        result["diverged_at"] = divergence  # first tick whose state hash differed from the recording
+    return result
+
+
+def compare(results, baseline, threshold=0.10, min_delta_ms=0.1):
+    """
+    Return a list of regression messages: frame p50/p95/p99 or a phase's p95
+    that got worse than the baseline by more than threshold (relative) and
+    min_delta_ms (absolute, to ignore noise on tiny phases).
+    """
+    regressions = []
+    for name, new in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        checks = [(f"frame {p}", new["frame_ms"][p], old["frame_ms"][p]) for p in ("p50", "p95", "p99")]
+        for phase, stats in new["phases_ms"].items():
+            if phase in old["phases_ms"]:
+                checks.append((f"{phase} p95", stats["p95"], old["phases_ms"][phase]["p95"]))
+        for label, value, before in checks:
+            if value - before > min_delta_ms and value > before * (1 + threshold):
+                regressions.append(f"{name}: {label} {before:.2f} -> {value:.2f} ms "
+                                   f"(+{(value / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def format_result(name, result):
+    f = result["frame_ms"]
+    lines = [f"{name}: {result['ticks']} ticks, {result['ticks_per_s']:,.0f} ticks/s, "
+             f"frame p50 {f['p50']:.2f} / p95 {f['p95']:.2f} / p99 {f['p99']:.2f} ms"]
+    for phase, s in result["phases_ms"].items():
+        lines.append(f"  {phase:<11} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  p99 {s['p99']:7.2f} ms")
+    if result.get("diverged_at") is not None:
+        lines.append(f"  WARNING: replay diverged from the recording at tick {result['diverged_at']}; "
+                     f"these timings are not of the recorded session")
+    elif "checkpoints" in result:
+        lines.append(f"  {result['checkpoints']} replay checkpoints matched")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run game loop benchmark scenarios")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    parser.add_argument("--replay", metavar="PATH", action="append", default=[],
+                        help="also run an input recording as a scenario (repeatable)")
+    parser.add_argument("--no-stress", action="store_true", help="skip the stress presets")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's tick count")
+    parser.add_argument("--no-draw", action="store_true", help="skip draw/hud/present (simulation only)")
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    unknown = [n for n in args.scenarios if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    names = args.scenarios or [n for n, s in SCENARIOS.items() if not (args.no_stress and s.stress)]
+    if args.replay and not args.scenarios:
+        names = []  # only the recordings unless scenarios are named too
+    scenarios = [SCENARIOS[n] for n in names] + [replay_scenario(path) for path in args.replay]
+
+    pygame.init()
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "scale": args.scale,
+            "draw": not args.no_draw,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.scale, draw=not args.no_draw)
+        results["scenarios"][scenario.name] = result
+        print(format_result(scenario.name, result), flush=True)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(results, f, indent=2)
+
+    status = 0
+    diverged = [name for name, r in results["scenarios"].items() if r.get("diverged_at") is not None]
+    if diverged:
+        print("DIVERGED:", ", ".join(diverged))
+        status = 1
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("no regressions against", args.baseline)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+Input sources for the game loop.
+
+A source is polled once per tick and returns an InputFrame with the events
+that arrived, the held keys and the pressed mouse buttons. The live game
+reads the keyboard; headless runs and benchmarks use a ScriptedInput and
+replays use replay.ReplayInput.
+"""
+import pygame
+
+
+class KeyState:
+    """Held keys, indexable by pygame key constant like pygame.key.get_pressed()."""
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+
+NO_BUTTONS = (False, False, False)
+
+# Held keys the simulation reads (player movement and ledge climbing)
+GAME_KEYS = (pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_UP, pygame.K_SPACE)
+
+# Sent to Game.handle_event when the player respawns, so it is part of the input stream
+RESPAWN = pygame.event.custom_type()
+
+
+class InputFrame:
+    """
+    One tick of input. step=False marks a tick the simulation did not
+    advance (paused); streaming, when not None, is the Game.streaming value
+    the tick ran with. Both are only set by replays.
+    """
+    __slots__ = ("events", "keys", "mouse_buttons", "step", "streaming")
+
+    def __init__(self, events, keys, mouse_buttons=NO_BUTTONS, step=True, streaming=None):
+        self.events = events
+        self.keys = keys
+        self.mouse_buttons = mouse_buttons
+        self.step = step
+        self.streaming = streaming
+
+
+class KeyboardInput:
+    """The real keyboard and mouse; needs a window to receive events."""
+    def poll(self):
+        return InputFrame(pygame.event.get(), pygame.key.get_pressed(), pygame.mouse.get_pressed())
+
+
+def key_down(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key)
+
+
+def click(pos, button=1):
+    """
+    A mouse click at pos in render coordinates: the world frame as drawn,
+    before it is scaled to the window. Game.handle_event adds the camera
+    offset before hit-testing monsters, so scripts aim at a monster with
+    its rect position minus (camera_x, camera_y).
+    """
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=button)
+
+
+def respawn():
+    return pygame.event.Event(RESPAWN)
+
+
+class ScriptedInput:
+    """
+    Input produced by script(tick) -> (held keys, [events]). Events are
+    usually built with key_down() / click(). Any events posted to pygame's
+    own queue (e.g. QUIT) are passed through as well.
+    """
+    def __init__(self, script):
+        self.script = script
+        self.tick = 0
+
+    def poll(self):
+        held, events = self.script(self.tick)
+        self.tick += 1
+        return InputFrame(list(events) + pygame.event.get(), KeyState(held))
+
+
+def sprint_right(tick):
+    """Hold D and jump once a second: the default headless workload."""
+    return (pygame.K_d,), [key_down(pygame.K_SPACE)] if tick % 60 == 59 else []
@@ -0,0 +1,177 @@
+"""
+Frame export: recording rendered frames to disk, and pixel views for
+observations.
+
+FrameRecorder.capture(surface) is called on the game thread once per
+frame. It copies the pixels into a spare buffer from a small pool (one
+np.copyto between packed pixel views with NumPy, a blit without, or a
+nearest-neighbour scale when downscaling) and hands the buffer to a
+writer thread through a bounded queue; nothing is allocated or encoded
+on the game thread. When the writer falls behind and the pool is empty, the
+frame is dropped and counted rather than stalling the game.
+
+The writer saves either
+- raw: every frame's pixel buffer appended as-is to frames.raw, written
+  straight from the surface's memory, with the layout in frames.json.
+  ffmpeg reads it with -f rawvideo -pix_fmt <pix_fmt> -s WxH.
+- png: one frame-000000.png per frame. Encoding is slow, so expect drops
+  at full resolution and 60 FPS; downscale or use raw for smooth video.
+
+pixel_view(surface) exposes a surface's pixels as a height x width x 3
+array: a NumPy view without copying, or a memoryview of a copy when
+NumPy is missing.
+
+    python MAIN.py --record-frames frames/ --record-frames-size 500x400
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+import pygame
+
+import settings
+from tracing import tracer
+
+try:
+    import numpy as np
+except ImportError:  # pixel_view falls back to a copy
+    np = None
+
+DEFAULT_QUEUE = 8  # frames captured but not yet written
+FORMATS = ("raw", "png")
+RAW_NAME = "frames.raw"
+INFO_NAME = "frames.json"
+
+# (bytes in memory order) -> ffmpeg pix_fmt for the layouts SDL uses
+_PIX_FMTS = {"BGRX": "bgr0", "RGBX": "rgb0", "XRGB": "0rgb", "XBGR": "0bgr", "BGRA": "bgra",
+             "RGBA": "rgba", "ARGB": "argb", "ABGR": "abgr", "BGR": "bgr24", "RGB": "rgb24"}
+
+
+def pixel_view(surface, packed=False):
+    """
+    surface's pixels as a (height, width, 3) RGB view. With NumPy this is
+    an array from surfarray.pixels3d, which shares the surface's memory and
+    keeps it locked, so it cannot be blitted to, until the view is dropped.
+    Without NumPy it is a read-only memoryview of an RGB copy, same shape.
+    packed=True gives a (height, width) array of whole pixels in the
+    surface's own format instead: copying one is a plain memory copy, where
+    the RGB view has to pick bytes out of every pixel. Needs NumPy.
+    """
+    if np is not None:
+        if packed:
+            return pygame.surfarray.pixels2d(surface).T
+        return pygame.surfarray.pixels3d(surface).transpose(1, 0, 2)
+    if packed:
+        raise RuntimeError("packed pixel views need NumPy")
+    w, h = surface.get_size()
+    return memoryview(pygame.image.tobytes(surface, "RGB")).cast("B", (h, w, 3))
+
+
+def byte_order(surface):
+    """Channel letters in memory order of one pixel, e.g. "BGRX" for SDL's usual 32-bit format."""
+    order = []
+    masks = surface.get_masks()
+    for i in range(surface.get_bytesize()):
+        byte = 0xFF << (8 * i)
+        for name, mask in zip("RGBA", masks):
+            if mask == byte:
+                order.append(name)
+                break
+        else:
+            order.append("X")
+    return "".join(order)
+
+
+class FrameRecorder:
+    def __init__(self, out_dir, size=None, fmt="raw", queue_size=DEFAULT_QUEUE):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown frame format {fmt!r} (expected one of {', '.join(FORMATS)})")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.size = size  # output size; the first captured surface's size when None
+        self.fmt = fmt
+        self.frames = 0  # captured
+        self.written = 0
+        self.dropped = 0
+        self.capture_seconds = 0.0  # game thread time spent in capture()
+        self.info = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._free = queue.Queue()  # buffers not queued or being written
+        self._buffers = queue_size  # the pool bounds the queue, so put() never blocks
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="framedump", daemon=True)
+        self._thread.start()
+
+    def _allocate(self, surface):
+        self.size = self.size or surface.get_size()
+        for _ in range(self._buffers):
+            self._free.put(pygame.Surface(self.size, 0, surface))
+        buffer = self._free.queue[0]
+        order = byte_order(buffer)
+        self.info = {
+            "format": self.fmt,
+            "width": self.size[0],
+            "height": self.size[1],
+            "fps": settings.FPS,
+            "pitch": buffer.get_pitch(),
+            "byte_order": order,
+            "pix_fmt": _PIX_FMTS.get(order),
+        }
+        if self.fmt == "raw":
+            self._file = open(os.path.join(self.out_dir, RAW_NAME), "wb")
+
+    def capture(self, surface):
+        """Queue a copy of surface (scaled to size) for writing; False if it had to be dropped."""
+        start = time.perf_counter()
+        if self.info is None:
+            self._allocate(surface)
+        try:
+            buffer = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        if surface.get_size() != self.size:
+            pygame.transform.scale(surface, self.size, buffer)
+        elif np is not None and surface.get_bitsize() == 32 and surface.get_masks() == buffer.get_masks():
+            # same layout: one straight copy, about half the cost of a blit
+            np.copyto(pixel_view(buffer, packed=True), pixel_view(surface, packed=True))
+        else:
+            buffer.blit(surface, (0, 0))
+        self._queue.put((self.frames, buffer))
+        self.frames += 1
+        self.capture_seconds += time.perf_counter() - start
+        return True
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            index, buffer = item
+            with tracer.span("write_frame", "framedump"):
+                if self.fmt == "raw":
+                    self._file.write(buffer.get_view("1"))  # the pixel memory itself, pitch included
+                else:
+                    pygame.image.save(buffer, os.path.join(self.out_dir, f"frame-{index:06d}.png"))
+            self.written += 1
+            self._free.put(buffer)
+
+    def mean_capture_ms(self):
+        return self.capture_seconds / self.frames * 1000 if self.frames else 0.0
+
+    def close(self):
+        """Write out the queued frames and the frames.json description."""
+        self._queue.put(None)
+        self._thread.join()
+        if self._file:
+            self._file.close()
+        if self.info is not None:
+            info = dict(self.info, frames=self.written, dropped=self.dropped)
+            with open(os.path.join(self.out_dir, INFO_NAME), "w") as f:
+                json.dump(info, f, indent=2)
+
+    def format(self):
+        return (f"{self.written} frames written to {self.out_dir} ({self.dropped} dropped), "
+                f"{self.mean_capture_ms():.2f} ms per capture on the game thread")
@@ -0,0 +1,341 @@
+"""
+Game state and the fixed-step simulation, independent of the window.
+
+MAIN.py wraps a Game with the display, menus and drawing; headless.py
+steps one as fast as possible with scripted input.
+"""
+import hashlib
+import os
+import struct
+
+import pygame
+
+import settings
+from settings import BLOCK_SIZE, HEALTH_REGEN_RATE, STAMINA_REGEN_RATE, MANA_REGEN_RATE
+from player import Player, Block, handle_move, handle_ledge_grab
+from gui import UI, spawn_monsters_on_surfaces
+from world_gen import WorldGenerator, SectionStream
+from perf import StartupReport
+from renderer import take_snapshot
+from controls import RESPAWN
+
+MONSTER_SPAWN_INTERVAL = 5.0
+MAX_MONSTERS = 20
+
+# Phases Game.step laps on an attached PhaseTimer, in order
+STEP_PHASES = ("player", "move", "ledge", "generation", "spawning", "cleanup", "monsters")
+
+initial_world = None  # (start_blocks, SectionStream, WorldSnapshot) of the first reset_game
+
+
+def reset_game(report=None, cache=None):
+    """
+    Reset game state for respawn.
+    Only the starting platform and the player's own section are built here;
+    the rest of the window streams in over the following frames.
+    cache: a dict to keep the starting world in instead of the module-wide
+    initial_world, for games that must not share a world with each other.
+    """
+    global initial_world
+    cached = initial_world if cache is None else cache.get("world")
+    report = report or StartupReport()
+    objects = []
+    monsters = []
+
+    # Starting platform only (no ground)
+    starting_platform_y = settings.RENDER_HEIGHT - BLOCK_SIZE * 4
+
+    player = Player(100, starting_platform_y - 60, 50, 50)
+    player.x_vel = 0
+    player.y_vel = 0
+
+    ui = UI(player, objects)
+
+    if cached is None or cached[2].ground_y != starting_platform_y:
+        with report.phase("generation"):
+            # Create small starting platform
+            start_blocks = [Block(i * BLOCK_SIZE, starting_platform_y, BLOCK_SIZE) for i in range(5)]
+            objects.extend(start_blocks)
+
+            world_gen = WorldGenerator(BLOCK_SIZE)
+            if os.path.exists(settings.WORLD_FILE):
+                world_gen.open_world_file(settings.WORLD_FILE)
+            # Only sections inside the active window become Block sprites; the rest
+            # stays as tile data until the player gets close.
+            world = SectionStream(world_gen, starting_platform_y,
+                                  behind=settings.RENDER_WIDTH * 3, ahead=settings.RENDER_WIDTH * 2)
+            world.update(player.rect.centerx, objects, max_new=1)
+            cached = (start_blocks, world, world.snapshot())
+            if cache is None:
+                initial_world = cached
+            else:
+                cache["world"] = cached
+    else:
+        # The seed is fixed, so the starting world is always the same: reuse it
+        # and only put back what stomps changed.
+        start_blocks, world, snapshot = cached
+        objects.extend(start_blocks)
+        world.restore(snapshot, objects)
+        world.behind, world.ahead = settings.RENDER_WIDTH * 3, settings.RENDER_WIDTH * 2
+
+    # Spawn initial monsters on all available blocks
+    with report.phase("spawn"):
+        available_blocks = [o for o in objects if isinstance(o, Block)]
+        if available_blocks:
+            initial_monster_count = min(15, len(available_blocks) // 10)
+            monsters_list = spawn_monsters_on_surfaces(
+                available_blocks,
+                num_monsters=initial_monster_count,
+                monster_size=(40, 40)
+            )
+        else:
+            monsters_list = []
+
+    return player, objects, monsters_list, ui, world, starting_platform_y
+
+
+class Game:
+    """
+    One run of the game: player, world, monsters, HUD state and camera.
+    step() advances the simulation by one fixed tick from an InputFrame;
+    nothing here draws or touches the display.
+    Games normally share one cached starting world; own_world=True gives this
+    one its own, so several can run side by side in one process.
+    """
+    def __init__(self, report=None, own_world=False):
+        self.streaming = True  # MAIN holds streaming back until the first frame is shown
+        self.timer = None  # optional perf.PhaseTimer, lapped after each of STEP_PHASES
+        self.ticks = 0
+        self._world_cache = {} if own_world else None
+        self.reset(report)
+
+    def reset(self, report=None):
+        (self.player, self.objects, self.monsters, self.ui,
+         self.world, self.starting_y) = reset_game(report, self._world_cache)
+        self.death_line_y = self.starting_y + BLOCK_SIZE * 15
+        self.is_dead = False
+        self.points = 0
+        self.monster_spawn_timer = 0.0
+        self.camera_x = 0
+        self.camera_y = 0
+
+    @property
+    def paused(self):
+        return self.ui.inventory_open or self.ui.options_open
+
+    def handle_event(self, event):
+        """Apply one gameplay event (attacks, abilities, menu keys)."""
+        player, ui = self.player, self.ui
+        if event.type == RESPAWN:
+            self.reset()
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            # Player attack - instantly kill monsters on left click
+            if not self.is_dead and not ui.inventory_open and not ui.options_open:
+                # Check if any monster was clicked; pos is in render coordinates (see MAIN)
+                x = event.pos[0] + int(self.camera_x)
+                y = event.pos[1] + int(self.camera_y)
+                monsters_to_remove = [m for m in self.monsters if m.rect.collidepoint(x, y)]
+                self.points += 10
+                # Remove killed monsters
+                for m in monsters_to_remove:
+                    self.monsters.remove(m)
+            if ui.inventory_open:
+                mx, my = event.pos
+                for tab_name, rect in ui.tab_rects.items():
+                    if rect.collidepoint(mx, my):
+                        ui.inventory_tab = tab_name
+                        break
+
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_i:
+                ui.toggle_inventory()
+            elif event.key == pygame.K_o:
+                ui.toggle_options()
+            elif event.key == pygame.K_TAB and ui.inventory_open:
+                ui.cycle_tab()
+            elif event.key == pygame.K_SPACE and player.jump_count < 2 and not player.holding:
+                player.jump()
+            elif event.key == pygame.K_q:
+                player.dash()
+            elif event.key == pygame.K_e:
+                player.stomp()
+
+    def _kill_touching_monsters(self):
+        monsters_to_remove = [m for m in self.monsters if pygame.sprite.collide_mask(self.player, m)]
+        for m in monsters_to_remove:
+            self.monsters.remove(m)
+        if monsters_to_remove:
+            self.points += 10
+            self.ui.points += 10
+        return monsters_to_remove
+
+    def step(self, frame, dt):
+        """Advance one fixed tick using the held keys and mouse buttons in frame."""
+        if self.is_dead:
+            return
+        self.ticks += 1
+        player, objects, monsters, ui = self.player, self.objects, self.monsters, self.ui
+        timer = self.timer
+
+        # Regeneration
+        ui.health = min(ui.max_health, ui.health + HEALTH_REGEN_RATE * dt)
+        ui.stamina = min(ui.max_stamina, ui.stamina + STAMINA_REGEN_RATE * dt)
+        ui.mana = min(ui.max_mana, ui.mana + MANA_REGEN_RATE * dt)
+
+        # Update player physics
+        player.loop(settings.FPS, dt)
+        if timer:
+            timer.lap("player")
+
+        # Handle stomp collisions after physics update
+        if player.stomping:
+            collided_blocks = [obj for obj in objects
+                               if pygame.sprite.collide_mask(player, obj) and isinstance(obj, Block)]
+            for obj in collided_blocks:
+                objects.remove(obj)
+                self.world.remove_block(obj)
+
+            monsters_to_remove = self._kill_touching_monsters()
+            if collided_blocks or monsters_to_remove:
+                player.stomping = False
+                player.y_vel = -player.GRAVITY * 12  # Even higher bounce jump
+                player.stomp_timer = 0.0
+                player.stomp_cooldown_timer = 0.0
+
+        #Wenn der Spieler dasht,d dann werden Monster dabei getötet
+        if player.dashing:
+            self._kill_touching_monsters()
+
+        handle_move(player, objects, frame.keys)
+        if timer:
+            timer.lap("move")
+        handle_ledge_grab(player, objects, dt, BLOCK_SIZE, frame.keys, frame.mouse_buttons)
+        if timer:
+            timer.lap("ledge")
+
+        # Camera follows player both horizontally and vertically
+        player_x = player.rect.centerx
+        player_y = player.rect.centery
+        target_camera_x = int(player_x - settings.RENDER_WIDTH // 2)
+        target_camera_y = int(player_y - settings.RENDER_HEIGHT // 2)
+
+        # Smooth camera following
+        self.camera_x += (target_camera_x - self.camera_x) * 0.15
+        self.camera_y += (target_camera_y - self.camera_y) * 0.15
+
+        # Stream sections in ahead of the player (one per tick) and drop the ones far behind
+        new_blocks = self.world.update(player_x, objects, max_new=1) if self.streaming else []
+        if timer:
+            timer.lap("generation")
+        # Spawn monsters on sections built for the first time (not on re-entered ones)
+        if new_blocks and len(monsters) < MAX_MONSTERS:
+            monsters.extend(spawn_monsters_on_surfaces(new_blocks, num_monsters=5, monster_size=(40, 40)))
+        if timer:
+            timer.lap("spawning")
+
+        # Cleanup far objects that are not part of a streamed section
+        cleanup_x = player_x - settings.RENDER_WIDTH * 3
+        for obj in objects[:]:
+            if isinstance(obj, Block) and obj.rect.x < cleanup_x and getattr(obj, "section", None) is None:
+                objects.remove(obj)
+        if timer:
+            timer.lap("cleanup")
+
+        # Monster spawning on platforms
+        self.monster_spawn_timer += dt
+        if self.monster_spawn_timer >= MONSTER_SPAWN_INTERVAL:
+            self.monster_spawn_timer = 0.0
+            if len(monsters) < MAX_MONSTERS:
+                self._spawn_near(player_x)
+        if timer:
+            timer.lap("spawning")
+
+        # Update monsters
+        for m in monsters[:]:
+            m.update(dt, objects, player)
+
+            # Check if monster fell off world
+            if m.rect.y > self.death_line_y:
+                monsters.remove(m)
+                continue
+
+            # Apply damage when monster touches player
+            if m.rect.colliderect(player.rect):
+                ui.health = max(0.0, ui.health - m.DAMAGE * dt)
+                # Trigger damage flash
+                ui.damage_flash = min(1.0, ui.damage_flash + 0.3)
+
+        # Boss countdown
+        #if not boss_spawned:
+            #boss_countdown -= dt
+            #if boss_countdown <= 0:
+                # Create arena at current position
+                #arena_width = int(settings.WIDTH * 2)
+                #left_bound = player_x - arena_width // 4
+                #right_bound = left_bound + arena_width
+
+                # Clear existing monsters
+                #monsters.clear()
+
+                # Create arena walls
+                #left_wall = Object(left_bound - 48, -settings.HEIGHT * 2, 
+                                 #48, settings.HEIGHT * 6, name="ArenaWall")
+                #right_wall = Object(right_bound, -settings.HEIGHT * 2, 
+                                  #48, settings.HEIGHT * 6, name="ArenaWall")
+                
+                #for wall in (left_wall, right_wall):
+                    #wall.image.fill((255, 0, 0))
+                    #wall.mask = pygame.mask.from_surface(wall.image)
+                    #objects.append(wall)
+
+                # Spawn boss in center of arena
+                #boss = Boss(left_bound + arena_width // 2, starting_y - 100)
+                #monsters.append(boss)
+                #boss_spawned = True
+                #arena_bounds = (left_bound, right_bound)
+
+        # Check for death
+        if player.rect.bottom > self.death_line_y or ui.health <= 0:
+            self.is_dead = True
+        if timer:
+            timer.lap("monsters")
+
+    def state_hash(self):
+        """Short hex digest of the simulation state; replays compare it to detect divergence."""
+        player, ui = self.player, self.ui
+        h = hashlib.blake2b(digest_size=8)
+        h.update(struct.pack("<4i3?4i", *player.rect, self.is_dead, player.dashing, player.stomping,
+                             player.jump_count, self.points, self.ticks, len(self.objects)))
+        h.update(struct.pack("<7d", player.x_vel, player.y_vel, ui.health, ui.stamina, ui.mana,
+                             self.camera_x, self.camera_y))
+        for m in self.monsters:
+            h.update(struct.pack("<5i", *m.rect, m.dir))
+        return h.hexdigest()
+
+    def _spawn_near(self, player_x):
+        monsters = self.monsters
+        # Find blocks near player for spawning
+        blocks_near = [o for o in self.objects if isinstance(o, Block)
+                       and abs(o.rect.centerx - player_x) < settings.RENDER_WIDTH * 3]
+        if not blocks_near:
+            return
+
+        # Filter out blocks that already have monsters
+        def block_has_monster(b):
+            for m in monsters:
+                if (m.rect.bottom == b.rect.top and
+                    abs(m.rect.centerx - b.rect.centerx) <= b.rect.width // 2):
+                    return True
+            return False
+
+        available_blocks = [b for b in blocks_near if not block_has_monster(b)]
+        if available_blocks:
+            to_spawn = min(5, MAX_MONSTERS - len(monsters))
+            monsters.extend(spawn_monsters_on_surfaces(available_blocks, num_monsters=to_spawn,
+                                                       monster_size=(40, 40)))
+
+    def snapshot(self, bg_image):
+        """RenderSnapshot of the current world for the renderer."""
+        view = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+        return take_snapshot(view, bg_image, self.player, self.objects, self.monsters,
+                             self.camera_x, self.camera_y)
@@ -1,18 +1,23 @@
 import pygame
-import random
 from os.path import join
-from settings import WIDTH, HEIGHT, BLOCK_SIZE
+import settings
+from settings import BLOCK_SIZE
 from player import Block
 from monster import Monster
+from assets import assets
+from perf import count_surfaces
+import rng
+
+_random = rng.stream("spawning")
 
 def get_background(name):
     """Create background image and return it with tile positions."""
-    image = pygame.image.load(join("Assets", "Background", name))
+    image = assets.image(join("Assets", "Background", name))
     _, _, width, height = image.get_rect()
     tiles = []
     
-    for i in range(WIDTH // width + 2):
-        for j in range(HEIGHT // height + 2):
+    for i in range(settings.RENDER_WIDTH // width + 2):
+        for j in range(settings.RENDER_HEIGHT // height + 2):
             tiles.append((i * width, j * height))
             
     return tiles, image
@@ -46,7 +51,7 @@ class UI:
         
         self.resolutions = [(800, 600), (1000, 800), (1280, 720), (1366, 768), (1920, 1080)]
         try:
-            self.res_index = next(i for i, r in enumerate(self.resolutions) if r == (WIDTH, HEIGHT))
+            self.res_index = next(i for i, r in enumerate(self.resolutions) if r == (settings.WIDTH, settings.HEIGHT))
         except StopIteration:
             self.res_index = 1
             
@@ -71,10 +76,11 @@ class UI:
 
         # Simplified minimap
         self.minimap_scale = 0.1
-        self.minimap_width = int(WIDTH * 0.2)
-        self.minimap_height = int(HEIGHT * 0.15)
+        self.minimap_width = int(settings.RENDER_WIDTH * 0.2)
+        self.minimap_height = int(settings.RENDER_HEIGHT * 0.15)
         self.minimap_surface = pygame.Surface((self.minimap_width, self.minimap_height))
-        self.minimap_rect = pygame.Rect(WIDTH - self.minimap_width - 10, 10,
+        # positioned against the window's right edge each time it is drawn
+        self.minimap_rect = pygame.Rect(settings.WIDTH - self.minimap_width - 10, 10,
                                       self.minimap_width, self.minimap_height)
         self.points = 0
 
@@ -87,6 +93,7 @@ class UI:
         pygame.draw.rect(win, (255,255,255), (x, y, w, h), 2)
         font = pygame.font.SysFont("arial", 18)
         txt = font.render(f"{label}: {int(round(value))}/{int(round(max_value))}", True, (255,255,255))
+        count_surfaces(2)
         win.blit(txt, (x + 8, y + h//2 - 10))
 
     def update_minimap(self, player, objects, camera_x, camera_y, monsters=None):
@@ -137,12 +144,14 @@ class UI:
                          (int(player_minimap_x), int(player_minimap_y)), 4)
 
     def draw_minimap(self, win, offset_x):
+        self.minimap_rect.x = win.get_width() - self.minimap_width - 10
         win.blit(self.minimap_surface, self.minimap_rect)
         pygame.draw.rect(win, (255, 255, 255), self.minimap_rect, 2)
 
         # Draw points below the minimap
         font = pygame.font.SysFont("arial", 20)
         points_text = font.render(f"Points: {self.points}", True, (255, 255, 255))
+        count_surfaces()
         points_x = self.minimap_rect.x + (self.minimap_rect.width - points_text.get_width()) // 2
         points_y = self.minimap_rect.y + self.minimap_rect.height + 5
         win.blit(points_text, (points_x, points_y))
@@ -164,8 +173,8 @@ class UI:
         if not self.inventory_open:
             return
         w, h = 700, 450
-        x = WIDTH // 2 - w // 2
-        y = HEIGHT // 2 - h // 2
+        x = win.get_width() // 2 - w // 2
+        y = win.get_height() // 2 - h // 2
         overlay = pygame.Surface((w, h), pygame.SRCALPHA)
         overlay.fill((10, 10, 10, 220))
         win.blit(overlay, (x, y))
@@ -178,8 +187,8 @@ class UI:
         if not self.options_open:
             return
         w, h = 600, 380
-        x = WIDTH // 2 - w // 2
-        y = HEIGHT // 2 - h // 2
+        x = win.get_width() // 2 - w // 2
+        y = win.get_height() // 2 - h // 2
         overlay = pygame.Surface((w, h), pygame.SRCALPHA)
         overlay.fill((12, 12, 12, 230))
         win.blit(overlay, (x, y))
@@ -262,7 +271,8 @@ class UI:
     def draw(self, win, offset_x):
         # Damage flash effect
         if self.damage_flash > 0:
-            flash_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+            flash_surface = pygame.Surface(win.get_size(), pygame.SRCALPHA)
+            count_surfaces()
             alpha = int(self.damage_flash * 100)
             flash_surface.fill((255, 0, 0, alpha))
             win.blit(flash_surface, (0, 0))
@@ -277,8 +287,8 @@ class UI:
         font2 = pygame.font.SysFont("arial", 16)
         ab_w = 80
         ab_h = 80
-        ab_x = WIDTH//2 - (len(self.abilities)*ab_w)//2
-        ab_y = HEIGHT-100
+        ab_x = win.get_width()//2 - (len(self.abilities)*ab_w)//2
+        ab_y = win.get_height()-100
 
         for i, ab in enumerate(self.abilities):
             s = pygame.Surface((ab_w, ab_h), pygame.SRCALPHA)
@@ -312,45 +322,113 @@ class UI:
                 color = (0,255,0)
             win.blit(font2.render(cd_txt, True, color),
                     (ab_x+i*ab_w+10, ab_y+55))
+            count_surfaces(4)  # background and three labels
 
         self.draw_minimap(win, offset_x)
         self.draw_inventory(win)
         self.draw_options(win)
 
 
-def draw(window, background, bg_image, player, objects, offset_x, ui, monsters=None, camera_y=0):
-    """Draw world with horizontal scrolling only."""
+def draw(window, background, bg_image, player, objects, offset_x, ui, monsters=None, camera_y=0,
+         world_surface=None):
+    """
+    Draw world with horizontal scrolling only.
+    If world_surface is given the world is drawn there at its own (logical)
+    resolution and presented to the window with one scaled blit; the HUD is
+    always drawn on top at the window's native resolution.
+    """
+    target = window if world_surface is None else world_surface
+    draw_world_layer(target, bg_image, player, objects, offset_x, monsters, camera_y)
+    present_world(window, target, ui, offset_x)
+
+
+def draw_world_layer(target, bg_image, player, objects, offset_x, monsters=None, camera_y=0):
+    """Draw background, objects, monsters and player into target; returns how many were culled."""
     bg_width = bg_image.get_width()
     bg_height = bg_image.get_height()
     
-    tiles_x = WIDTH // bg_width + 2
-    tiles_y = HEIGHT // bg_height + 2
+    tiles_x = target.get_width() // bg_width + 2
+    tiles_y = target.get_height() // bg_height + 2
     
     # Draw background
     for y in range(tiles_y):
         for x in range(tiles_x):
             bg_x = x * bg_width - (offset_x * 0.3) % bg_width
             bg_y = y * bg_height
-            window.blit(bg_image, (int(bg_x), int(bg_y)))
+            target.blit(bg_image, (int(bg_x), int(bg_y)))
+
+    # Only objects overlapping the view are drawn
+    view = pygame.Rect(int(offset_x), int(camera_y), target.get_width(), target.get_height())
+    culled = 0
 
     # Draw objects
     for obj in objects:
-        if not getattr(obj, 'invisible', False):
-            window.blit(obj.image, (obj.rect.x - offset_x, obj.rect.y - camera_y))
+        if not view.colliderect(obj.rect):
+            culled += 1
+        elif not getattr(obj, 'invisible', False):
+            target.blit(obj.image, (obj.rect.x - offset_x, obj.rect.y - camera_y))
 
     # Draw monsters
     if monsters:
         for monster in monsters:
-            monster.draw(window, offset_x, camera_y)
+            if view.colliderect(monster.rect):
+                monster.draw(target, offset_x, camera_y)
+            else:
+                culled += 1
 
     # Draw player
-    window.blit(player.sprite, (player.rect.x - offset_x, player.rect.y - camera_y))
+    target.blit(player.sprite, (player.rect.x - offset_x, player.rect.y - camera_y))
+    return culled
+
+
+LETTERBOX_COLOR = (0, 0, 0)
+
+
+def present_rect(window_size, render_size):
+    """Where a render_size frame is shown in the window: scaled uniformly and centred."""
+    ww, wh = window_size
+    rw, rh = render_size
+    scale = min(ww / rw, wh / rh)
+    w, h = round(rw * scale), round(rh * scale)
+    return pygame.Rect((ww - w) // 2, (wh - h) // 2, w, h)
+
+
+def window_to_render(window, pos):
+    """Map a window position (e.g. a mouse event's pos) to render-resolution coordinates."""
+    render_size = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+    rect = present_rect(window.get_size(), render_size)
+    return (int((pos[0] - rect.x) * render_size[0] / rect.width),
+            int((pos[1] - rect.y) * render_size[1] / rect.height))
+
+
+def scale_to_window(window, world_surface):
+    """
+    Copy a finished world frame to the window, scaling it if the sizes
+    differ. The aspect ratio is kept; the bars left over are filled.
+    """
+    if world_surface is not window:
+        if world_surface.get_size() == window.get_size():
+            window.blit(world_surface, (0, 0))
+            return
+        rect = present_rect(window.get_size(), world_surface.get_size())
+        if rect.size != window.get_size():
+            ww, wh = window.get_size()
+            if rect.x:
+                window.fill(LETTERBOX_COLOR, (0, 0, rect.x, wh))
+                window.fill(LETTERBOX_COLOR, (rect.right, 0, ww - rect.right, wh))
+            if rect.y:
+                window.fill(LETTERBOX_COLOR, (0, 0, ww, rect.y))
+                window.fill(LETTERBOX_COLOR, (0, rect.bottom, ww, wh - rect.bottom))
+        pygame.transform.scale(world_surface, rect.size, window.subsurface(rect))
+
+
+def present_world(window, world_surface, ui, offset_x):
+    """Copy (scaling if needed) a finished world frame to the window, then draw the HUD over it."""
+    scale_to_window(window, world_surface)
 
     # Draw UI
     ui.draw(window, offset_x)
 
-    pygame.display.update()
-
 
 def spawn_monsters_on_surfaces(objects, num_monsters=3, monster_size=(40,40)):
     """Spawn monsters on platform surfaces."""
@@ -358,7 +436,7 @@ def spawn_monsters_on_surfaces(objects, num_monsters=3, monster_size=(40,40)):
     if not blocks:
         return []
 
-    choices = random.sample(blocks, min(num_monsters, len(blocks)))
+    choices = _random.sample(blocks, min(num_monsters, len(blocks)))
     monsters = []
     
     for b in choices:
@@ -366,7 +444,7 @@ def spawn_monsters_on_surfaces(objects, num_monsters=3, monster_size=(40,40)):
         mx = b.rect.x + (b.rect.width - mw) // 2
         my = b.rect.y - mh
         mon = Monster(mx, my, mw, mh)
-        mon.dir = random.choice([-1, 1])
+        mon.dir = _random.choice([-1, 1])
         monsters.append(mon)
 
     return monsters
\ No newline at end of file
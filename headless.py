@@ -0,0 +1,130 @@
+"""
+Headless simulation: steps a Game as fast as the CPU allows.
+
+Uses SDL's dummy video driver, never opens a real window and draws
+nothing unless a renderer is given. Input comes from an input source
+(controls.ScriptedInput by default), so runs are repeatable.
+
+    python headless.py --ticks 3600
+"""
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import settings
+from controls import ScriptedInput, sprint_right
+from game import Game
+from gui import get_background
+from player import Player, get_block_image
+
+
+class NullRenderer:
+    """Renderer that discards every snapshot; stands in for RenderThread."""
+    def __init__(self):
+        self.frames = 0
+
+    def submit(self, snapshot):
+        self.frames += 1
+
+    def acquire_frame(self, wait=False):
+        return None
+
+    def stop(self):
+        pass
+
+
+class HeadlessResult:
+    def __init__(self, ticks, seconds, game):
+        self.ticks = ticks
+        self.seconds = seconds
+        self.game = game
+
+    @property
+    def ticks_per_second(self):
+        return self.ticks / self.seconds if self.seconds else float("inf")
+
+    def format(self):
+        realtime = self.ticks_per_second / settings.FPS
+        return (f"simulated {self.ticks} ticks in {self.seconds:.2f}s: "
+                f"{self.ticks_per_second:,.0f} ticks/s ({realtime:.1f}x real time)")
+
+
+def init_headless():
+    """Initialise pygame without a real window and load what the simulation needs."""
+    pygame.init()
+    # the player's sprites (and so its hitbox) only load once a display exists
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+    Player.ensure_sprites_loaded()
+    get_block_image(settings.BLOCK_SIZE)
+
+
+def run_headless(ticks, source=None, renderer=None, respawn=True, game=None, on_tick=None):
+    """
+    Step a Game for the given number of ticks without any frame limiting.
+    source defaults to ScriptedInput(sprint_right). With a renderer, a
+    snapshot is submitted every tick (NullRenderer measures snapshot cost
+    only). respawn=True restarts the game on death so the run keeps going.
+    on_tick(game, tick) is called after every step.
+    """
+    init_headless()
+    source = source or ScriptedInput(sprint_right)
+    game = game or Game()
+    dt = 1.0 / settings.FPS
+    bg_image = get_background("Blue.png")[1] if renderer is not None else None
+    start = time.perf_counter()
+    for tick in range(ticks):
+        frame = source.poll()
+        for event in frame.events:
+            if event.type == pygame.QUIT:
+                return HeadlessResult(tick, time.perf_counter() - start, game)
+            game.handle_event(event)
+        if game.is_dead and respawn:
+            game.reset()
+        if not game.paused:
+            game.step(frame, dt)
+        if renderer is not None:
+            renderer.submit(game.snapshot(bg_image))
+        if on_tick is not None:
+            on_tick(game, tick)
+    return HeadlessResult(ticks, time.perf_counter() - start, game)
+
+
+def check_reset(ticks=300, seed=1):
+    """
+    Respawn determinism check: the first Game of a process, and a Game made
+    after another has played `ticks` ticks, both with the rng streams seeded
+    to seed, must start in the same state. Returns (fresh hash, later hash).
+    Run it before any other Game exists in the process.
+    """
+    import rng
+    init_headless()
+    rng.seed(seed)
+    fresh = Game().state_hash()
+    run_headless(ticks, respawn=False)
+    rng.seed(seed)
+    return fresh, Game().state_hash()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the simulation headless as fast as possible")
+    parser.add_argument("--ticks", type=int, default=settings.FPS * 60,
+                        help="ticks to simulate (default: one minute of game time)")
+    parser.add_argument("--snapshots", action="store_true",
+                        help="build a render snapshot every tick into a null renderer")
+    parser.add_argument("--check-reset", action="store_true",
+                        help="check that a new Game after a played one starts like a fresh process's first")
+    args = parser.parse_args()
+    if args.check_reset:
+        import sys
+        fresh, later = check_reset()
+        print(f"fresh start {fresh}, start after play {later}: " + ("match" if fresh == later else "DIFFER"))
+        sys.exit(0 if fresh == later else 1)
+    result = run_headless(args.ticks, renderer=NullRenderer() if args.snapshots else None)
+    print(result.format())
@@ -0,0 +1,147 @@
+"""
+Frame hitch detection.
+
+HitchDetector looks at every timed frame (whenever Game.timer is running)
+and, for frames over budget, builds a report of that frame's phase times
+and what else happened in it: sections streamed in or dropped, monsters
+spawned, objects cleaned up, garbage collections, and anything the loop
+noted itself (a resolution change, a respawn). The last KEEP reports stay
+in memory for the overlay; with a path they are also appended to a JSON
+lines file as they happen. Between timed frames it collects nothing and
+its gc callback is unregistered.
+"""
+import gc
+import json
+import time
+from collections import deque
+
+import settings
+
+BUDGET_FACTOR = 2  # frames over this many frame times count as hitches
+KEEP = 20
+
+
+class HitchReport:
+    def __init__(self, frame, total, phases, causes):
+        self.frame = frame
+        self.time = time.time()
+        self.total_ms = total * 1000
+        self.phases_ms = {name: seconds * 1000 for name, seconds in phases.items()}
+        self.causes = causes
+
+    @property
+    def worst_phase(self):
+        if not self.phases_ms:
+            return None
+        return max(self.phases_ms, key=self.phases_ms.get)
+
+    def as_dict(self):
+        return {
+            "frame": self.frame,
+            "time": round(self.time, 3),
+            "frame_ms": round(self.total_ms, 3),
+            "worst_phase": self.worst_phase,
+            "phases_ms": {name: round(ms, 3) for name, ms in self.phases_ms.items()},
+            "causes": self.causes,
+        }
+
+    def format(self):
+        worst = self.worst_phase
+        text = f"#{self.frame} {self.total_ms:.1f} ms"
+        if worst:
+            text += f", {worst} {self.phases_ms[worst]:.1f}"
+        if self.causes:
+            text += ": " + ", ".join(self.causes)
+        return text
+
+
+class HitchDetector:
+    def __init__(self, budget=None, keep=KEEP, path=None):
+        self.budget = BUDGET_FACTOR / settings.FPS if budget is None else budget
+        self.reports = deque(maxlen=keep)
+        self.count = 0
+        self.frames = 0
+        self._notes = []
+        self._gc = []  # (generation, collected, seconds) finished this frame
+        self._gc_start = None
+        self._before = None
+        self._file = open(path, "a") if path else None
+        self._timing = False  # between start_frame and end_frame/discard_frame
+
+    def _on_gc(self, phase, info):
+        if not self._timing:
+            return
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            self._gc.append((info["generation"], info["collected"], time.perf_counter() - self._gc_start))
+            self._gc_start = None
+
+    def note(self, cause):
+        """Record something that happened this frame, reported if the frame hitches."""
+        if self._timing:
+            self._notes.append(cause)
+
+    def start_frame(self, game):
+        self._notes = []
+        self._gc = []
+        self._timing = True
+        if self._on_gc not in gc.callbacks:  # only listens while frames are timed
+            gc.callbacks.append(self._on_gc)
+        # evicted sections drop their tiles, so count new keys rather than growth
+        self._before = (set(game.world.generator.sections), tuple(game.world.active),
+                        len(game.objects), len(game.monsters))
+
+    def end_frame(self, game, timer):
+        """Check the frame timer just finished; returns a HitchReport for a hitch, else None."""
+        self.frames += 1
+        report = None
+        if timer is not None and timer.last is not None and timer.last[0] > self.budget:
+            total, phases = timer.last
+            report = HitchReport(self.frames, total, phases, self._causes(game))
+            self.count += 1
+            self.reports.append(report)
+            if self._file is not None:
+                self._file.write(json.dumps(report.as_dict()) + "\n")
+                self._file.flush()
+        self.discard_frame()
+        return report
+
+    def discard_frame(self):
+        """Stop collecting for a started frame that will not be checked (paused, or timing turned off)."""
+        self._timing = False
+        self._notes = []
+        self._gc = []
+        self._gc_start = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def _causes(self, game):
+        causes = list(self._notes)
+        if self._before is not None:
+            tiles, active, objects, monsters = self._before
+            world = game.world
+            built = [s for s in world.active if s not in active]
+            dropped = [s for s in active if s not in world.active]
+            generated = sum(1 for s in world.generator.sections if s not in tiles)
+            if generated > 0:
+                causes.append(f"generated {generated} section(s)")
+            if built:
+                causes.append(f"built section(s) {', '.join(map(str, built))}")
+            if dropped:
+                causes.append(f"dropped {len(dropped)} section(s)")
+            spawned = len(game.monsters) - monsters
+            if spawned > 0:
+                causes.append(f"spawned {spawned} monsters")
+            removed = objects - len(game.objects)
+            if removed > 0:
+                causes.append(f"removed {removed} objects")
+        for generation, collected, seconds in self._gc:
+            causes.append(f"gc gen{generation} {seconds * 1000:.1f} ms ({collected} collected)")
+        return causes
+
+    def close(self):
+        self.discard_frame()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,224 @@
+"""
+Per-frame metrics recording for long runs.
+
+MetricsRecorder takes one dict per frame and hands it to a writer thread,
+so the frame path only pays for building the dict and a queue put. Files
+are JSON lines (or CSV when the path ends in .csv) and rotate by size:
+run.jsonl, run.jsonl.1, run.jsonl.2, ... A CSV file also rotates when a
+row brings a column its header lacks (a phase first timed mid-run), so
+every file's header covers all of its rows.
+
+Enable from the game with --metrics PATH or the GAME_METRICS environment
+variable. Summarise a recording with
+
+    python metrics.py run.jsonl [run.jsonl.1 ...]
+"""
+import csv
+import gc
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from perf import percentile
+
+ENV_VAR = "GAME_METRICS"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+RSS_EVERY = 30  # frames between RSS reads
+
+
+def read_rss():
+    """Resident set size in bytes, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # peak rather than current RSS; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsRecorder:
+    """
+    Buffered, rotating per-frame metrics writer.
+    record() is safe to call every frame; the file is written by a
+    background thread in batches.
+    """
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=5):
+        self.path = path
+        self.csv = path.lower().endswith(".csv")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.start = time.perf_counter()
+        self.frames = 0
+        self._rss = None
+        self._queue = queue.SimpleQueue()
+        self._columns = []  # CSV columns so far, in first-seen order
+        self._known = set()
+        self._header = False  # CSV header written to the current file
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def sample(self, game, timer=None, **extra):
+        """Build and record the standard per-frame sample for a Game."""
+        if self.frames % RSS_EVERY == 0:
+            self._rss = read_rss()
+        row = {
+            "frame": self.frames,
+            "t": round(time.perf_counter() - self.start, 4),
+        }
+        if timer is not None and timer.last is not None:
+            total, phases = timer.last
+            row["frame_ms"] = round(total * 1000, 3)
+            for name, seconds in phases.items():
+                row[f"{name}_ms"] = round(seconds * 1000, 3)
+        row.update({
+            "objects": len(game.objects),
+            "monsters": len(game.monsters),
+            "sections": len(game.world.generator.sections),
+            "active_sections": len(game.world.active),
+            "rss_mb": None if self._rss is None else round(self._rss / 1048576, 1),
+        })
+        for generation, stats in enumerate(gc.get_stats()):
+            row[f"gc{generation}"] = stats["collections"]
+        row.update(extra)
+        self.record(row)
+
+    def record(self, row):
+        self.frames += 1
+        self._queue.put(row)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    # writer thread
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            rows = [row for row in batch if row is not None]
+            if rows:
+                self._write(rows)
+            if done:
+                if self._file is not None:
+                    self._file.close()
+                return
+            time.sleep(0.05)  # let a batch build up instead of writing every frame
+
+    def _open(self):
+        self._file = open(self.path, "w", newline="")
+        self._header = False
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    def _write(self, rows):
+        if self._file is None:
+            self._open()
+        if self.csv:
+            self._write_csv(rows)
+        else:
+            self._file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _write_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self._columns)
+        for row in rows:
+            new = [key for key in row if key not in self._known]
+            if new:
+                self._columns = self._columns + new
+                self._known.update(new)
+                writer = csv.DictWriter(buffer, self._columns)
+                if self._header:
+                    self._file.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+                    self._rotate()  # the new file gets the wider header
+            if not self._header:
+                csv.writer(buffer).writerow(self._columns)
+                self._header = True
+            writer.writerow(row)
+        self._file.write(buffer.getvalue())
+
+
+def recorder_from(path=None, max_mb=None):
+    """A MetricsRecorder for path (or $GAME_METRICS), or None when recording is off."""
+    path = path or os.environ.get(ENV_VAR)
+    if not path:
+        return None
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return MetricsRecorder(path, max_bytes=max_bytes)
+
+
+def _rotation(path):
+    head, _, tail = path.rpartition(".")
+    return (head, int(tail)) if tail.isdigit() and head else (path, 0)
+
+
+def load(paths):
+    """Read rows from JSON-lines or CSV recordings, oldest rotated file first."""
+    rows = []
+    for path in sorted(paths, key=lambda p: -_rotation(p)[1]):
+        with open(path, newline="") as f:
+            if _rotation(path)[0].lower().endswith(".csv"):
+                for row in csv.DictReader(f):
+                    rows.append({k: float(v) if v else None for k, v in row.items()})
+            else:
+                rows.extend(json.loads(line) for line in f if line.strip())
+    return rows
+
+
+def summarise(rows):
+    """Text tables of timing percentiles and resource ranges for recorded rows."""
+    if not rows:
+        return "no frames recorded"
+    timing = [k for k in rows[0] if k.endswith("_ms")]
+    for row in rows:
+        timing.extend(k for k in row if k.endswith("_ms") and k not in timing)
+    lines = [f"{len(rows)} frames over {rows[-1]['t'] - rows[0]['t']:.1f}s",
+             f"{'metric':<18}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)"]
+    for key in timing:
+        values = [row[key] for row in rows if row.get(key) is not None]
+        if values:
+            lines.append(f"{key[:-3]:<18}{sum(values) / len(values):9.2f}{percentile(values, 50):9.2f}"
+                         f"{percentile(values, 95):9.2f}{percentile(values, 99):9.2f}{max(values):9.2f}")
+    lines.append(f"{'counter':<18}{'min':>9}{'p50':>9}{'max':>9}")
+    for key in ("objects", "monsters", "sections", "active_sections", "rss_mb"):
+        values = [row[key] for row in rows if row.get(key) is not None]
+        if values:
+            lines.append(f"{key:<18}{min(values):9.1f}{percentile(values, 50):9.1f}{max(values):9.1f}")
+    gc_keys = sorted(k for k in rows[0] if k.startswith("gc") and k[2:].isdigit())
+    if gc_keys:
+        counts = ", ".join(f"gen{k[2:]} {rows[-1][k] - rows[0][k]:.0f}" for k in gc_keys)
+        lines.append(f"gc collections: {counts}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python metrics.py RECORDING [ROTATED ...]")
+    print(summarise(load(sys.argv[1:])))
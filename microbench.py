@@ -0,0 +1,236 @@
+"""
+Micro-benchmarks for the collision, generation and spawning hot paths.
+
+Every case runs against worlds of 1k, 10k and 100k generated blocks so the
+scaling is visible, on SDL's dummy driver with a fixed seed. Results are
+per-call timings (median and best of several repeats) written as JSON, and
+can be checked against a saved baseline like bench.py.
+
+    python microbench.py                       # all cases at all sizes
+    python microbench.py collide monster_update --sizes 1000 10000
+    python microbench.py --save-baseline
+    python microbench.py --baseline microbench_baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import rng
+import settings
+from gui import UI, spawn_monsters_on_surfaces
+from monster import Monster
+from player import (Player, collide, handle_vertical_collision, handle_ledge_grab,
+                    generate_cubes, get_block_image)
+from controls import KeyState
+from world_gen import WorldGenerator, materialise
+
+SIZES = (1000, 10000, 100000)
+DEFAULT_OUT = "microbench_results.json"
+DEFAULT_BASELINE = "microbench_baseline.json"
+SEED = 1234
+BS = settings.BLOCK_SIZE
+GROUND_Y = settings.RENDER_HEIGHT - BS * 4
+
+_worlds = {}
+
+
+def world(size):
+    """size generated Blocks, starting under the player (cached per size)."""
+    if size not in _worlds:
+        gen = WorldGenerator(BS)
+        blocks = []
+        index = 0
+        while len(blocks) < size:
+            blocks.extend(materialise(gen.section_tiles(index, GROUND_Y), BS, index))
+            index += 1
+        _worlds[size] = blocks[:size]
+    return _worlds[size]
+
+
+def player_on(blocks):
+    b = blocks[len(blocks) // 2]
+    player = Player(b.rect.x, b.rect.y - 50, 50, 50)
+    player.update()
+    return player
+
+
+# Each case takes a world size and returns a zero-argument callable to time.
+
+def case_collide(size):
+    objects = world(size)
+    player = player_on(objects)
+    return lambda: collide(player, objects, settings.PLAYER_VEL * 2)
+
+
+def case_vertical_collision(size):
+    objects = world(size)
+    player = player_on(objects)
+    player.rect.y += 2  # overlapping the block below
+    return lambda: handle_vertical_collision(player, objects, 1)
+
+
+def case_ledge_grab(size):
+    objects = world(size)
+    player = player_on(objects)
+    # falling in open air with the grab button held: every call scans for a ledge and finds none
+    player.rect.y -= BS * 20
+    player.jump_count = 1
+    player.y_vel = 2
+    keys, buttons = KeyState(), (False, False, True)
+    return lambda: handle_ledge_grab(player, objects, 1 / settings.FPS, BS, keys, buttons)
+
+
+def case_generate_section(size):
+    # sections needed for size blocks, regenerated from a cold cache each call
+    sections = max(1, size // 65)
+
+    def run():
+        gen = WorldGenerator(BS)
+        for i in range(sections):
+            gen.generate_section(i, GROUND_Y)
+    return run
+
+
+def case_generate_cubes(size):
+    occupied = {(b.rect.x, b.rect.y) for b in world(size)}
+    span = max(x for x, _ in occupied)
+    rect = pygame.Rect(100, GROUND_Y - 50, 50, 50)
+    return lambda: generate_cubes(0, span, 50, BS, set(occupied), GROUND_Y, rect, max_vertical_gap=BS * 4)
+
+
+def case_spawn_monsters(size):
+    objects = world(size)
+    return lambda: spawn_monsters_on_surfaces(objects, num_monsters=5, monster_size=(40, 40))
+
+
+def case_monster_update(size):
+    objects = world(size)
+    player = player_on(objects)
+    monster = Monster(player.rect.x + 200, player.rect.y, 40, 40)
+    return lambda: monster.update(1 / settings.FPS, objects, player)
+
+
+def case_update_minimap(size):
+    objects = world(size)
+    player = player_on(objects)
+    ui = UI(player, objects)
+    monsters = spawn_monsters_on_surfaces(objects, num_monsters=20)
+    cam_x = player.rect.centerx - settings.RENDER_WIDTH // 2
+    return lambda: ui.update_minimap(player, objects, cam_x, 0, monsters)
+
+
+CASES = {
+    "collide": case_collide,
+    "vertical_collision": case_vertical_collision,
+    "ledge_grab": case_ledge_grab,
+    "generate_section": case_generate_section,
+    "generate_cubes": case_generate_cubes,
+    "spawn_monsters": case_spawn_monsters,
+    "monster_update": case_monster_update,
+    "update_minimap": case_update_minimap,
+}
+
+
+def measure(fn, repeats=5, min_time=0.05):
+    """Per-call seconds for fn as (median, best) over repeats of an auto-sized loop."""
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    runs = [elapsed / number]
+    for _ in range(repeats - 1):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - t) / number)
+    runs.sort()
+    return runs[len(runs) // 2], runs[0], number
+
+
+def run_case(name, size, repeats=5):
+    rng.seed(SEED)
+    fn = CASES[name](size)
+    median, best, number = measure(fn, repeats)
+    return {"median_us": median * 1e6, "best_us": best * 1e6, "loops": number}
+
+
+def compare(results, baseline, threshold=0.15):
+    """Regression messages for cases whose median got slower than threshold allows."""
+    regressions = []
+    for key, new in results["cases"].items():
+        old = baseline.get("cases", {}).get(key)
+        if old and new["median_us"] > old["median_us"] * (1 + threshold):
+            regressions.append(f"{key}: {old['median_us']:.1f} -> {new['median_us']:.1f} us "
+                               f"(+{(new['median_us'] / old['median_us'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run hot-path micro-benchmarks")
+    parser.add_argument("cases", nargs="*", help=f"cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="world sizes in blocks")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    unknown = [n for n in args.cases if n not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    Player.ensure_sprites_loaded()
+    get_block_image(BS)
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "cases": {},
+    }
+    for name in args.cases or CASES:
+        for size in args.sizes:
+            result = run_case(name, size, args.repeats)
+            results["cases"][f"{name}@{size}"] = result
+            print(f"{name:<20}{size:>8,} blocks  median {result['median_us']:12.1f} us  "
+                  f"best {result['best_us']:12.1f} us", flush=True)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+        print("no regressions against", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
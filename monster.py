@@ -1,6 +1,9 @@
 import pygame
-import random
 from settings import PLAYER_VEL, FPS
+import rng
+from perf import count_surfaces
+
+_random = rng.stream("monsters")
 
   
 class Monster:
@@ -17,7 +20,8 @@ class Monster:
         h = h or self.DEFAULT_SIZE[1]
         self.rect = pygame.Rect(x, y, w, h)
         self.image = pygame.Surface((w, h), pygame.SRCALPHA)
-        rand = random.randint(0, 1)  # 0 = left, 1 = right
+        count_surfaces()
+        rand = _random.randint(0, 1)  # 0 = left, 1 = right
         self.dir = 1 if rand == 1 else -1
         pygame.draw.rect(self.image, self.COLOR, (0, 0, w, h))
         # Draw "eye" to show direction
@@ -29,7 +33,7 @@ class Monster:
         self.x_vel = 0
         self.y_vel = 0
         self.direction_timer = 0
-        self.direction_change_interval = random.uniform(0.5, 5.0)
+        self.direction_change_interval = _random.uniform(0.5, 5.0)
 
     def update(self, dt, objects=None, player=None):
         """Monster with patrolling behavior and collision avoidance."""
@@ -37,10 +41,10 @@ class Monster:
 
         # Change direction randomly every 0.5-5 seconds
         if self.direction_timer >= self.direction_change_interval:
-            rand = random.randint(0, 1)  # 0 = left, 1 = right
+            rand = _random.randint(0, 1)  # 0 = left, 1 = right
             self.dir = 1 if rand == 1 else -1
             self.direction_timer = 0
-            self.direction_change_interval = random.uniform(0.5, 5.0)
+            self.direction_change_interval = _random.uniform(0.5, 5.0)
 
         # Check for collision with sprites above
         if objects:
@@ -87,6 +91,7 @@ class Monster:
         # Update the monster's appearance based on direction
         w, h = self.rect.width, self.rect.height
         self.image = pygame.Surface((w, h), pygame.SRCALPHA)
+        count_surfaces()
         pygame.draw.rect(self.image, self.COLOR, (0, 0, w, h))
         # Draw "eye" to show direction
         eye_color = (255, 255, 0)
@@ -0,0 +1,360 @@
+"""
+Platform navigation graph over WorldGenerator sections.
+
+Spans (horizontal runs of tiles at the same height) are the nodes. Edges
+are walk, drop, jump and double-jump moves derived from the player's jump
+physics. The graph is built per section from the generator's tile data and
+cached alongside it, so it works headless and never touches pygame.
+"""
+import heapq
+import math
+import time
+from collections import OrderedDict, deque
+
+from settings import FPS, PLAYER_VEL
+
+WALK, DROP, JUMP, DOUBLE_JUMP = "walk", "drop", "jump", "double_jump"
+
+# extra cost per move so paths prefer walking over jumping
+EDGE_PENALTY = {WALK: 0, DROP: 24, JUMP: 48, DOUBLE_JUMP: 96}
+
+
+class JumpProfile:
+    """
+    How far the player can travel horizontally while rising or falling a
+    given height. Mirrors Player.loop: a jump sets y_vel to -jump_speed and
+    gravity ramps up with fall_count; a double jump resets y_vel but not
+    fall_count. Horizontal speed is run_speed per frame and can be held back,
+    so anything inside the arc is reachable.
+    """
+    def __init__(self, gravity=1, jump_speed=8, run_speed=PLAYER_VEL, fps=FPS, max_drop=3000):
+        self.run_speed = run_speed
+        self.max_drop = max_drop
+        # frames until the descending arc passes each height, indexed by rise + max_drop
+        self.fall_frames = self._frames(self._arc(gravity, fps, 0.0, None, None))
+        self.jump_frames = self._frames(self._arc(gravity, fps, -jump_speed, None, None))
+        double = [-1] * len(self.jump_frames)
+        for second in range(1, 2 * fps):
+            frames = self._frames(self._arc(gravity, fps, -jump_speed, second, -jump_speed))
+            double = [max(a, b) for a, b in zip(double, frames)]
+        self.double_frames = double
+
+    def _arc(self, gravity, fps, vel, second_at, second_vel):
+        """Yield the rise (px, up is positive) after each frame."""
+        y = 0.0
+        fall_count = 0
+        frame = 0
+        while y < self.max_drop:
+            frame += 1
+            if frame == second_at:
+                vel = second_vel
+            vel += min(1, (fall_count / fps) * gravity)
+            y += vel
+            fall_count += 1
+            yield frame, -y
+
+    def _frames(self, arc):
+        frames = [-1] * (self.max_drop * 2 + 1)
+        # scanning backwards, the first frame at or above a height is the
+        # last one in time: the descending pass where the player can land
+        best = -self.max_drop - 1
+        for frame, rise in reversed(list(arc)):
+            top = min(math.floor(rise), self.max_drop)
+            if top > best:
+                for h in range(best + 1, top + 1):
+                    frames[h + self.max_drop] = frame
+                best = top
+        return frames
+
+    def reach(self, kind, rise):
+        """Horizontal px coverable by a move that ends rise px higher, or -1."""
+        if kind == DROP:
+            frames = self.fall_frames
+        elif kind == JUMP:
+            frames = self.jump_frames
+        else:
+            frames = self.double_frames
+        i = int(rise) + self.max_drop
+        if not 0 <= i < len(frames) or frames[i] < 0:
+            return -1
+        return frames[i] * self.run_speed
+
+
+class Span:
+    """A walkable platform top: tiles from left to right at height y."""
+    __slots__ = ("section", "index", "left", "right", "y")
+
+    def __init__(self, section, index, left, right, y):
+        self.section = section
+        self.index = index
+        self.left = left
+        self.right = right
+        self.y = y
+
+    @property
+    def key(self):
+        return (self.section, self.index)
+
+    @property
+    def centerx(self):
+        return (self.left + self.right) // 2
+
+    def __repr__(self):
+        return f"Span({self.section}:{self.index} x={self.left}..{self.right} y={self.y})"
+
+
+def build_spans(section_index, tiles, block_size):
+    """Merge a section's exposed tiles into spans of contiguous tiles at the same height."""
+    rows = {}
+    for i in range(0, len(tiles), 2):
+        rows.setdefault(tiles[i + 1], set()).add(tiles[i])
+    spans = []
+    for y in sorted(rows):
+        # a tile directly on top of another covers it; only exposed tops are walkable,
+        # so a row partly built over splits into the runs left uncovered
+        above = rows.get(y - block_size, ())
+        xs = sorted(x for x in rows[y] if x not in above)
+        if not xs:
+            continue
+        left = prev = xs[0]
+        for x in xs[1:]:
+            if x > prev + block_size:
+                spans.append(Span(section_index, len(spans), left, prev + block_size, y))
+                left = x
+            prev = x
+        spans.append(Span(section_index, len(spans), left, prev + block_size, y))
+    return spans
+
+
+def classify_edge(a, b, profile):
+    """Return (kind, cost) for the cheapest move from span a to span b, or None."""
+    gap = max(0, b.left - a.right, a.left - b.right)
+    rise = a.y - b.y  # screen y grows downwards
+    if rise == 0 and gap == 0:
+        kind = WALK
+    elif rise < 0 and gap <= profile.reach(DROP, rise):
+        kind = DROP
+    elif gap <= profile.reach(JUMP, rise):
+        kind = JUMP
+    elif gap <= profile.reach(DOUBLE_JUMP, rise):
+        kind = DOUBLE_JUMP
+    else:
+        return None
+    cost = abs(b.centerx - a.centerx) + abs(rise) + EDGE_PENALTY[kind]
+    return kind, cost
+
+
+class SectionNav:
+    """Spans and intra-section edges for one section, tied to its tile array."""
+    def __init__(self, section_index, tiles, block_size, profile):
+        self.index = section_index
+        self.tiles = tiles
+        self.spans = build_spans(section_index, tiles, block_size)
+        self.edges = {span.key: [] for span in self.spans}
+        link(self.spans, self.spans, self.edges, profile)
+
+
+def link(sources, targets, edges, profile):
+    """Add every reachable edge from sources to targets into edges."""
+    horizon = max(profile.reach(DROP, -profile.max_drop), 0)
+    for a in sources:
+        out = edges.setdefault(a.key, [])
+        for b in targets:
+            if a is b or b.left - a.right > horizon or a.left - b.right > horizon:
+                continue
+            edge = classify_edge(a, b, profile)
+            if edge is not None:
+                out.append((b, edge[0], edge[1]))
+
+
+class NavGraph:
+    """
+    Incremental navigation graph over a WorldGenerator.
+    Sections are built on demand and rebuilt only when their tile array
+    changes (e.g. after WorldGenerator.remove_tile). Path queries are cached
+    with the tile arrays of the sections they searched, and a hit is only
+    returned while those arrays are still the generator's. The newest max_sections
+    sections and cache_size paths are kept.
+
+    The generator's tile cache holds one ground line at a time, so a graph
+    sharing the game's generator must use the game's ground_y; a mismatch
+    raises ValueError instead of wiping the game's sections.
+    """
+    def __init__(self, generator, ground_y, profile=None, cache_size=256, max_sections=512):
+        self.generator = generator
+        self.ground_y = ground_y
+        self._check_ground()
+        self.profile = profile or JumpProfile()
+        self.sections = OrderedDict()
+        self.max_sections = max_sections
+        self.links = {}  # (s, s + 1) -> {span key: [edges]} across the boundary
+        self.path_cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def _check_ground(self):
+        current = self.generator.sections_ground_y
+        if current is not None and current != self.ground_y:
+            raise ValueError(f"generator holds sections for ground_y {current}, not {self.ground_y}; "
+                             f"give the graph its own WorldGenerator")
+
+    def section(self, index):
+        """Return the SectionNav for a section, rebuilding it if its tiles changed."""
+        self._check_ground()
+        tiles = self.generator.section_tiles(index, self.ground_y)
+        nav = self.sections.get(index)
+        if nav is None or nav.tiles is not tiles:
+            nav = SectionNav(index, tiles, self.generator.block_size, self.profile)
+            self.sections[index] = nav
+            self._drop_links(index)
+            self.path_cache.clear()
+            if len(self.sections) > self.max_sections:
+                old, _ = self.sections.popitem(last=False)
+                self._drop_links(old)
+        else:
+            self.sections.move_to_end(index)
+        return nav
+
+    def _drop_links(self, index):
+        self.links.pop((index - 1, index), None)
+        self.links.pop((index, index + 1), None)
+
+    def _boundary(self, left_index):
+        key = (left_index, left_index + 1)
+        edges = self.links.get(key)
+        if edges is None:
+            left, right = self.section(left_index), self.section(left_index + 1)
+            edges = {}
+            link(left.spans, right.spans, edges, self.profile)
+            link(right.spans, left.spans, edges, self.profile)
+            self.links[key] = edges
+        return edges
+
+    def neighbours(self, span):
+        """Yield (span, kind, cost) for every move out of span."""
+        s = span.section
+        yield from self.section(s).edges.get(span.key, ())
+        for left_index in (s - 1, s):
+            yield from self._boundary(left_index).get(span.key, ())
+
+    def span_at(self, x, bottom, tolerance=None):
+        """Return the span a body with feet at (x, bottom) is standing on or above."""
+        if tolerance is None:
+            tolerance = self.generator.block_size
+        best = None
+        s = self.generator.section_at(x)
+        for index in (s - 1, s, s + 1):
+            for span in self.section(index).spans:
+                if span.left <= x <= span.right and 0 <= span.y - bottom <= tolerance:
+                    if best is None or span.y < best.y:
+                        best = span
+        return best
+
+    def find_path(self, start, goal, max_nodes=5000):
+        """A* from span start to span goal; returns [(span, kind), ...] or None."""
+        key = (start.key, goal.key)
+        cached = self.path_cache.get(key)
+        if cached is not None:
+            path, depends = cached
+            tiles = self.generator.sections
+            # a stomp or an eviction replaces a section's tile array without
+            # passing through section(), so check the arrays the search read
+            if all(tiles.get(index) is array for index, array in depends):
+                self.path_cache.move_to_end(key)
+                return path
+            del self.path_cache[key]
+
+        def heuristic(span):
+            return abs(goal.centerx - span.centerx) + abs(goal.y - span.y)
+
+        counter = 0
+        frontier = [(heuristic(start), counter, start)]
+        came_from = {start.key: None}
+        cost_so_far = {start.key: 0}
+        path = None
+        searched = set()
+        while frontier and len(came_from) <= max_nodes:
+            _, _, current = heapq.heappop(frontier)
+            searched.add(current.section)
+            if current.key == goal.key:
+                path = []
+                step = (current, None)
+                while step is not None:
+                    path.append(step)
+                    step = came_from[step[0].key]
+                path.reverse()
+                # shift kinds so each entry says how that span was reached
+                path = [(span, path[i - 1][1] if i else None) for i, (span, _) in enumerate(path)]
+                break
+            for nxt, kind, cost in self.neighbours(current):
+                new_cost = cost_so_far[current.key] + cost
+                if nxt.key not in cost_so_far or new_cost < cost_so_far[nxt.key]:
+                    cost_so_far[nxt.key] = new_cost
+                    came_from[nxt.key] = (current, kind)
+                    counter += 1
+                    heapq.heappush(frontier, (new_cost + heuristic(nxt), counter, nxt))
+
+        # neighbours() reads the section on either side of each expanded span
+        indices = {i for s in searched for i in (s - 1, s, s + 1)}
+        depends = tuple((i, self.section(i).tiles) for i in sorted(indices))
+        self.path_cache[key] = (path, depends)
+        if len(self.path_cache) > self.cache_size:
+            self.path_cache.popitem(last=False)
+        return path
+
+    def next_waypoint(self, from_rect, to_rect):
+        """
+        For a chasing enemy at from_rect: return (x, y, kind) of the next span
+        to head for on the way to to_rect, or None when there is no route.
+        """
+        start = self.span_at(from_rect.centerx, from_rect.bottom)
+        goal = self.span_at(to_rect.centerx, to_rect.bottom, tolerance=self.generator.block_size * 6)
+        if start is None or goal is None:
+            return None
+        path = self.find_path(start, goal)
+        if not path or len(path) < 2:
+            return None
+        span, kind = path[1]
+        return span.centerx, span.y, kind
+
+    def section_traversable(self, index, band=None):
+        """
+        True if the section can be crossed left to right: some span near its
+        left edge connects to some span near its right edge using only the
+        section's own spans.
+        """
+        nav = self.section(index)
+        if band is None:
+            band = self.generator.block_size * 4
+        start_x = index * self.generator.section_pixels
+        end_x = start_x + self.generator.section_pixels
+        entries = [s for s in nav.spans if s.left < start_x + band]
+        exits = {s.key for s in nav.spans if s.right > end_x - band}
+        seen = {s.key for s in entries}
+        queue = deque(entries)
+        while queue:
+            span = queue.popleft()
+            if span.key in exits:
+                return True
+            for nxt, _, _ in nav.edges[span.key]:
+                if nxt.key not in seen:
+                    seen.add(nxt.key)
+                    queue.append(nxt)
+        return False
+
+    def validate_sections(self, indices):
+        """Return the list of section indices that cannot be crossed."""
+        return [i for i in indices if not self.section_traversable(i)]
+
+
+if __name__ == "__main__":
+    import settings
+    from world_gen import WorldGenerator
+
+    gen = WorldGenerator(settings.BLOCK_SIZE)
+    graph = NavGraph(gen, settings.RENDER_HEIGHT - settings.BLOCK_SIZE * 4)
+    count = 2000
+    start = time.perf_counter()
+    blocked = graph.validate_sections(range(count))
+    elapsed = time.perf_counter() - start
+    print(f"validated {count} sections in {elapsed:.2f}s ({count / elapsed:,.0f} sections/s), "
+          f"{len(blocked)} not traversable")
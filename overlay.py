@@ -0,0 +1,106 @@
+"""
+In-game performance overlay (toggle with F3).
+
+Shows a rolling frame-time graph, the average time of each frame phase
+over the last half second, a few live counters and the latest hitches,
+in a panel left of the minimap. While it is off nothing is timed: the main loop
+only touches it behind `if overlay.enabled` checks and Game.timer stays None.
+The surfaces counter reads perf.surfaces_allocated, a plain integer the
+per-frame drawing code bumps with count_surfaces() where it makes surfaces.
+"""
+import pygame
+
+import perf
+from perf import PhaseTimer
+
+HISTORY = 120  # frames kept for the graph
+AVERAGE = 30  # frames averaged for the phase bars
+BUDGET_MS = 1000 / 60
+
+PANEL_W, PANEL_H = 260, 300
+HITCH_LINES = 3
+GRAPH_H = 50
+BAR_COLOR = (90, 200, 255)
+OVER_BUDGET = (255, 90, 90)
+
+
+class PerfOverlay:
+    def __init__(self):
+        self.enabled = False
+        self.timer = None
+        self.counters = {}
+        self._surfaces_start = 0
+        self._font = None
+        self._panel = None
+
+    def toggle(self, timer=None):
+        """
+        Switch the overlay on or off; returns its PhaseTimer (None when off).
+        timer: an already running PhaseTimer to display instead of a new one.
+        """
+        self.enabled = not self.enabled
+        if self.enabled:
+            self.timer = timer
+            if self.timer is None:
+                self.timer = PhaseTimer(keep=HISTORY)
+                self.timer.start_frame()  # switched on mid-frame: time the rest of it
+            self._surfaces_start = perf.surfaces_allocated
+        else:
+            self.timer = None
+        return self.timer
+
+    def start_frame(self):
+        self._surfaces_start = perf.surfaces_allocated
+
+    def end_frame(self, **counters):
+        """Record the finished frame's counters (objects, monsters, culled...)."""
+        counters["surfaces"] = perf.surfaces_allocated - self._surfaces_start
+        self.counters = counters
+
+    def draw(self, win, minimap_rect, hitches=()):
+        if self._font is None:
+            self._font = pygame.font.Font(None, 18)
+            self._panel = pygame.Surface((PANEL_W, PANEL_H), pygame.SRCALPHA)
+        panel, font = self._panel, self._font
+        panel.fill((0, 0, 0, 170))
+
+        # Rolling frame-time graph, scaled so the top is two frame budgets
+        frames = list(self.timer.frames)
+        scale = GRAPH_H / (BUDGET_MS * 2)
+        x0 = PANEL_W - len(frames) * 2 - 6
+        for i, seconds in enumerate(frames):
+            ms = seconds * 1000
+            h = min(GRAPH_H, int(ms * scale))
+            color = OVER_BUDGET if ms > BUDGET_MS else BAR_COLOR
+            pygame.draw.line(panel, color, (x0 + i * 2, 6 + GRAPH_H), (x0 + i * 2, 6 + GRAPH_H - h))
+        budget_y = 6 + GRAPH_H - int(BUDGET_MS * scale)
+        pygame.draw.line(panel, (255, 255, 255), (6, budget_y), (PANEL_W - 6, budget_y))
+        last = frames[-1] * 1000 if frames else 0.0
+        panel.blit(font.render(f"frame {last:5.1f} ms", True, (255, 255, 255)), (8, 8))
+
+        # Per-phase bars: mean over the last AVERAGE frames
+        y = GRAPH_H + 14
+        for name, samples in self.timer.phases.items():
+            recent = list(samples)[-AVERAGE:]
+            ms = sum(recent) / len(recent) * 1000 if recent else 0.0
+            width = min(110, int(ms / BUDGET_MS * 110))
+            pygame.draw.rect(panel, BAR_COLOR, (90, y + 3, max(1, width), 8))
+            panel.blit(font.render(name, True, (220, 220, 220)), (8, y))
+            panel.blit(font.render(f"{ms:5.2f}", True, (220, 220, 220)), (205, y))
+            y += 13
+
+        # Counters, two per line
+        y += 4
+        items = [f"{k} {v}" for k, v in self.counters.items()]
+        for i in range(0, len(items), 2):
+            panel.blit(font.render("   ".join(items[i:i + 2]), True, (255, 255, 160)), (8, y))
+            y += 13
+
+        # Latest hitch reports (HitchDetector), newest first, clipped to the panel
+        if hitches:
+            y += 4
+            for report in list(hitches)[-HITCH_LINES:][::-1]:
+                panel.blit(font.render(report.format(), True, OVER_BUDGET), (8, y))
+                y += 13
+
+        win.blit(panel, (minimap_rect.left - PANEL_W - 10, minimap_rect.top))
@@ -0,0 +1,160 @@
+"""Timing helpers for measuring where the game spends its time."""
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from tracing import tracer
+
+# Surfaces made by per-frame drawing code, counted where they are made;
+# the overlay shows how many each frame adds.
+surfaces_allocated = 0
+
+
+def count_surfaces(n=1):
+    global surfaces_allocated
+    surfaces_allocated += n
+
+
+class StartupReport:
+    """
+    Collects named startup phases and the time to the first rendered frame.
+    start is the perf_counter() value the report counts from (e.g. taken
+    before the heavy imports).
+    """
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self.time_to_first_frame = None
+        self.time_to_full_world = None
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name):
+        t = time.perf_counter()
+        try:
+            with tracer.span(name, "startup"):
+                yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def first_frame(self):
+        if self.time_to_first_frame is None:
+            self.time_to_first_frame = time.perf_counter() - self.start
+
+    def full_world(self):
+        if self.time_to_full_world is None:
+            self.time_to_full_world = time.perf_counter() - self.start
+
+    def as_dict(self):
+        totals = {}
+        for name, seconds in self.phases:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return {
+            "phases_ms": {name: seconds * 1000 for name, seconds in totals.items()},
+            "time_to_first_frame_ms": None if self.time_to_first_frame is None else self.time_to_first_frame * 1000,
+            "time_to_full_world_ms": None if self.time_to_full_world is None else self.time_to_full_world * 1000,
+        }
+
+    def format(self):
+        data = self.as_dict()
+        lines = ["Startup report"]
+        for name, ms in data["phases_ms"].items():
+            lines.append(f"  {name:<16}{ms:9.1f} ms")
+        for label, key in (("first frame", "time_to_first_frame_ms"), ("full world", "time_to_full_world_ms")):
+            if data[key] is not None:
+                lines.append(f"  {label:<16}{data[key]:9.1f} ms")
+        return "\n".join(lines)
+
+
+def percentile(samples, p):
+    """p-th percentile (0-100) of samples by nearest rank; 0.0 for no samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarise(samples):
+    """Mean and p50/p95/p99 of a list of durations in seconds, as milliseconds."""
+    if not samples:
+        return {"mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        "mean": sum(samples) / len(samples) * 1000,
+        "p50": percentile(samples, 50) * 1000,
+        "p95": percentile(samples, 95) * 1000,
+        "p99": percentile(samples, 99) * 1000,
+    }
+
+
+class FrameStats:
+    """Per-frame work time (excluding the frame-limiter sleep), summarised as mean and percentiles."""
+    def __init__(self):
+        self.samples = []
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        return percentile(self.samples, p)
+
+    def format(self):
+        if not self.samples:
+            return "Frame stats: no frames"
+        s = summarise(self.samples)
+        return (f"Frame stats over {len(self.samples)} frames: mean {s['mean']:.2f} ms, "
+                f"p50 {s['p50']:.2f} ms, p95 {s['p95']:.2f} ms, p99 {s['p99']:.2f} ms")
+
+
+class PhaseTimer:
+    """
+    Splits frames into named phases. Call start_frame(), then lap(name) after
+    each phase (time since the previous lap is charged to name), then
+    end_frame(). Every frame gets a sample for every phase seen so far.
+    - keep: only hold the most recent keep frames (for live displays)
+    - groups: {lap name: recorded name} to merge fine-grained laps
+    """
+    def __init__(self, keep=None, groups=None):
+        self.keep = keep
+        self.groups = groups or {}
+        self.frames = self._series()
+        self.phases = {}  # name -> [seconds per frame]
+        self._current = {}
+        self._frame_start = self._last = None
+        self.last = None  # (frame seconds, {phase: seconds}) of the latest finished frame
+
+    def _series(self, initial=()):
+        return list(initial) if self.keep is None else deque(initial, maxlen=self.keep)
+
+    def start_frame(self):
+        self._current = {}
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        name = self.groups.get(name, name)
+        self._current[name] = self._current.get(name, 0.0) + now - self._last
+        if tracer.enabled:
+            tracer.complete(name, self._last, now, "phase")
+        self._last = now
+
+    def end_frame(self):
+        for name in self._current:
+            if name not in self.phases:
+                self.phases[name] = self._series([0.0] * len(self.frames))
+        for name, samples in self.phases.items():
+            samples.append(self._current.get(name, 0.0))
+        now = time.perf_counter()
+        total = now - self._frame_start
+        if tracer.enabled:
+            tracer.complete("frame", self._frame_start, now, "frame", {"frame": len(self.frames)})
+        self.frames.append(total)
+        self.last = (total, {name: samples[-1] for name, samples in self.phases.items()})
+
+    def summary(self):
+        return {
+            "frames": len(self.frames),
+            "frame_ms": summarise(self.frames),
+            "phases_ms": {name: summarise(samples) for name, samples in self.phases.items()},
+        }
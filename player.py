@@ -1,8 +1,12 @@
-import random
 import pygame
-from os import listdir
-from os.path import isfile, join
+from bisect import bisect_left, bisect_right, insort
+from os.path import join
 from settings import PLAYER_VEL, FPS, BLOCK_SIZE, WIDTH, HEIGHT
+from assets import assets
+from atlas import load_atlas
+import rng
+
+_random = rng.stream("terrain")
 
 # Utility: flip sprite surfaces horizontally (not used for cube but kept for assets)
 def flip(sprites):
@@ -12,39 +16,18 @@ def flip(sprites):
 
 def load_sprite_sheets(dir1, dir2, width, height, direction=False):
 	"""
-	Loads and slices sprite sheets. This should only be called when a pygame
-	display surface exists (convert_alpha requires an initialized display).
+	Loads sliced sprite frames. Frames come from the on-disk atlas cache
+	(see atlas.py) as subsurface views, so nothing is re-sliced at startup.
 	"""
-	path = join("Assets", dir1, dir2)
-	images = [f for f in listdir(path) if isfile(join(path, f))]
+	return load_atlas(join("Assets", dir1, dir2), width, height, direction)[0]
 
-	all_sprites = {}
 
-	for image in images:
-		# Load image normally; convert_alpha will be applied only when display exists
-		img = pygame.image.load(join(path, image))
-		# if display is initialized we can safely convert_alpha
-		try:
-			if pygame.display.get_surface() is not None:
-				img = img.convert_alpha()
-		except Exception:
-			# fallback: keep raw Surface
-			pass
-		sprites = []
-		for i in range(img.get_width() // width):
-			surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
-			rect = pygame.Rect(i * width, 0, width, height)
-			surface.blit(img, (0, 0), rect)
-			sprites.append(pygame.transform.scale2x(surface))
-
-		if direction:
-			key_base = image.replace(".png", "")
-			all_sprites[key_base + "_right"] = sprites
-			all_sprites[key_base + "_left"] = flip(sprites)
-		else:
-			all_sprites[image.replace(".png", "")] = sprites
+def sprite_masks(dir1, dir2, width, height, direction=False):
+	"""Return {frame Surface: Mask} for frames from load_sprite_sheets."""
+	return load_atlas(join("Assets", dir1, dir2), width, height, direction)[1]
+
 
-	return all_sprites
+TERRAIN_PATH = join("Assets", "Terrain", "3aa9ff21fc29b32.png")
 
 
 def get_block(size):
@@ -52,17 +35,22 @@ def get_block(size):
 	Return a block Surface taken from the terrain tilesheet.
 	This is used to draw ground/platform visuals.
 	"""
-	path = join("Assets", "Terrain", "3aa9ff21fc29b32.png")
-	image = pygame.image.load(path)
-	try:
-		if pygame.display.get_surface() is not None:
-			image = image.convert_alpha()
-	except Exception:
-		pass
-	surface = pygame.Surface((size, size), pygame.SRCALPHA, 32)
-	rect = pygame.Rect(96, 0, size, size)
-	surface.blit(image, (0, 0), rect)
-	return pygame.transform.scale2x(surface)
+	def build():
+		image = assets.image(TERRAIN_PATH)
+		surface = pygame.Surface((size, size), pygame.SRCALPHA, 32)
+		rect = pygame.Rect(96, 0, size, size)
+		surface.blit(image, (0, 0), rect)
+		return pygame.transform.scale2x(surface)
+	return assets.get(("block", TERRAIN_PATH, size), build)
+
+
+def get_block_image(size):
+	"""Return the (image, mask) shared by every Block of this size."""
+	def build():
+		image = pygame.Surface((size, size), pygame.SRCALPHA)
+		image.blit(get_block(size), (0, 0))
+		return image, pygame.mask.from_surface(image)
+	return assets.get(("block_image", TERRAIN_PATH, size), build)
 
 
 # Player class (originally animated; kept sprites support)
@@ -86,6 +74,7 @@ class Player(pygame.sprite.Sprite):
 	GRAVITY = 1
 	# don't load sprites at import-time (display may not be ready)
 	SPRITES = {}
+	MASKS = {}  # sprite frame -> precomputed collision mask
 	ANIMATION_DELAY = 3
 
 	# Add ledge-hold defaults
@@ -302,7 +291,8 @@ class Player(pygame.sprite.Sprite):
 	def update(self):
 		"""Recompute rect and collision mask from the current sprite Surface."""
 		self.rect = self.sprite.get_rect(topleft=(self.rect.x, self.rect.y))
-		self.mask = pygame.mask.from_surface(self.sprite)
+		mask = self.MASKS.get(self.sprite)
+		self.mask = mask if mask is not None else pygame.mask.from_surface(self.sprite)
 
 	def draw(self, win, offset_x):
 		"""Blit the player sprite to the window, offset by camera offset_x."""
@@ -359,18 +349,20 @@ class Player(pygame.sprite.Sprite):
 
 		try:
 			cls.SPRITES = load_sprite_sheets("MainCharacter", "", 32, 32, True)
+			cls.MASKS = sprite_masks("MainCharacter", "", 32, 32, True)
 		except Exception:
 			# if loading fails (missing assets or other error) leave SPRITES empty
 			cls.SPRITES = {}
+			cls.MASKS = {}
 
 
 # Generic object base class used for blocks, fire traps, etc.
 class Object(pygame.sprite.Sprite):
-	def __init__(self, x, y, width, height, name=None):
+	def __init__(self, x, y, width, height, name=None, image=None):
 		super().__init__()
 		# Objects store their own surface in .image and position in .rect
 		self.rect = pygame.Rect(x, y, width, height)
-		self.image = pygame.Surface((width, height), pygame.SRCALPHA)
+		self.image = image if image is not None else pygame.Surface((width, height), pygame.SRCALPHA)
 		self.width = width
 		self.height = height
 		self.name = name
@@ -386,13 +378,13 @@ class Object(pygame.sprite.Sprite):
 class Block(Object):
 	"""
 	Terrain block. Uses get_block to get a consistent tile graphic.
-	.mask is created for pixel-perfect collision checks.
+	Blocks never change their image, so all blocks of a size share one
+	image and one collision mask from the asset cache.
 	"""
 	def __init__(self, x, y, size):
-		super().__init__(x, y, size, size)
-		block = get_block(size)
-		self.image.blit(block, (0, 0))
-		self.mask = pygame.mask.from_surface(self.image)
+		image, mask = get_block_image(size)
+		super().__init__(x, y, size, size, image=image)
+		self.mask = mask
 
 
 def handle_vertical_collision(player, objects, dy):
@@ -429,8 +421,10 @@ def collide(player, objects, dx):
 
 
 # Handle keyboard input and prevent movement into colliding objects
-def handle_move(player, objects):
-	keys = pygame.key.get_pressed()
+def handle_move(player, objects, keys=None):
+	"""keys defaults to the live keyboard state; pass a key state to drive the player from elsewhere."""
+	if keys is None:
+		keys = pygame.key.get_pressed()
 
 	player.x_vel = 0
 	# pre-check collisions a bit further to avoid tunneling on fast movement
@@ -475,12 +469,15 @@ def update_ground(objects, block_size, offset_x, ground_y):
 
 
 # Replace the dummy ledge handler with a real implementation
-def handle_ledge_grab(player, objects, dt, block_size):
+def handle_ledge_grab(player, objects, dt, block_size, keys=None, mouse_buttons=None):
 	"""
 	Manage ledge grabbing/holding using right mouse button as the grab key.
+	keys and mouse_buttons default to the live keyboard and mouse state.
 	"""
+	if mouse_buttons is None:
+		mouse_buttons = pygame.mouse.get_pressed()
 	# use right mouse button (index 2) for grabbing
-	right_pressed = pygame.mouse.get_pressed()[2]
+	right_pressed = mouse_buttons[2]
 
 	# If already holding, maintain or release
 	if player.holding:
@@ -495,7 +492,8 @@ def handle_ledge_grab(player, objects, dt, block_size):
 			return
 
 		# Allow jump while holding (release + jump)
-		keys = pygame.key.get_pressed()
+		if keys is None:
+			keys = pygame.key.get_pressed()
 		if keys[pygame.K_UP] or keys[pygame.K_w] or keys[pygame.K_SPACE]:
 			player.end_hold()
 			player.jump()
@@ -594,6 +592,80 @@ except Exception:
     Player.end_hold = _player_end_hold
 
 
+class _OccupancyGrid:
+	"""
+	Incremental index over occupied (x, y) cells, kept sorted by column and by row
+	so generate_cubes can answer range queries without scanning every cell.
+	"""
+	def __init__(self, cells=()):
+		self.cells = set()
+		self.columns = {}     # x -> sorted ys
+		self.column_xs = []   # sorted column keys
+		self.rows = {}        # y -> sorted xs
+		for (x, y) in cells:
+			if (x, y) not in self.cells:
+				self.cells.add((x, y))
+				self.columns.setdefault(x, []).append(y)
+				self.rows.setdefault(y, []).append(x)
+		for ys in self.columns.values():
+			ys.sort()
+		for xs in self.rows.values():
+			xs.sort()
+		self.column_xs = sorted(self.columns)
+
+	def __contains__(self, cell):
+		return cell in self.cells
+
+	def add(self, x, y):
+		if (x, y) in self.cells:
+			return
+		self.cells.add((x, y))
+		if x not in self.columns:
+			self.columns[x] = []
+			insort(self.column_xs, x)
+		insort(self.columns[x], y)
+		insort(self.rows.setdefault(y, []), x)
+
+	def discard(self, x, y):
+		if (x, y) not in self.cells:
+			return
+		self.cells.discard((x, y))
+		ys = self.columns[x]
+		del ys[bisect_left(ys, y)]
+		if not ys:
+			del self.columns[x]
+			del self.column_xs[bisect_left(self.column_xs, x)]
+		xs = self.rows[y]
+		del xs[bisect_left(xs, x)]
+		if not xs:
+			del self.rows[y]
+
+	def supports_below(self, x, y, reach, max_gap):
+		"""Yield cells (sx, sy) with y < sy <= y + max_gap and |sx - x| <= reach."""
+		lo = bisect_left(self.column_xs, x - reach)
+		hi = bisect_right(self.column_xs, x + reach)
+		for sx in self.column_xs[lo:hi]:
+			ys = self.columns[sx]
+			for sy in ys[bisect_right(ys, y):bisect_right(ys, y + max_gap)]:
+				yield (sx, sy)
+
+	def row_has_between(self, y, lo, hi):
+		"""True if row y has a cell with lo < x < hi."""
+		xs = self.rows.get(y)
+		if not xs:
+			return False
+		i = bisect_right(xs, lo)
+		return i < len(xs) and xs[i] < hi
+
+	def column_has_between(self, x, lo, hi):
+		"""True if column x has a cell with lo < y < hi."""
+		ys = self.columns.get(x)
+		if not ys:
+			return False
+		i = bisect_right(ys, lo)
+		return i < len(ys) and ys[i] < hi
+
+
 def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, player_rect, max_vertical_gap=220, min_gap=None):
 	"""
 	Generate clusters of airborne platforms and single cubes between x_min and x_max.
@@ -609,6 +681,22 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 	attempts = 0
 	max_attempts = num_cubes * 80
 
+	# spatial indexes over the world's occupied cells and this call's placements
+	occupied_grid = _OccupancyGrid(occupied)
+	placed_grid = _OccupancyGrid()
+
+	def place(cell):
+		placed_set.add(cell)
+		placed_grid.add(*cell)
+
+	def unplace(cell):
+		placed_set.discard(cell)
+		placed_grid.discard(*cell)
+
+	def occupy(cell):
+		occupied.add(cell)
+		occupied_grid.add(*cell)
+
 	# horizontal reach used to ensure platforms are accessible from each other (tweak to taste)
 	horizontal_reach = block_size * 4
 
@@ -621,10 +709,8 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 			sy = player_rect.bottom
 			if sy > yp and (sy - yp) <= max_vertical_gap and abs(sx - xp) <= horizontal_reach:
 				return True
-		for (sx, sy) in (set(occupied) | placed_set):
-			if sy <= yp:
-				continue
-			if sy - yp <= max_vertical_gap and abs(sx - xp) <= horizontal_reach:
+		for grid in (occupied_grid, placed_grid):
+			for _ in grid.supports_below(xp, yp, horizontal_reach, max_vertical_gap):
 				return True
 		return False
 
@@ -633,16 +719,11 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 		best = None
 		best_dist = None
 		# prefer existing world occupied blocks
-		for (sx, sy) in occupied:
-			if sy <= yp:
-				continue
-			vert = sy - yp
-			horiz = abs(sx - xp)
-			if vert <= max_vertical_gap and horiz <= horizontal_reach:
-				dist = vert + horiz / (block_size or 1)
-				if best_dist is None or dist < best_dist:
-					best = (sx, sy)
-					best_dist = dist
+		for (sx, sy) in occupied_grid.supports_below(xp, yp, horizontal_reach, max_vertical_gap):
+			dist = (sy - yp) + abs(sx - xp) / (block_size or 1)
+			if best_dist is None or dist < best_dist:
+				best = (sx, sy)
+				best_dist = dist
 		# also consider player as a support candidate if applicable
 		if best is None and player_rect is not None:
 			sx = player_rect.centerx
@@ -660,8 +741,8 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 			y = sy - block_size
 			count = 0
 			max_helpers = max_vertical_gap // block_size + 2
-			while y > yp and (xp, y) not in occupied and (xp, y) not in placed_set and count < max_helpers:
-				placed_set.add((xp, y))
+			while y > yp and (xp, y) not in occupied_grid and (xp, y) not in placed_set and count < max_helpers:
+				place((xp, y))
 				helpers.append(Block(xp, y, block_size))
 				count += 1
 				y -= block_size
@@ -669,21 +750,21 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 				return helpers
 			# rollback
 			for h in helpers:
-				placed_set.discard((h.rect.x, h.rect.y))
+				unplace((h.rect.x, h.rect.y))
 			helpers = []
 
 		# fallback: build from ground upward
 		y = ground_y - block_size
 		count = 0
 		max_helpers = max_vertical_gap // block_size + 2
-		while y > yp and (xp, y) not in occupied and (xp, y) not in placed_set and count < max_helpers:
-			placed_set.add((xp, y))
+		while y > yp and (xp, y) not in occupied_grid and (xp, y) not in placed_set and count < max_helpers:
+			place((xp, y))
 			helpers.append(Block(xp, y, block_size))
 			count += 1
 			y -= block_size
 		if y > yp:
 			for h in helpers:
-				placed_set.discard((h.rect.x, h.rect.y))
+				unplace((h.rect.x, h.rect.y))
 			return []
 		return helpers
 
@@ -693,12 +774,12 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 
 	# candidate heights across the reachable band (more varied - not only fixed layers)
 	candidate_heights = list(range(max_y, min_y - 1, -block_size))
-	random.shuffle(candidate_heights)
+	_random.shuffle(candidate_heights)
 
 	# horizontal grid candidates
 	step = block_size
 	xs = list(range(x_min, x_max - block_size + 1, step))
-	random.shuffle(xs)
+	_random.shuffle(xs)
 
 	while len(placed) < num_cubes and attempts < max_attempts and xs:
 		attempts += 1
@@ -708,25 +789,28 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 		# pick a random height from candidates for this placement (varies heights)
 		if not candidate_heights:
 			continue
-		y = random.choice(candidate_heights)
+		y = _random.choice(candidate_heights)
 
 		# skip exact overlap
-		if any((x0 == ox and abs(y - oy) < 1) for (ox, oy) in occupied) or (x0, y) in placed_set:
+		if occupied_grid.column_has_between(x0, y - 1, y + 1) or (x0, y) in placed_set:
 			continue
 
 		# choose platform length (favor multi-block sometimes)
-		length = random.choice([1,1,2,2,3,4])
+		length = _random.choice([1,1,2,2,3,4])
 
 		if x0 + length * block_size > x_max:
 			continue
 
 		positions = [(x0 + i * block_size, y) for i in range(length)]
 		# avoid overlaps with occupied or already placed in this batch
-		if any(pos in occupied or pos in placed_set for pos in positions):
+		if any(pos in occupied_grid or pos in placed_set for pos in positions):
 			continue
 
-		# spacing check at same y
-		if any(oy == y and any(abs(ox - px) < (block_size + min_gap) for (px, _) in positions) for (ox, oy) in (set(occupied) | placed_set)):
+		# spacing check at same y: no cell closer than block_size + min_gap to any position
+		spacing = block_size + min_gap
+		lo = positions[0][0] - spacing
+		hi = positions[-1][0] + spacing
+		if occupied_grid.row_has_between(y, lo, hi) or placed_grid.row_has_between(y, lo, hi):
 			continue
 
 		# Check accessibility: at least one tile must have support within double-jump distance from ground/platform/player
@@ -747,12 +831,12 @@ def generate_cubes(x_min, x_max, num_cubes, block_size, occupied, ground_y, play
 		# finalize placement: add helpers (already in placed_set) and platform blocks
 		for h in helpers_added:
 			placed.append(h)
-			occupied.add((h.rect.x, h.rect.y))
+			occupy((h.rect.x, h.rect.y))
 
 		for (px, py) in positions:
 			b = Block(px, py, block_size)
 			placed.append(b)
-			placed_set.add((px, py))
-			occupied.add((px, py))
+			place((px, py))
+			occupy((px, py))
 
 	return placed
\ No newline at end of file
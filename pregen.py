@@ -0,0 +1,75 @@
+"""
+Pre-generate world sections into a memory-mapped world file.
+
+    python pregen.py --sections 5000 --workers 8
+
+The game picks the file up from settings.WORLD_FILE and streams sections
+from it, generating live past the end of the file.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import settings
+from world_gen import WorldGenerator, write_world_file, np
+
+CHUNK = 256  # sections per worker task
+
+
+def _generate_chunk(args):
+    block_size, seed, ground_y, first, count = args
+    gen = WorldGenerator(block_size, seed)
+    tiles, offsets = gen.generate_sections(range(first, first + count), ground_y)
+    return bytes(memoryview(tiles)), list(offsets)
+
+
+def pregenerate(path, sections, first=0, seed=42, block_size=settings.BLOCK_SIZE,
+                ground_y=None, workers=None):
+    """Generate sections [first, first + sections) with a process pool and write them to path."""
+    if ground_y is None:
+        # same ground line MAIN.reset_game uses for the starting platform
+        ground_y = settings.RENDER_HEIGHT - block_size * 4
+    gen = WorldGenerator(block_size, seed)
+    jobs = [(block_size, seed, ground_y, start, min(CHUNK, first + sections - start))
+            for start in range(first, first + sections, CHUNK)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_generate_chunk, jobs))
+
+    tiles = bytearray()
+    offsets = [0]
+    for data, chunk_offsets in results:
+        base = len(tiles) // 4
+        offsets.extend(base + o for o in chunk_offsets[1:])
+        tiles.extend(data)
+    tiles = memoryview(tiles).cast('i')
+    if np is not None:
+        tiles = np.frombuffer(tiles, dtype=np.int32)
+    write_world_file(path, gen, ground_y, first, tiles, offsets)
+    return len(offsets) - 1, len(tiles) // 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sections", type=int, default=2000, help="number of sections to generate")
+    parser.add_argument("--first", type=int, default=0, help="index of the first section")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--block-size", type=int, default=settings.BLOCK_SIZE)
+    parser.add_argument("--ground-y", type=int, default=None,
+                        help="ground line in pixels (default: the game's starting platform)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--out", default=settings.WORLD_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count, num_tiles = pregenerate(args.out, args.sections, args.first, args.seed,
+                                   args.block_size, args.ground_y, args.workers)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.out)
+    print(f"wrote {count} sections ({num_tiles} tiles, {size / 1024:.0f} KiB) to {args.out} "
+          f"in {elapsed:.2f}s ({count / elapsed:,.0f} sections/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Profiling a running game.
+
+ProfileCapture (press F4) runs cProfile and tracemalloc over the next N
+frames and writes the results next to each other in PROFILE_DIR:
+
+    profile-20240101-120000-250.prof   cProfile stats (snakeviz, pstats, ...)
+    profile-20240101-120000-250.txt    top functions and the allocation diff
+
+Only the main thread is profiled; with --threaded-render the render
+thread's drawing shows up as time waiting for its frame. tracemalloc
+slows the captured frames down a lot, so their timings are only useful
+relative to each other.
+
+SamplingProfiler (--sample-profile PATH) is cheap enough to leave on for
+a whole session: a background thread looks at the main thread's stack
+every few milliseconds and counts each distinct stack. The output is in
+the collapsed "a;b;c count" format read by flamegraph.pl, speedscope and
+inferno. F5 writes the samples so far; the file is written again on exit.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+DEFAULT_FRAMES = 300
+PROFILE_DIR = "profiles"
+TOP = 40  # rows per table in the text report
+TRACE_DEPTH = 8  # frames kept per allocation traceback
+
+DEFAULT_INTERVAL_MS = 5  # between stack samples
+
+_ALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+
+class ProfileCapture:
+    def __init__(self, frames=DEFAULT_FRAMES, out_dir=PROFILE_DIR):
+        if frames < 1:
+            raise ValueError("a profile capture needs at least one frame")
+        self.frames = frames
+        self.out_dir = out_dir
+        self.active = False
+        self.remaining = 0
+        self._profile = None
+        self._before = None
+        self._start = None
+        self._own_tracemalloc = False
+
+    def trigger(self):
+        """Start capturing the next `frames` frames; False if a capture is already running."""
+        if self.active:
+            return False
+        self._own_tracemalloc = not tracemalloc.is_tracing()
+        if self._own_tracemalloc:
+            tracemalloc.start(TRACE_DEPTH)
+        self._before = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+        tracemalloc.reset_peak()
+        self.active = True
+        self.remaining = self.frames
+        self._start = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        return True
+
+    def end_frame(self):
+        """Count a finished frame; returns the written (prof, txt) paths when the capture completes."""
+        if not self.active:
+            return None
+        self.remaining -= 1
+        if self.remaining > 0:
+            return None
+        return self._finish()
+
+    def _finish(self):
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._start
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(_ALLOC_FILTERS)
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        self.active = False
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("profile-%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        base = os.path.join(self.out_dir, stamp)
+        n = 1
+        while os.path.exists(base + ".prof"):  # never overwrite an earlier capture
+            n += 1
+            base = os.path.join(self.out_dir, f"{stamp}-{n}")
+        prof_path, txt_path = base + ".prof", base + ".txt"
+        self._profile.dump_stats(prof_path)
+        with open(txt_path, "w") as f:
+            f.write(self._report(elapsed, self._before, after, peak - current))
+        self._profile = self._before = None
+        return prof_path, txt_path
+
+    def _report(self, elapsed, before, after, transient):
+        frames = self.frames
+        out = io.StringIO()
+        out.write(f"{frames} frames in {elapsed:.2f}s ({elapsed / frames * 1000:.2f} ms/frame "
+                  f"with profiling overhead)\n")
+        out.write(f"peak traced memory above the end of the capture: {transient / 1024:,.0f} KiB "
+                  f"(short-lived allocations that the diff below does not show)\n\n")
+
+        for order in ("cumulative", "tottime"):
+            out.write(f"== cProfile, top {TOP} by {order} ==\n")
+            pstats.Stats(self._profile, stream=out).sort_stats(order).print_stats(TOP)
+
+        diff = after.compare_to(before, "lineno")
+        grown = [d for d in diff if d.size_diff > 0 or d.count_diff > 0]
+        out.write(f"== tracemalloc, top {TOP} allocation sites by growth ==\n")
+        out.write(f"{'size diff':>12}{'blocks diff':>13}{'blocks/frame':>14}  site\n")
+        for stat in grown[:TOP]:
+            frame = stat.traceback[0]
+            out.write(f"{stat.size_diff:>+12,}{stat.count_diff:>+13,}{stat.count_diff / frames:>14.1f}  "
+                      f"{frame.filename}:{frame.lineno}\n")
+
+        out.write("\n== tracemalloc, top 10 growing tracebacks ==\n")
+        for stat in after.compare_to(before, "traceback")[:10]:
+            if stat.size_diff <= 0:
+                continue
+            out.write(f"{stat.size_diff:+,} bytes in {stat.count_diff:+,} blocks\n")
+            for line in stat.traceback.format():
+                out.write(f"    {line}\n")
+        return out.getvalue()
+
+
+class SamplingProfiler:
+    """
+    Background stack sampler for one thread (the main thread by default).
+    Overhead is bounded by the interval: each sample is one stack walk,
+    and overhead() reports the fraction of wall time spent taking them.
+    The sampler needs the GIL, so samples land where the main thread
+    releases it or at the interpreter's switch interval (5 ms by default).
+    """
+    def __init__(self, path, interval_ms=DEFAULT_INTERVAL_MS, thread_id=None):
+        self.path = path
+        self.interval = interval_ms / 1000
+        self.thread_id = threading.main_thread().ident if thread_id is None else thread_id
+        self.counts = {}  # folded stack -> samples
+        self.samples = 0
+        self.busy = 0.0
+        self._labels = {}  # code object -> frame label
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._start = None
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            t = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            del frame
+            stack.reverse()
+            key = ";".join(stack)
+            with self._lock:
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.samples += 1
+            self.busy += time.perf_counter() - t
+
+    def overhead(self):
+        elapsed = time.perf_counter() - self._start if self._start else 0.0
+        return self.busy / elapsed if elapsed else 0.0
+
+    def write(self, path=None):
+        """Write the collapsed stacks gathered so far; returns the path."""
+        path = path or self.path
+        with self._lock:
+            counts = sorted(self.counts.items())
+        with open(path, "w") as f:
+            for stack, count in counts:
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def stop(self):
+        """Stop sampling and write the final file; returns the path."""
+        self._stop.set()
+        self._thread.join()
+        return self.write()
@@ -0,0 +1,126 @@
+"""
+Threaded world rendering.
+
+The simulation (main thread) publishes an immutable RenderSnapshot each
+tick; a RenderThread draws the newest snapshot into an offscreen buffer
+while the simulation moves on to the next tick. pygame's blits release the
+GIL, so drawing overlaps with physics and AI on multi-core machines. The
+main thread then presents the most recent finished buffer.
+
+Thread ownership:
+- main thread: the display, events, the window surface, the HUD and every
+  game object (Player, Block, Monster, UI). Only it calls display.update.
+- render thread: the world buffers it is drawing into. It reads nothing
+  but the snapshot and never touches game objects or the display.
+- a Surface referenced by a published snapshot is read-only from then on;
+  game code replaces sprite images rather than drawing into them.
+"""
+import threading
+
+import pygame
+
+from tracing import tracer
+
+
+class RenderSnapshot:
+    """Everything needed to draw one world frame, captured at the end of a tick."""
+    __slots__ = ("bg_image", "offset_x", "camera_y", "sprites", "culled")
+
+    def __init__(self, bg_image, offset_x, camera_y, sprites, culled=0):
+        self.bg_image = bg_image
+        self.offset_x = offset_x
+        self.camera_y = camera_y
+        self.sprites = sprites  # tuple of (Surface, x, y) in draw order, already in screen space
+        self.culled = culled  # objects and monsters left out because they were off screen
+
+
+def take_snapshot(view_size, bg_image, player, objects, monsters, offset_x, camera_y):
+    """Capture the visible part of the world; off-screen objects are culled here."""
+    view = pygame.Rect(int(offset_x), int(camera_y), *view_size)
+    sprites = []
+    culled = 0
+    for obj in objects:
+        if not view.colliderect(obj.rect):
+            culled += 1
+        elif not getattr(obj, 'invisible', False):
+            sprites.append((obj.image, obj.rect.x - offset_x, obj.rect.y - camera_y))
+    for monster in monsters or ():
+        if view.colliderect(monster.rect):
+            sprites.append((monster.image, monster.rect.x - offset_x, monster.rect.y - camera_y))
+        else:
+            culled += 1
+    sprites.append((player.sprite, player.rect.x - offset_x, player.rect.y - camera_y))
+    return RenderSnapshot(bg_image, offset_x, camera_y, tuple(sprites), culled)
+
+
+def draw_snapshot(target, snapshot):
+    """Draw a snapshot's world frame into target (same output as gui.draw's world pass)."""
+    bg_image = snapshot.bg_image
+    bg_width = bg_image.get_width()
+    bg_height = bg_image.get_height()
+    scroll = (snapshot.offset_x * 0.3) % bg_width
+    for y in range(target.get_height() // bg_height + 2):
+        for x in range(target.get_width() // bg_width + 2):
+            target.blit(bg_image, (int(x * bg_width - scroll), int(y * bg_height)))
+    target.blits([(image, (x, y)) for image, x, y in snapshot.sprites], doreturn=False)
+
+
+class RenderThread:
+    """
+    Draws submitted snapshots on a background thread.
+    Three buffers rotate between roles: the one being presented (front),
+    the newest finished one (ready) and the one being drawn (back), so the
+    render thread never draws into a surface the main thread is reading.
+    """
+    def __init__(self, size):
+        # convert() needs the display, so the buffers are made on the main thread
+        self.buffers = [pygame.Surface(size).convert() for _ in range(3)]
+        self.front = None
+        self.ready = None
+        self.pending = None  # newest snapshot not yet drawn; older ones are dropped
+        self.frames_drawn = 0
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        with self._cond:
+            self.pending = snapshot
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self.pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                snapshot, self.pending = self.pending, None
+                back = next(i for i in range(3) if i != self.front and i != self.ready)
+            with tracer.span("draw_snapshot", "render"):
+                draw_snapshot(self.buffers[back], snapshot)
+            with self._cond:
+                self.ready = back
+                self.frames_drawn += 1
+                self._cond.notify_all()
+
+    def acquire_frame(self, wait=False):
+        """
+        Return the newest finished buffer for presenting, or None if nothing
+        has been drawn yet. With wait=True, block until a frame is ready.
+        The buffer stays valid until the next call.
+        """
+        with self._cond:
+            if wait:
+                while self._running and self.ready is None and self.front is None:
+                    self._cond.wait()
+            if self.ready is not None:
+                self.front, self.ready = self.ready, None
+            return None if self.front is None else self.buffers[self.front]
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
@@ -0,0 +1,228 @@
+"""
+Input recording and deterministic replay.
+
+MAIN.py --record PATH writes every tick's input (the held GAME_KEYS, mouse
+buttons and the events the Game handled) to a gzip file, along with the
+session seed and a Game.state_hash() every HASH_EVERY ticks. Replaying
+seeds the rng streams the same way and feeds the ticks back; the hashes
+are checked as it goes, so the first checkpoint where the simulation
+differs is reported.
+
+    python replay.py run.rec              # headless, as fast as possible
+    python replay.py run.rec --window     # watch it at normal speed
+    python bench.py --replay run.rec      # time it as a benchmark scenario
+"""
+import gzip
+import json
+import struct
+import time
+
+import pygame
+
+import rng
+import settings
+from controls import GAME_KEYS, RESPAWN, InputFrame, KeyState
+
+MAGIC = b"GREC1\n"
+HASH_EVERY = 60
+
+STEP, STREAMING = 1, 2  # tick flags
+EV_KEY, EV_CLICK, EV_RESPAWN = 0, 1, 2
+
+_TICK = struct.Struct("<BBBB")  # flags, held key bits, mouse button bits, event count
+_KEY = struct.Struct("<i")
+_CLICK = struct.Struct("<Bhh")
+
+
+class InputRecorder:
+    def __init__(self, path, hash_every=HASH_EVERY):
+        self.path = path
+        self.hash_every = hash_every
+        self.ticks = 0
+        self._file = gzip.open(path, "wb")
+        header = {
+            "seed": rng.current_seed(),
+            "fps": settings.FPS,
+            "render_size": [settings.RENDER_WIDTH, settings.RENDER_HEIGHT],
+            "block_size": settings.BLOCK_SIZE,
+            "hash_every": hash_every,
+        }
+        self._file.write(MAGIC + json.dumps(header).encode() + b"\n")
+
+    def tick(self, frame, events, game, stepped):
+        """
+        Record one loop iteration: frame's held input, the events passed to
+        game.handle_event, and whether game.step ran. Call after the step.
+        """
+        keys = frame.keys
+        held = sum(1 << i for i, key in enumerate(GAME_KEYS) if keys[key])
+        buttons = sum(1 << i for i, pressed in enumerate(frame.mouse_buttons[:3]) if pressed)
+        flags = (STEP if stepped else 0) | (STREAMING if game.streaming else 0)
+        parts = []
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                parts.append(bytes((EV_KEY,)) + _KEY.pack(event.key))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                parts.append(bytes((EV_CLICK,)) + _CLICK.pack(event.button, *event.pos))
+            elif event.type == RESPAWN:
+                parts.append(bytes((EV_RESPAWN,)))
+        self._file.write(_TICK.pack(flags, held, buttons, len(parts)) + b"".join(parts))
+        self.ticks += 1
+        if self.ticks % self.hash_every == 0:
+            self._file.write(bytes.fromhex(game.state_hash()))
+
+    def close(self):
+        self._file.close()
+
+
+class Recording:
+    def __init__(self, header, frames, hashes):
+        self.header = header
+        self.frames = frames
+        self.hashes = hashes  # tick index -> state hash after that tick
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not an input recording")
+        end = data.index(b"\n", len(MAGIC))
+        header = json.loads(data[len(MAGIC):end])
+        hash_every = header["hash_every"]
+        frames, hashes = [], {}
+        pos = end + 1
+        while pos < len(data):
+            flags, held, buttons, count = _TICK.unpack_from(data, pos)
+            pos += _TICK.size
+            events = []
+            for _ in range(count):
+                kind = data[pos]
+                pos += 1
+                if kind == EV_KEY:
+                    (key,) = _KEY.unpack_from(data, pos)
+                    pos += _KEY.size
+                    events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+                elif kind == EV_CLICK:
+                    button, x, y = _CLICK.unpack_from(data, pos)
+                    pos += _CLICK.size
+                    events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(x, y)))
+                elif kind == EV_RESPAWN:
+                    events.append(pygame.event.Event(RESPAWN))
+                else:
+                    raise ValueError(f"bad event kind {kind} at byte {pos - 1}")
+            frames.append(InputFrame(
+                events,
+                KeyState(key for i, key in enumerate(GAME_KEYS) if held >> i & 1),
+                tuple(bool(buttons >> i & 1) for i in range(3)),
+                step=bool(flags & STEP),
+                streaming=bool(flags & STREAMING),
+            ))
+            if len(frames) % hash_every == 0 and pos < len(data):
+                hashes[len(frames) - 1] = data[pos:pos + 8].hex()
+                pos += 8
+        return cls(header, frames, hashes)
+
+    def apply_settings(self):
+        """Seed the rng streams and restore the render size the recording was made with."""
+        rng.seed(self.header["seed"])
+        settings.RENDER_WIDTH, settings.RENDER_HEIGHT = self.header["render_size"]
+
+
+class ReplayInput:
+    """Input source that plays a Recording back; poll() returns None once it runs out."""
+    def __init__(self, recording):
+        self.recording = recording
+        self.tick = 0
+
+    def poll(self):
+        if self.tick >= len(self.recording.frames):
+            return None
+        frame = self.recording.frames[self.tick]
+        self.tick += 1
+        return frame
+
+
+class ReplayResult:
+    def __init__(self, ticks, seconds, checked, divergence, game):
+        self.ticks = ticks
+        self.seconds = seconds
+        self.checked = checked
+        self.divergence = divergence  # first tick whose hash differed, or None
+        self.game = game
+
+    def format(self):
+        rate = self.ticks / self.seconds if self.seconds else float("inf")
+        text = f"replayed {self.ticks} ticks in {self.seconds:.2f}s ({rate:,.0f} ticks/s), "
+        if self.divergence is not None:
+            return text + f"DIVERGED at tick {self.divergence}"
+        return text + f"{self.checked} checkpoints matched"
+
+
+def run_replay(path, window=False, verify=True):
+    """Replay a recording into a new Game, headless or drawn in a window at normal speed."""
+    recording = Recording.load(path)
+    recording.apply_settings()
+    if window:
+        from gui import draw, get_background
+        from player import Player, get_block_image
+        pygame.init()
+        win = pygame.display.set_mode((settings.WIDTH, settings.HEIGHT))
+        pygame.display.set_caption(f"replay: {path}")
+        Player.ensure_sprites_loaded()
+        get_block_image(settings.BLOCK_SIZE)
+        background, bg_image = get_background("Blue.png")
+        render_size = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+        world_surface = None if win.get_size() == render_size else pygame.Surface(render_size).convert()
+        clock = pygame.time.Clock()
+    else:
+        from headless import init_headless
+        init_headless()
+    from game import Game
+
+    game = Game()
+    source = ReplayInput(recording)
+    dt = 1.0 / settings.FPS
+    checked = 0
+    divergence = None
+    start = time.perf_counter()
+    while True:
+        frame = source.poll()
+        if frame is None:
+            break
+        tick = source.tick - 1
+        for event in frame.events:
+            game.handle_event(event)
+        game.streaming = frame.streaming
+        if frame.step:
+            game.step(frame, dt)
+        expected = recording.hashes.get(tick)
+        if verify and expected is not None:
+            checked += 1
+            if game.state_hash() != expected:
+                divergence = tick
+                break
+        if window:
+            if any(e.type == pygame.QUIT for e in pygame.event.get()):
+                break
+            game.ui.update_minimap(game.player, game.objects, int(game.camera_x), int(game.camera_y),
+                                   game.monsters)
+            draw(win, background, bg_image, game.player, game.objects, game.camera_x, game.ui,
+                 game.monsters, game.camera_y, world_surface)
+            pygame.display.update()
+            clock.tick(settings.FPS)
+    return ReplayResult(source.tick, time.perf_counter() - start, checked, divergence, game)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Replay an input recording made with MAIN.py --record")
+    parser.add_argument("recording")
+    parser.add_argument("--window", action="store_true", help="draw the replay in a window at normal speed")
+    parser.add_argument("--no-verify", action="store_true", help="skip the state hash checks")
+    args = parser.parse_args()
+    result = run_replay(args.recording, window=args.window, verify=not args.no_verify)
+    print(result.format())
+    sys.exit(1 if result.divergence is not None else 0)
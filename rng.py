@@ -0,0 +1,61 @@
+"""
+Seeded random streams, one per subsystem.
+
+Gameplay code draws from its own stream (stream("monsters"),
+stream("spawning"), ...) instead of the global random module, so one
+subsystem drawing more or fewer numbers cannot shift another's, and
+seed() makes a whole run repeatable. Streams are created on first use and
+reseeded in place, so modules can keep a reference at import time.
+
+Unless seed() is called the session seed is picked at random.
+state() and set_state() let several games share one process, each
+carrying on its own streams.
+"""
+import random
+
+_seed = random.SystemRandom().randrange(1 << 32)
+_streams = {}
+
+
+def _stream_seed(name):
+    # str seeds go through sha512, so streams are independent and stable across runs
+    return f"{_seed}:{name}"
+
+
+def stream(name):
+    """The random.Random for subsystem name."""
+    rng = _streams.get(name)
+    if rng is None:
+        rng = _streams[name] = random.Random(_stream_seed(name))
+    return rng
+
+
+def seed(value):
+    """Reseed every stream from one session seed."""
+    global _seed
+    _seed = int(value)
+    for name, rng in _streams.items():
+        rng.seed(_stream_seed(name))
+
+
+def current_seed():
+    return _seed
+
+
+def state():
+    """Capture the session seed and every stream's position, for set_state()."""
+    return _seed, {name: rng.getstate() for name, rng in _streams.items()}
+
+
+def set_state(captured):
+    """
+    Return to a state() capture. Streams first used after the capture
+    start over from its seed, as if they had not been used yet.
+    """
+    global _seed
+    _seed, positions = captured
+    for name, rng in _streams.items():
+        if name in positions:
+            rng.setstate(positions[name])
+        else:
+            rng.seed(_stream_seed(name))
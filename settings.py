@@ -1,7 +1,15 @@
 # Global settings and constants used across modules
 WIDTH = 1000
 HEIGHT = 800
+# Internal render resolution: the world is drawn at this size and scaled to
+# the window, so fill cost does not grow with the window size
+RENDER_WIDTH = WIDTH
+RENDER_HEIGHT = HEIGHT
+# Draw the world on a background thread from per-tick snapshots (see renderer.py)
+THREADED_RENDER = False
 FPS = 60
+# Loop rate while paused (menus open or window unfocused)
+PAUSED_FPS = 10
 PLAYER_VEL = 5
 BLOCK_SIZE = 96
 
@@ -9,3 +17,6 @@ BLOCK_SIZE = 96
 HEALTH_REGEN_RATE = 1.0
 STAMINA_REGEN_RATE = 8.0
 MANA_REGEN_RATE = 4.0
+
+# Optional pre-generated world (see pregen.py); used when the file exists
+WORLD_FILE = "world.bin"
@@ -0,0 +1,471 @@
+"""
+Soak test: an autopilot plays headless for hours of game time while
+memory, world size and per-tick cost are sampled.
+
+The Autopilot plans its way right over the navigation graph, shoots
+monsters that come close and respawns when it dies. Every sample interval
+(a game minute by default) the run records the mean tick cost, RSS and
+the sizes of the structures that could grow with distance travelled. At
+the end least-squares slopes per game hour and per section travelled are
+fitted to each, and the run fails (exit status 1) when one grows faster
+than its limit.
+
+    python soak.py --hours 2
+    python soak.py --hours 8 --metrics soak.jsonl --max-rss-slope 10
+"""
+import argparse
+import heapq
+import sys
+import time
+
+import pygame
+
+import rng
+import settings
+from assets import assets
+from controls import InputFrame, KeyState, click, key_down, respawn
+from game import Game
+from headless import NullRenderer, init_headless, run_headless
+from metrics import MetricsRecorder, read_rss
+from navigation import DOUBLE_JUMP, DROP, WALK, NavGraph
+from player import Player
+
+SAMPLE_EVERY = settings.FPS * 60  # ticks between samples
+WARMUP = 0.1  # fraction of samples ignored before fitting slopes
+MIN_HOURS = 0.5  # shorter runs are reported but not judged: the slopes are mostly noise
+STUCK_TICKS = settings.FPS * 10  # no progress for this long: the current hop counts as failed
+LOOKAHEAD_SECTIONS = 2  # the autopilot plans this many sections past the one it stands on
+PLAN_NODES = 400  # spans the planner may visit per plan
+MAX_HOP_ATTEMPTS = 3  # a hop that keeps landing back where it started is given up
+MAX_FAILED_HOPS = 4096  # failed hops remembered, so a long run does not pile them up
+TAKEOFF_MARGIN = 16  # px kept between the player and a platform it is rising past
+FOOT_SLACK = 8  # px the feet may sink into the ground before a landing resolves
+LEAP = "leap"  # autopilot-only move: jump, double jump, then dash across a gap the graph has no edge over
+DASH_PX = int(Player.DASH_SPEED * Player.DASH_DURATION)
+SHOOT_RANGE = 4  # blocks: monsters closer than this are clicked
+
+# sampled metrics that slopes are fitted to
+METRICS = ("tick_ms", "rss_mb", "objects", "monsters", "tile_sections", "active_sections",
+           "asset_mb", "asset_entries")
+# metric -> default growth limit per game hour; tick_pct is tick_ms growth
+# as a percentage of the early tick cost, so it holds across machines
+LIMITS = {
+    "tick_pct": 25.0,
+    "rss_mb": 20.0,
+    "objects": 200.0,
+    "tile_sections": 200.0,
+    "asset_mb": 8.0,
+}
+# metric -> default growth limit per section width travelled: everything
+# held per section must be bounded by the streaming window, not the distance
+DISTANCE_LIMITS = {
+    "rss_mb": 0.5,
+    "objects": 2.0,
+    "tile_sections": 0.1,
+    "active_sections": 0.05,
+}
+
+
+class Autopilot:
+    """
+    Input source that plays the game: poll() looks at game and decides this
+    tick's input. It plans over a navigation.NavGraph of the world: from
+    the span it stands on it routes, by the graph's move costs, to the
+    farthest span reachable a few sections ahead, then walks, jumps,
+    double jumps or drops along the route one hop at a time. Where the
+    graph has no way on it leaps (jump, double jump, dash), and past gaps
+    nothing crosses it warps. Hops that fail or kill are remembered and
+    avoided. Monsters that come close are shot with a click. Off the graph
+    (the starting platform) it runs right and jumps at gaps and walls.
+    """
+    def __init__(self, game, lookahead=LOOKAHEAD_SECTIONS):
+        self.game = game
+        self.lookahead = lookahead
+        self.tick = 0
+        self.deaths = 0
+        self.graph = None
+        self.hop = None  # (from span, to span, kind) being carried out
+        self._failed = {}  # (from key, to key) -> attempts that ended back on from
+        self.warps = 0
+        self.distance = 0  # px moved, warps included and respawns left out
+        self._last_x = None
+        self._left_ground = False  # off the ground since the hop was planned
+        self._best_x = None
+        self._best_tick = 0
+
+    def _solid(self, rect):
+        return any(obj.rect.colliderect(rect) for obj in self.game.objects)
+
+    def _graph(self):
+        world = self.game.world
+        if self.graph is None or self.graph.generator is not world.generator:
+            # a small section cache: the bot only ever looks a few sections around itself
+            self.graph = NavGraph(world.generator, world.ground_y, max_sections=4 * (self.lookahead + 2))
+        return self.graph
+
+    def _span_under(self, rect):
+        """The span the player stands on, checked under its middle and then either foot."""
+        graph = self._graph()
+        for x in (rect.centerx, rect.left + FOOT_SLACK, rect.right - FOOT_SLACK):
+            span = graph.span_at(x, rect.bottom - FOOT_SLACK)
+            if span is not None:
+                return span
+        return None
+
+    def _plan(self, span):
+        """Next (from, to, kind) hop towards the farthest span reachable a few sections ahead, or None."""
+        graph = self._graph()
+        last = span.section + self.lookahead
+        # cheapest routes over the graph's moves, leaving out hops that keep failing
+        came_from = {span.key: None}
+        seen = {span.key: span}
+        cost_so_far = {span.key: 0}
+        counter = 0
+        frontier = [(0, counter, span)]
+        while frontier and len(seen) <= PLAN_NODES:
+            cost, _, current = heapq.heappop(frontier)
+            if cost > cost_so_far[current.key]:
+                continue
+            for nxt, kind, step in graph.neighbours(current):
+                new_cost = cost + step
+                if (span.section - 1 <= nxt.section <= last
+                        and self._failed.get((current.key, nxt.key), 0) < MAX_HOP_ATTEMPTS
+                        and new_cost < cost_so_far.get(nxt.key, new_cost + 1)):
+                    cost_so_far[nxt.key] = new_cost
+                    came_from[nxt.key] = (current, kind)
+                    seen[nxt.key] = nxt
+                    counter += 1
+                    heapq.heappush(frontier, (new_cost, counter, nxt))
+        goal = max(seen.values(), key=lambda g: (g.right, -g.y))
+        if goal.right <= span.right:
+            # nothing reachable gets further: leap on to a span past here, if one is in dash range
+            leap = self._leap(seen, last)
+            if leap is None:
+                return None
+            goal, to = leap
+            if goal.key == span.key:
+                return span, to, LEAP
+        # walk the route back to its first hop
+        to = goal
+        while came_from[to.key][0].key != span.key:
+            to = came_from[to.key][0]
+        return span, to, came_from[to.key][1]
+
+    def _warp(self, span):
+        """
+        Put the player on the nearest built span past span. The generator
+        can leave gaps no move crosses; the soak is about streaming, so the
+        run goes on past them instead of dying at the same place forever.
+        """
+        graph = self._graph()
+        ahead = [b for index in range(span.section, span.section + self.lookahead + 1)
+                 for b in graph.section(index).spans if b.left >= span.right]
+        for b in sorted(ahead, key=lambda b: b.left):
+            if self._solid(pygame.Rect(b.left, b.y, settings.BLOCK_SIZE, 1)):
+                player = self.game.player
+                player.rect.x, player.rect.bottom = b.left, b.y
+                player.landed()
+                self.warps += 1
+                return
+
+    def _leap(self, seen, last):
+        """(from, to) for the farthest span outside seen that a jump, double jump and dash reach."""
+        graph = self._graph()
+        best = None
+        for a in seen.values():
+            for index in range(a.section, min(a.section + 1, last) + 1):
+                for b in graph.section(index).spans:
+                    if (b.key in seen or b.left < a.right
+                            or self._failed.get((a.key, b.key), 0) >= MAX_HOP_ATTEMPTS):
+                        continue
+                    reach = graph.profile.reach(DOUBLE_JUMP, a.y - b.y)
+                    if reach >= 0 and b.left - a.right <= reach + DASH_PX and (
+                            best is None or b.right > best[1].right):
+                        best = (a, b)
+        return best
+
+    def _shoot(self, events):
+        game = self.game
+        px, py = game.player.rect.center
+        reach = settings.BLOCK_SIZE * SHOOT_RANGE
+        for m in game.monsters:
+            if abs(m.rect.centerx - px) < reach and abs(m.rect.centery - py) < reach:
+                pos = (m.rect.centerx - int(game.camera_x), m.rect.centery - int(game.camera_y))
+                events.append(click(pos))
+
+    def poll(self):
+        game = self.game
+        self.tick += 1
+        events = pygame.event.get()
+        if game.is_dead:
+            self.deaths += 1
+            self._best_x = self._last_x = None
+            if self.hop is not None:
+                # the respawn rebuilds the same world: never take a hop that killed again
+                self._fail(self.hop, MAX_HOP_ATTEMPTS)
+                self.hop = None
+            return InputFrame(events + [respawn()], KeyState())
+        self._shoot(events)
+        player = game.player
+        rect = player.rect
+        if self._last_x is not None:
+            self.distance += abs(rect.x - self._last_x)
+        self._last_x = rect.x
+
+        if self._best_x is None or rect.x > self._best_x:
+            self._best_x, self._best_tick = rect.x, self.tick
+        if self.tick - self._best_tick > STUCK_TICKS:
+            # no progress for a while: whatever the current hop is, it is not working
+            self._best_tick = self.tick
+            if self.hop is not None:
+                self._fail(self.hop)
+                self.hop = None
+
+        grounded = self._solid(pygame.Rect(rect.x, rect.bottom, rect.width, 2))
+        if grounded:
+            span = self._span_under(rect)
+            if span is None:
+                # off the graph: the starting platform, or a foot's width past the edge of a hop's start
+                if self.hop is None:
+                    return self._run_right(events)
+                return self._take_off(events, *self.hop)
+            if self.hop is not None and self.hop[0].key == span.key and self._left_ground:
+                self._fail(self.hop)  # took off and came back down
+            if self.hop is None or self.hop[0].key != span.key or self._left_ground:
+                self.hop = self._plan(span)
+            self._left_ground = False
+            if self.hop is None:
+                self._warp(span)
+                return InputFrame(events, KeyState())
+            return self._take_off(events, *self.hop)
+        self._left_ground = True
+        if self.hop is None:
+            return self._run_right(events)
+        return self._in_air(events, *self.hop)
+
+    def _fail(self, hop, attempts=1):
+        key = (hop[0].key, hop[1].key)
+        self._failed[key] = self._failed.pop(key, 0) + attempts
+        if len(self._failed) > MAX_FAILED_HOPS:
+            del self._failed[next(iter(self._failed))]  # forget the longest untouched
+
+    def _run_right(self, events):
+        """Fallback off the graph: run right, jumping at gaps, walls and ledges and dashing over gaps."""
+        game = self.game
+        player = game.player
+        rect = player.rect
+        bs = settings.BLOCK_SIZE
+        grounded = player.jump_count == 0
+        gap_ahead = not self._solid(pygame.Rect(rect.right, rect.bottom, bs // 4, bs * 3))
+        wall_ahead = self._solid(pygame.Rect(rect.right, rect.top, bs // 2, rect.height - 8))
+        ledge_ahead = (self._solid(pygame.Rect(rect.right, rect.top - bs * 2, bs, bs * 2))
+                       and not self._solid(pygame.Rect(rect.x, rect.top - bs * 2, rect.width, bs * 2)))
+        falling_into_gap = player.y_vel > 0 and not self._solid(
+            pygame.Rect(rect.x, rect.bottom, rect.width + bs, bs * 4))
+        if grounded and (gap_ahead or wall_ahead or ledge_ahead):
+            events.append(key_down(pygame.K_SPACE))
+        elif player.jump_count == 1 and player.y_vel >= 0 and (falling_into_gap or wall_ahead or ledge_ahead):
+            events.append(key_down(pygame.K_SPACE))  # top of the first jump: double jump
+        elif player.jump_count == 2 and falling_into_gap:
+            events.append(key_down(pygame.K_q))  # out of jumps: dash to carry over the gap
+        return InputFrame(events, KeyState((pygame.K_d,)))
+
+    def _toward(self, x, target):
+        if target > x + settings.PLAYER_VEL:
+            return (pygame.K_d,)
+        if target < x - settings.PLAYER_VEL:
+            return (pygame.K_a,)
+        return ()
+
+    def _walk(self, events, target):
+        """Walk towards x target, hopping any block in the way (spans can be partly covered)."""
+        rect = self.game.player.rect
+        keys = self._toward(rect.x, target)
+        reach = settings.BLOCK_SIZE // 2
+        ahead = rect.right if keys == (pygame.K_d,) else rect.left - reach
+        if keys and self._solid(pygame.Rect(ahead, rect.top, reach, rect.height - FOOT_SLACK)):
+            events.append(key_down(pygame.K_SPACE))
+        return InputFrame(events, KeyState(keys))
+
+    def _take_off(self, events, start, to, kind):
+        rect = self.game.player.rect
+        w = rect.width
+        if kind == WALK or kind == DROP:
+            # head for the target; a drop walks off the edge of start on the way
+            target = min(max(to.centerx - w // 2, to.left), to.right - w)
+            if kind == DROP and start.left <= target and target + w <= start.right:
+                # straight below: step off the nearer edge first
+                target = start.left - w if target - start.left < start.right - target - w else start.right
+            return self._walk(events, target)
+        right = to.centerx >= start.centerx
+        if to.y < start.y and to.left < start.right and to.right > start.left:
+            # the target hangs over start: leave from beside it, not from under it
+            takeoff = to.left - w - TAKEOFF_MARGIN if right else to.right + TAKEOFF_MARGIN
+        else:
+            takeoff = start.right - w if right else start.left
+        if kind == LEAP:
+            takeoff = start.right - w // 2  # every px of run-up counts
+        takeoff = min(max(takeoff, start.left - w // 2), start.right - w // 2)
+        if abs(rect.x - takeoff) <= settings.PLAYER_VEL:
+            events.append(key_down(pygame.K_SPACE))
+            return InputFrame(events, KeyState((pygame.K_d,) if right else (pygame.K_a,)))
+        return self._walk(events, takeoff)
+
+    def _in_air(self, events, start, to, kind):
+        player = self.game.player
+        rect = player.rect
+        below_top = rect.bottom > to.y
+        under = rect.right + TAKEOFF_MARGIN > to.left and rect.left - TAKEOFF_MARGIN < to.right
+        if below_top and under:
+            # still below the target's top: keep clear of its edge until risen past it
+            side = to.left - rect.width - TAKEOFF_MARGIN if rect.centerx < to.centerx else to.right + TAKEOFF_MARGIN
+            keys = self._toward(rect.x, side)
+        else:
+            target = min(max(rect.x, to.left), to.right - rect.width)
+            keys = self._toward(rect.x, target)
+        if below_top and player.y_vel >= 0 and kind != DROP:
+            # past the top of the jump and short of the target: double jump, then dash across
+            if player.jump_count < 2:
+                events.append(key_down(pygame.K_SPACE))
+            elif not under and keys:
+                events.append(key_down(pygame.K_q))
+        return InputFrame(events, KeyState(keys))
+
+
+def slope(xs, ys):
+    """Least-squares slope of ys over xs (0.0 with fewer than two points)."""
+    n = len(xs)
+    if n < 2:
+        return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else 0.0
+
+
+class SoakRun:
+    def __init__(self, sample_every=SAMPLE_EVERY, recorder=None, verbose=True):
+        self.sample_every = sample_every
+        self.recorder = recorder
+        self.verbose = verbose
+        self.samples = []
+        self.autopilot = None
+        self._window_start = None
+        self._window_ticks = 0  # ticks timed since _window_start
+        self._start = time.perf_counter()
+
+    def on_tick(self, game, tick):
+        # on_tick runs after each step, so the first call only starts the clock:
+        # a window covers the ticks stepped between two calls
+        now = time.perf_counter()
+        if self._window_start is None:
+            self._window_start = now
+            return
+        self._window_ticks += 1
+        if (tick + 1) % self.sample_every == 0:
+            self.sample(game, tick + 1, (now - self._window_start) / self._window_ticks)
+            self._window_start = time.perf_counter()
+            self._window_ticks = 0
+
+    def sample(self, game, ticks, tick_seconds):
+        rss = read_rss()
+        row = {
+            "t": round(time.perf_counter() - self._start, 2),
+            "game_hours": round(ticks / settings.FPS / 3600, 4),
+            "tick_ms": round(tick_seconds * 1000, 4),
+            "rss_mb": None if rss is None else round(rss / 1048576, 2),
+            "objects": len(game.objects),
+            "monsters": len(game.monsters),
+            "tile_sections": len(game.world.generator.sections),
+            "active_sections": len(game.world.active),
+            "asset_mb": round(assets.used / 1048576, 2),
+            "asset_entries": len(assets.entries),
+            "deaths": self.autopilot.deaths,
+            "warps": self.autopilot.warps,
+            "x": game.player.rect.x,
+            "sections_travelled": round(self.autopilot.distance / game.world.generator.section_pixels, 2),
+        }
+        self.samples.append(row)
+        if self.recorder:
+            self.recorder.record(row)
+        if self.verbose:
+            print(" ".join(f"{k} {v}" for k, v in row.items()), flush=True)
+
+    def slopes(self, over="game_hours"):
+        """{metric: growth per game hour (or per unit of the column over)} over the samples after the warm-up."""
+        rows = self.samples[int(len(self.samples) * WARMUP):]
+        result = {}
+        for key in METRICS:
+            points = [(r[over], r[key]) for r in rows if r.get(key) is not None]
+            if points:
+                result[key] = slope(*zip(*points))
+        early = [r["tick_ms"] for r in rows[:max(1, len(rows) // 4)]]
+        if "tick_ms" in result and early:
+            result["tick_pct"] = result["tick_ms"] / (sum(early) / len(early)) * 100
+        return result
+
+    def distance_slopes(self):
+        """{metric: growth per section width travelled}, which does not depend on how fast the autopilot gets on."""
+        return self.slopes("sections_travelled")
+
+
+def check(slopes, limits, unit="h"):
+    """Failure messages for metrics whose slope is over its limit."""
+    return [f"{key} grows {slopes[key]:+.2f}/{unit} (limit {limit:+.2f}/{unit})"
+            for key, limit in limits.items() if key in slopes and slopes[key] > limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the simulation with an autopilot")
+    parser.add_argument("--hours", type=float, default=1.0, help="game hours to play (default 1)")
+    parser.add_argument("--sample-every", type=int, default=SAMPLE_EVERY, help="ticks between samples")
+    parser.add_argument("--metrics", metavar="PATH", help="also write the samples to PATH (.jsonl or .csv)")
+    parser.add_argument("--snapshots", action="store_true", help="build a render snapshot every tick")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    for key, limit in LIMITS.items():
+        parser.add_argument(f"--max-{key.replace('_', '-')}-slope", type=float, default=limit,
+                            dest=f"max_{key}", help=f"allowed {key} growth per game hour (default {limit})")
+    for key, limit in DISTANCE_LIMITS.items():
+        parser.add_argument(f"--max-{key.replace('_', '-')}-per-section", type=float, default=limit,
+                            dest=f"max_{key}_per_section",
+                            help=f"allowed {key} growth per section travelled (default {limit})")
+    args = parser.parse_args(argv)
+
+    rng.seed(args.seed)
+    recorder = MetricsRecorder(args.metrics) if args.metrics else None
+    run = SoakRun(args.sample_every, recorder, verbose=not args.quiet)
+    ticks = int(args.hours * 3600 * settings.FPS)
+
+    init_headless()
+    game = Game()
+    run.autopilot = Autopilot(game)
+    result = run_headless(ticks, source=run.autopilot, renderer=NullRenderer() if args.snapshots else None,
+                          respawn=False, game=game, on_tick=run.on_tick)
+    if recorder:
+        recorder.close()
+
+    print(result.format())
+    slopes = run.slopes()
+    per_section = run.distance_slopes()
+    per_section.pop("tick_pct", None)
+    print(f"travelled {run.autopilot.distance / game.world.generator.section_pixels:.1f} sections "
+          f"({run.autopilot.deaths} deaths, {run.autopilot.warps} warps)")
+    print("growth per game hour: " + ", ".join(f"{k} {v:+.2f}" for k, v in slopes.items()))
+    print("growth per section travelled: " + ", ".join(f"{k} {v:+.3f}" for k, v in per_section.items()))
+    failures = check(slopes, {key: getattr(args, f"max_{key}") for key in LIMITS})
+    failures += check(per_section, {key: getattr(args, f"max_{key}_per_section") for key in DISTANCE_LIMITS},
+                      "section")
+    if args.hours < MIN_HOURS or len(run.samples) < 3:
+        print(f"not judged: needs at least {MIN_HOURS} game hours and 3 samples")
+        return 0
+    if failures:
+        print("FAIL:")
+        for line in failures:
+            print("  " + line)
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
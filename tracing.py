@@ -0,0 +1,116 @@
+"""
+Opt-in timeline tracing in Chrome trace-event format.
+
+Spans recorded here (frame phases, section builds, asset loads, render
+thread work) are saved as JSON that chrome://tracing or ui.perfetto.dev
+open directly. Each thread gets its own track and spans nest by time.
+
+Enable with MAIN.py --trace PATH or the GAME_TRACE environment variable.
+While tracing is off, span() hands back a shared no-op context manager and
+nothing is recorded. Only the newest MAX_EVENTS events are kept, so a long
+session holds the last few minutes rather than growing without bound.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENV_VAR = "GAME_TRACE"
+MAX_EVENTS = 200_000  # about three minutes of a traced session at 60 FPS
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args")
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.tracer.begin(self.name, self.cat, self.args)
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.end(self.name, self.cat)
+        return False
+
+
+class Tracer:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.enabled = False
+        self.path = None
+        self.events = deque(maxlen=max_events)
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self._threads = []  # thread name metadata, kept apart so it is never evicted
+        self._named = set()
+
+    def start(self, path):
+        self.path = path
+        self.enabled = True
+
+    def _tid(self):
+        tid = threading.get_native_id()
+        if tid not in self._named:
+            self._named.add(tid)
+            self._threads.append({"ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid,
+                                  "args": {"name": threading.current_thread().name}})
+        return tid
+
+    def _us(self, t):
+        return (t - self.origin) * 1e6
+
+    def begin(self, name, cat="game", args=None):
+        event = {"ph": "B", "name": name, "cat": cat, "pid": self.pid, "tid": self._tid(),
+                 "ts": self._us(time.perf_counter())}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def end(self, name, cat="game"):
+        self.events.append({"ph": "E", "name": name, "cat": cat, "pid": self.pid, "tid": self._tid(),
+                            "ts": self._us(time.perf_counter())})
+
+    def complete(self, name, start, end, cat="game", args=None):
+        """Record a finished span from perf_counter() start/end times."""
+        event = {"ph": "X", "name": name, "cat": cat, "pid": self.pid, "tid": self._tid(),
+                 "ts": self._us(start), "dur": (end - start) * 1e6}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    def span(self, name, cat="game", args=None):
+        """Context manager recording name as a begin/end pair; a no-op while tracing is off."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def save(self, path=None):
+        path = path or self.path
+        # deque.copy() runs without releasing the GIL, so other threads cannot append mid-copy
+        events = self._threads + list(self.events.copy())
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+tracer = Tracer()
+
+if os.environ.get(ENV_VAR):
+    tracer.start(os.environ[ENV_VAR])
@@ -0,0 +1,358 @@
+"""
+Reset/step environments over the game simulation, for automated play
+testing and agent training.
+
+GameEnv wraps one Game. An action is a bit mask of ACTIONS (held keys,
+button presses). An observation is OBS_SIZE floats:
+- the player's velocity, jump and ability state and bars
+- a GRID_W x GRID_H occupancy grid of blocks around the player
+- the NEAREST_MONSTERS closest monsters' offsets
+The reward is the change in UI.points plus PROGRESS_REWARD per block of new
+distance to the right, and DEATH_PENALTY when the player dies, which also
+ends the episode. GameEnv.render() draws the frame for pixel observations.
+
+VecEnv steps N GameEnvs spread over a pool of worker processes. Actions,
+observations, rewards and done flags live in one shared memory block, so
+a step only sends a one-word command down each worker's pipe. Finished
+episodes are reset by the worker. With NumPy the buffers are arrays;
+without it they are flat memoryviews.
+
+    python vecenv.py --envs 8 --workers 1 2 4     # throughput scaling
+"""
+import argparse
+import multiprocessing as mp
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+import pygame
+
+import rng
+import settings
+from controls import InputFrame, KeyState, key_down
+from framedump import pixel_view
+from game import Game
+from gui import get_background
+from renderer import draw_snapshot
+
+try:
+    import numpy as np
+except ImportError:  # buffers fall back to memoryviews
+    np = None
+
+LEFT, RIGHT, JUMP, DASH, STOMP, GRAB = (1 << i for i in range(6))
+ACTIONS = ("left", "right", "jump", "dash", "stomp", "grab")
+
+GRID_W, GRID_H = 9, 7  # blocks around the player in the occupancy grid
+NEAREST_MONSTERS = 4
+PLAYER_FEATURES = 11
+OBS_SIZE = PLAYER_FEATURES + GRID_W * GRID_H + NEAREST_MONSTERS * 3
+
+PROGRESS_REWARD = 0.1
+DEATH_PENALTY = -1.0
+MAX_EPISODE_STEPS = 60 * 60 * 5
+
+
+class GameEnv:
+    """
+    One game instance with a reset()/step(action) interface; needs init_headless() first.
+    With a seed the env keeps its own rng streams, swapped in around every
+    reset and step, so its trajectory does not depend on which other envs
+    share the process or how their steps interleave with its own.
+    """
+    def __init__(self, frame_skip=1, max_steps=MAX_EPISODE_STEPS, seed=None):
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        if seed is not None:
+            rng.seed(seed)
+        self.game = Game(own_world=True)
+        self._rng = rng.state() if seed is not None else None
+        self.steps = 0
+        self._best_x = 0
+        self._world = self._frame = None
+        self._bg_image = None
+
+    def _enter(self):
+        if self._rng is not None:
+            rng.set_state(self._rng)
+
+    def _leave(self):
+        if self._rng is not None:
+            self._rng = rng.state()
+
+    def reset(self):
+        self._enter()
+        self.game.reset()
+        self._leave()
+        self.steps = 0
+        self._best_x = self.game.player.rect.x
+        return self.observe()
+
+    def step(self, action):
+        """Apply action for frame_skip ticks; returns (observation, reward, done)."""
+        self._enter()
+        try:
+            return self._step(action)
+        finally:
+            self._leave()
+
+    def _step(self, action):
+        game = self.game
+        held = []
+        if action & LEFT:
+            held.append(pygame.K_a)
+        if action & RIGHT:
+            held.append(pygame.K_d)
+        if action & JUMP:
+            held.append(pygame.K_SPACE)  # also climbs while holding a ledge
+        keys = KeyState(held)
+        buttons = (False, False, bool(action & GRAB))
+        events = [key_down(key) for bit, key in ((JUMP, pygame.K_SPACE), (DASH, pygame.K_q),
+                                                  (STOMP, pygame.K_e)) if action & bit]
+        points = game.ui.points
+        dt = 1.0 / settings.FPS
+        for i in range(self.frame_skip):
+            frame = InputFrame(events if i == 0 else [], keys, buttons)
+            for event in frame.events:
+                game.handle_event(event)
+            game.step(frame, dt)
+            if game.is_dead:
+                break
+        self.steps += 1
+
+        reward = game.ui.points - points
+        x = game.player.rect.x
+        if x > self._best_x:
+            reward += (x - self._best_x) / settings.BLOCK_SIZE * PROGRESS_REWARD
+            self._best_x = x
+        done = game.is_dead or self.steps >= self.max_steps
+        if game.is_dead:
+            reward += DEATH_PENALTY
+        return self.observe(), reward, done
+
+    def render(self, size=None):
+        """
+        Draw the current world frame (scaled to size if given) and return a
+        pixel_view of it: (height, width, 3) RGB, for pixel observations.
+        The surface is reused once the previous view has been dropped; a view
+        still held keeps its frame, and the next render draws a new surface.
+        """
+        if self._bg_image is None:
+            _, self._bg_image = get_background("Blue.png")
+        render_size = (settings.RENDER_WIDTH, settings.RENDER_HEIGHT)
+        size = size or render_size
+        if self._frame is None or self._frame.get_locked() or self._frame.get_size() != size:
+            self._world = pygame.Surface(render_size).convert()
+            self._frame = self._world if size == render_size else pygame.Surface(size).convert()
+        draw_snapshot(self._world, self.game.snapshot(self._bg_image))
+        if self._frame is not self._world:
+            pygame.transform.smoothscale(self._world, size, self._frame)
+        return pixel_view(self._frame)
+
+    def observe(self, out=None, offset=0):
+        """Write the observation into out[offset:offset + OBS_SIZE] (a new list when out is None)."""
+        game = self.game
+        player, ui = game.player, game.ui
+        bs = settings.BLOCK_SIZE
+        if out is None:
+            out = [0.0] * OBS_SIZE
+        o = offset
+        out[o:o + PLAYER_FEATURES] = [
+            player.x_vel / 10, player.y_vel / 10, player.jump_count / 2,
+            float(player.dashing), float(player.stomping), float(bool(player.holding)),
+            ui.health / ui.max_health, ui.stamina / ui.max_stamina, ui.mana / ui.max_mana,
+            float(player.dash_cooldown_timer >= player.DASH_COOLDOWN),
+            float(player.stomp_cooldown_timer >= player.STOMP_COOLDOWN),
+        ]
+        o += PLAYER_FEATURES
+
+        # occupancy grid centred on the player, one cell per block
+        grid = [0.0] * (GRID_W * GRID_H)
+        left = player.rect.centerx - GRID_W * bs // 2
+        top = player.rect.centery - GRID_H * bs // 2
+        for obj in game.objects:
+            col = (obj.rect.centerx - left) // bs
+            row = (obj.rect.centery - top) // bs
+            if 0 <= col < GRID_W and 0 <= row < GRID_H:
+                grid[row * GRID_W + col] = 1.0
+        out[o:o + len(grid)] = grid
+        o += len(grid)
+
+        # nearest monsters: dx, dy in blocks, 1.0 when the slot is filled
+        px, py = player.rect.center
+        nearest = sorted(game.monsters, key=lambda m: abs(m.rect.centerx - px) + abs(m.rect.centery - py))
+        monsters = []
+        for m in nearest[:NEAREST_MONSTERS]:
+            monsters.extend(((m.rect.centerx - px) / bs, (m.rect.centery - py) / bs, 1.0))
+        monsters.extend([0.0] * (NEAREST_MONSTERS * 3 - len(monsters)))
+        out[o:o + len(monsters)] = monsters
+        return out
+
+
+class _Layout:
+    """Offsets of the shared buffers in one block: obs (f32), rewards (f32), dones (u8), actions (i32)."""
+    def __init__(self, num_envs):
+        self.num_envs = num_envs
+        self.obs = 0
+        self.rewards = self.obs + num_envs * OBS_SIZE * 4
+        self.actions = self.rewards + num_envs * 4
+        self.dones = self.actions + num_envs * 4
+        self.size = self.dones + num_envs
+
+    def views(self, buf):
+        """(obs, rewards, actions, dones) over buf; arrays with NumPy, flat memoryviews without."""
+        n = self.num_envs
+        if np is not None:
+            return (np.ndarray((n, OBS_SIZE), np.float32, buf, self.obs),
+                    np.ndarray(n, np.float32, buf, self.rewards),
+                    np.ndarray(n, np.int32, buf, self.actions),
+                    np.ndarray(n, np.uint8, buf, self.dones))
+        mv = memoryview(buf)
+        return (mv[self.obs:self.rewards].cast("f"), mv[self.rewards:self.actions].cast("f"),
+                mv[self.actions:self.dones].cast("i"), mv[self.dones:self.size].cast("B"))
+
+
+def _worker(conn, shm_name, num_envs, start, stop, seed, frame_skip, max_steps):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from headless import init_headless
+    init_headless()
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    layout = _Layout(num_envs)
+    buf = shm.buf
+    # seeded by env index, not worker, so trajectories don't depend on the worker count
+    envs = [GameEnv(frame_skip, max_steps, seed + i) for i in range(start, stop)]
+    obs_row = struct.Struct(f"<{OBS_SIZE}f")
+    scratch = [0.0] * OBS_SIZE
+
+    def write_obs(i, env):
+        env.observe(scratch)
+        obs_row.pack_into(buf, layout.obs + i * OBS_SIZE * 4, *scratch)
+
+    try:
+        while True:
+            command = conn.recv()
+            if command == "reset":
+                for i, env in enumerate(envs, start):
+                    env.reset()
+                    write_obs(i, env)
+                    struct.pack_into("<f", buf, layout.rewards + i * 4, 0.0)
+                    buf[layout.dones + i] = 0
+            elif command == "step":
+                for i, env in enumerate(envs, start):
+                    (action,) = struct.unpack_from("<i", buf, layout.actions + i * 4)
+                    _, reward, done = env.step(action)
+                    if done:
+                        env.reset()  # the returned observation starts the next episode
+                    write_obs(i, env)
+                    struct.pack_into("<f", buf, layout.rewards + i * 4, reward)
+                    buf[layout.dones + i] = int(done)
+            elif command == "close":
+                break
+            conn.send(True)
+    finally:
+        del buf
+        shm.close()
+        conn.close()
+
+
+class VecEnv:
+    """
+    num_envs GameEnvs split over `workers` processes (default: one per CPU).
+    Env i is seeded with seed + i wherever it runs, so results are the same
+    for any number of workers.
+    reset() and step(actions) return views of the shared buffers, which are
+    overwritten by the next call; copy them to keep them.
+    """
+    def __init__(self, num_envs, workers=None, seed=0, frame_skip=1, max_steps=MAX_EPISODE_STEPS):
+        workers = max(1, min(num_envs, workers or os.cpu_count() or 1))
+        self.num_envs = num_envs
+        self.workers = workers
+        self._layout = _Layout(num_envs)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._layout.size)
+        self.observations, self.rewards, self.actions, self.dones = self._layout.views(self._shm.buf)
+        ctx = mp.get_context("spawn")  # fresh interpreters: no inherited pygame state
+        self._conns = []
+        self._procs = []
+        bounds = [num_envs * w // workers for w in range(workers + 1)]
+        for w in range(workers):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_worker, name=f"vecenv-{w}", daemon=True,
+                               args=(child, self._shm.name, num_envs, bounds[w], bounds[w + 1],
+                                     seed, frame_skip, max_steps))
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    def _broadcast(self, command):
+        for conn in self._conns:
+            conn.send(command)
+        for conn in self._conns:
+            conn.recv()
+
+    def reset(self):
+        self._broadcast("reset")
+        return self.observations
+
+    def step(self, actions):
+        """Step every env with actions[i]; returns (observations, rewards, dones)."""
+        if np is not None:
+            self.actions[:] = actions
+        else:
+            for i, action in enumerate(actions):
+                self.actions[i] = action
+        self._broadcast("step")
+        return self.observations, self.rewards, self.dones
+
+    def close(self):
+        for conn in self._conns:
+            conn.send("close")
+        for proc in self._procs:
+            proc.join()
+        views = (self.observations, self.rewards, self.actions, self.dones)
+        self.observations = self.rewards = self.actions = self.dones = None
+        if np is None:
+            for view in views:
+                view.release()  # the block cannot be closed while memoryviews of it exist
+        self._shm.close()
+        self._shm.unlink()
+
+
+def measure(num_envs, workers, steps, seed=0):
+    """Steps per second for num_envs envs on workers processes, holding right and jumping now and then."""
+    env = VecEnv(num_envs, workers, seed)
+    try:
+        env.reset()
+        t = time.perf_counter()
+        for s in range(steps):
+            action = RIGHT | (JUMP if s % 30 == 0 else 0)
+            env.step([action] * num_envs)
+        elapsed = time.perf_counter() - t
+    finally:
+        env.close()
+    return num_envs * steps / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure VecEnv throughput across worker counts")
+    parser.add_argument("--envs", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--steps", type=int, default=1000, help="vector steps per measurement")
+    args = parser.parse_args(argv)
+
+    cpus = os.cpu_count() or 1
+    print(f"{args.envs} envs, {args.steps} steps, {cpus} CPUs")
+    base = None
+    for workers in args.workers:
+        rate = measure(args.envs, workers, args.steps)
+        cores = min(workers, args.envs, cpus)
+        base = base or rate
+        print(f"{workers:>3} workers: {rate:10,.0f} env steps/s  {rate / cores:10,.0f} per core  "
+              f"(x{rate / base:.2f} vs first)", flush=True)
+
+
+if __name__ == "__main__":
+    main()
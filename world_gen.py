@@ -1,171 +1,327 @@
+import mmap
 import random
-from player import Block
+import struct
+import sys
+import time
+from array import array
+
+from tracing import tracer
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up batch generation
+    np = None
+
+
+def materialise(tiles, block_size, section_index=None):
+    """Build Block sprites from a flat (x, y, x, y, ...) tile array.
+
+    player (and with it pygame) is only imported here, so generating tile
+    data works headless, in worker processes and in benchmarks.
+    """
+    from player import Block
+    blocks = []
+    for i in range(0, len(tiles), 2):
+        block = Block(tiles[i], tiles[i + 1], block_size)
+        block.section = section_index
+        blocks.append(block)
+    return blocks
+
+
+# Each pattern is compiled once per block size into a template of
+# (x_offset, y_offset, length) runs relative to the section start and ground.
+# Patterns with random parts keep their draws in the original order so a
+# section's layout only depends on its seed.
+
+def _compile_fixed(bs):
+    spiral = tuple(((i % 5) * bs * 3, -(i // 2) * bs * 2, 4) for i in range(10))
+    # Fork in the road - lower and upper path
+    choice_path = tuple(((i + 2) * bs * 2, -bs * 2, 4) for i in range(5)) + \
+        tuple(((i + 2) * bs * 2, -bs * 7, 4) for i in range(5))
+    # Paths split then merge back
+    split_merge = tuple((i * bs * 2, -bs * 3, 3) for i in range(4))
+    for i in range(4, 8):
+        split_merge += ((i * bs * 2, -bs * 6, 3), (i * bs * 2, -bs * 1, 3))
+    split_merge += tuple((i * bs * 2, -bs * 3, 3) for i in range(8, 12))
+    return {
+        'multi_route': tuple(-(route + 2) * bs * 2 for route in range(3)),
+        'high_low': tuple((i * bs * 2.5, -bs * (2 if i % 2 == 0 else 6)) for i in range(8)),
+        'spiral': spiral,
+        'choice_path': choice_path,
+        'vertical_maze': tuple(i * bs * 3 for i in range(6)),
+        'wave': tuple((i * bs * 1.5, 1 if (i // 3) % 2 == 0 else -1) for i in range(12)),
+        'split_merge': split_merge,
+        'layered': (-bs * 2, -bs * 5, -bs * 8),
+    }
+
+
+def _multi_route(rng, bs, route_ys):
+    # Three parallel routes at different heights
+    for route_y in route_ys:
+        for i in range(rng.randint(3, 5)):
+            yield i * bs * 4, route_y, rng.randint(4, 8)
+
+
+def _high_low(rng, bs, template):
+    # Alternating high and low platforms
+    for dx, dy in template:
+        yield dx, dy, rng.randint(4, 6)
+
+
+def _fixed(rng, bs, template):
+    return template
+
+
+def _vertical_maze(rng, bs, template):
+    # Platforms requiring precise jumping, sometimes with a second one above
+    for dx in template:
+        dy = -rng.randint(2, 8) * bs
+        yield dx, dy, 3
+        if rng.random() > 0.5:
+            yield dx, dy - bs * 2, 3
+
+
+def _wave(rng, bs, template):
+    # Smooth wave pattern going up and down
+    for dx, sign in template:
+        height_offset = int(3 * (1 + rng.random() * 0.5) * sign)
+        yield dx, -bs * (4 + height_offset), 3
+
+
+def _layered(rng, bs, layer_ys):
+    # Multiple layers with connections
+    for layer_y in layer_ys:
+        for i in range(rng.randint(3, 5)):
+            yield i * bs * 3, layer_y, rng.randint(4, 6)
+
+
+PATTERN_NAMES = ['multi_route', 'high_low', 'spiral', 'choice_path',
+                 'vertical_maze', 'wave', 'split_merge', 'layered']
+PATTERNS = {
+    'multi_route': _multi_route,
+    'high_low': _high_low,
+    'spiral': _fixed,
+    'choice_path': _fixed,
+    'vertical_maze': _vertical_maze,
+    'wave': _wave,
+    'split_merge': _fixed,
+    'layered': _layered,
+}
+
+
+def section_seed(seed, section_index):
+    """
+    Derive the RNG seed for one section.
+    Unlike hash(), this is the same in every process and Python build, so
+    sections generated in a worker pool or read from a world file match
+    live generation.
+    """
+    return ((seed & 0xFFFFFFFF) << 32) | (section_index & 0xFFFFFFFF)
+
+
+# World file layout (little-endian):
+#   header  magic, version, seed, block_size, section_width, ground_y, first_section, count
+#   index   count + 1 uint32 offsets into the tile data, in ints
+#   tiles   int32 (x, y) pairs for every section back to back
+WORLD_MAGIC = b"WGEN"
+WORLD_VERSION = 1
+WORLD_HEADER = struct.Struct("<4sIiiiiiI")
+
+
+def write_world_file(path, generator, ground_y, first_section, tiles, offsets):
+    """Write tiles/offsets from generate_sections() as a world file."""
+    count = len(offsets) - 1
+    header = WORLD_HEADER.pack(WORLD_MAGIC, WORLD_VERSION, generator.seed, generator.block_size,
+                               generator.section_width, ground_y, first_section, count)
+    index = array('I', (int(o) for o in offsets))
+    data = array('i', tiles) if np is None else np.asarray(tiles, dtype='<i4')
+    if sys.byteorder != "little":
+        index.byteswap()
+        if np is None:
+            data.byteswap()
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(index.tobytes())
+        f.write(data.tobytes())
+
+
+class WorldFile:
+    """
+    Read-only view of a pre-generated world file.
+    The file is memory-mapped and section tiles are returned as memoryview
+    slices, so nothing is parsed or copied until a section is materialised.
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.seed, self.block_size, self.section_width,
+         self.ground_y, self.first_section, self.count) = WORLD_HEADER.unpack_from(self._map)
+        if magic != WORLD_MAGIC or version != WORLD_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {WORLD_VERSION} world file")
+        if sys.byteorder != "little":
+            self.close()
+            raise ValueError("world files can only be mapped on little-endian machines")
+        index_start = WORLD_HEADER.size
+        data_start = index_start + (self.count + 1) * 4
+        view = memoryview(self._map)
+        self._index = view[index_start:data_start].cast('I')
+        self._tiles = view[data_start:].cast('i')
+
+    def section_tiles(self, section_index):
+        """Return the tiles for a section, or None if it is outside the file."""
+        k = section_index - self.first_section
+        if not 0 <= k < self.count:
+            return None
+        return self._tiles[self._index[k]:self._index[k + 1]]
+
+    def close(self):
+        for view in ("_index", "_tiles"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
 
 class WorldGenerator:
-    def __init__(self, block_size):
+    def __init__(self, block_size, seed=42):
         self.block_size = block_size
-        self.seed = 42
-        random.seed(self.seed)
+        self.seed = seed
         
         # my-style level parameters
         self.ground_height = 3  # blocks high for ground
         self.section_width = 20  # Wider sections for more variety
         self.generated_sections = set()
-        
-    def generate_section(self, section_index, ground_y):
-        """Generate one section of my-style level."""
-        if section_index in self.generated_sections:
-            return []
-        
-        self.generated_sections.add(section_index)
-        blocks = []
-        
+        # section_index -> array('i') of flattened (x, y) tile coordinates
+        self.sections = {}
+        self.modified_sections = set()
+        self.sections_ground_y = None
+        self.templates = _compile_fixed(block_size)
+        self.world_file = None
+
+    def open_world_file(self, path):
+        """Serve sections from a pre-generated world file; returns False if it does not fit."""
+        world_file = WorldFile(path)
+        if (world_file.seed, world_file.block_size, world_file.section_width) != \
+                (self.seed, self.block_size, self.section_width):
+            world_file.close()
+            return False
+        self.world_file = world_file
+        return True
+
+    @property
+    def section_pixels(self):
+        return self.section_width * self.block_size
+
+    def section_at(self, x):
+        """Return the index of the section containing world x."""
+        return int(x // self.section_pixels)
+
+    def section_tiles(self, section_index, ground_y):
+        """Return the tile array for a section, generating it on first use."""
+        if ground_y != self.sections_ground_y:
+            # tile data is absolute, so a different ground line invalidates it
+            self.sections.clear()
+            self.modified_sections.clear()
+            self.sections_ground_y = ground_y
+        tiles = self.sections.get(section_index)
+        if tiles is None:
+            if self.world_file is not None and self.world_file.ground_y == ground_y:
+                tiles = self.world_file.section_tiles(section_index)
+            if tiles is None:
+                # beyond the world file's range (or no file): generate live
+                tiles = self.build_section_tiles(section_index, ground_y)
+            self.sections[section_index] = tiles
+        return tiles
+
+    def section_runs(self, section_index):
+        """Return the section's platform runs as (x, dy, length), dy relative to ground_y."""
+        bs = self.block_size
         # Deterministic random for this section
-        section_random = random.Random(hash((section_index, self.seed)))
-        start_x = section_index * self.section_width * self.block_size
+        section_random = random.Random(section_seed(self.seed, section_index))
+        start_x = section_index * self.section_width * bs
         
         # NO ground blocks - only platforms!
         
         # Generate varied platform patterns with multiple routes
-        pattern = section_random.choice(['multi_route', 'high_low', 'spiral', 'choice_path', 
-                                        'vertical_maze', 'wave', 'split_merge', 'layered'])
-        
-        if pattern == 'multi_route':
-            # Three parallel routes at different heights
-            for route in range(3):
-                route_y = ground_y - (route + 2) * self.block_size * 2
-                num_platforms = section_random.randint(3, 5)
-                for i in range(num_platforms):
-                    x = start_x + i * self.block_size * 4
-                    length = section_random.randint(4, 8)  # Increased platform length
-                    for j in range(length):
-                        blocks.append(Block(x + j * self.block_size, route_y, self.block_size))
-                        
-        elif pattern == 'high_low':
-            # Alternating high and low platforms
-            for i in range(8):
-                x = start_x + i * self.block_size * 2.5
-                if i % 2 == 0:
-                    y = ground_y - self.block_size * 2
-                else:
-                    y = ground_y - self.block_size * 6
-                length = section_random.randint(4, 6)  # Increased platform length
-                for j in range(length):
-                    blocks.append(Block(int(x) + j * self.block_size, int(y), self.block_size))
-                    
-        elif pattern == 'spiral':
-            # Spiral upward pattern
-            for i in range(10):
-                x = start_x + (i % 5) * self.block_size * 3
-                y = ground_y - (i // 2) * self.block_size * 2
-                for j in range(4):  # Increased from 2 to 4
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-                    
-        elif pattern == 'choice_path':
-            # Fork in the road - player chooses high or low path
-            # Lower path
-            for i in range(5):
-                x = start_x + (i + 2) * self.block_size * 2
-                y = ground_y - self.block_size * 2
-                # Increased platform width from 2 to 4 blocks
-                for j in range(4):
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-            
-            # Upper path
-            for i in range(5):
-                x = start_x + (i + 2) * self.block_size * 2
-                y = ground_y - self.block_size * 7
-                # Increased platform width from 2 to 4 blocks
-                for j in range(4):
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-                
-        elif pattern == 'vertical_maze':
-            # Vertical platforms requiring precise jumping
-            for i in range(6):
-                x = start_x + i * self.block_size * 3
-                y = ground_y - section_random.randint(2, 8) * self.block_size
-                # Make platforms wider (3 blocks instead of 1)
-                for j in range(3):
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-                # Add a second platform nearby for variety
-                if section_random.random() > 0.5:
-                    for j in range(3):
-                        blocks.append(Block(x + j * self.block_size, y - self.block_size * 2, self.block_size))
-                    
-        elif pattern == 'wave':
-            # Smooth wave pattern going up and down
-            for i in range(12):
-                x = start_x + i * self.block_size * 1.5
-                # Sine wave for height
-                height_offset = int(3 * (1 + section_random.random() * 0.5) * 
-                                  (1 if (i // 3) % 2 == 0 else -1))
-                y = ground_y - self.block_size * (4 + height_offset)
-                # Make platforms wider (3 blocks instead of 1)
-                for j in range(3):
-                    blocks.append(Block(int(x) + j * self.block_size, y, self.block_size))
-                
-        elif pattern == 'split_merge':
-            # Paths split then merge back
-            # Main path
-            for i in range(4):
-                x = start_x + i * self.block_size * 2
-                y = ground_y - self.block_size * 3
-                # Make platforms wider (3 blocks instead of 1)
-                for j in range(3):
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-            
-            # Split paths
-            for i in range(4, 8):
-                x = start_x + i * self.block_size * 2
-                # Upper branch - make wider
-                for j in range(3):
-                    blocks.append(Block(x + j * self.block_size, ground_y - self.block_size * 6, self.block_size))
-                # Lower branch - make wider
-                for j in range(3):
-                    blocks.append(Block(x + j * self.block_size, ground_y - self.block_size * 1, self.block_size))
-            
-            # Merge back
-            for i in range(8, 12):
-                x = start_x + i * self.block_size * 2
-                y = ground_y - self.block_size * 3
-                # Make platforms wider (3 blocks instead of 1)
-                for j in range(3):
-                    blocks.append(Block(x + j * self.block_size, y, self.block_size))
-                
-        elif pattern == 'layered':
-            # Multiple layers with connections
-            layers = [
-                ground_y - self.block_size * 2,
-                ground_y - self.block_size * 5,
-                ground_y - self.block_size * 8
-            ]
-            
-            for layer_y in layers:
-                # Platforms on each layer
-                num_plat = section_random.randint(3, 5)
-                for i in range(num_plat):
-                    x = start_x + i * self.block_size * 3
-                    length = section_random.randint(4, 6)  # Increased platform length
-                    for j in range(length):
-                        blocks.append(Block(x + j * self.block_size, layer_y, self.block_size))
+        pattern = section_random.choice(PATTERN_NAMES)
+        runs = []
+        for dx, dy, length in PATTERNS[pattern](section_random, bs, self.templates[pattern]):
+            runs.append((int(start_x + dx), dy, length))
         
-        # Add connecting blocks between routes for extra mobility (make them wider)
+        # Add connecting blocks between routes for extra mobility (3 blocks wide)
         for _ in range(section_random.randint(3, 6)):
-            x = start_x + section_random.randint(1, 18) * self.block_size
-            y = ground_y - section_random.randint(3, 10) * self.block_size
-            # Make connecting blocks wider (3 blocks instead of 1)
-            for j in range(3):
-                blocks.append(Block(x + j * self.block_size, y, self.block_size))
+            x = start_x + section_random.randint(1, 18) * bs
+            dy = -section_random.randint(3, 10) * bs
+            runs.append((x, dy, 3))
         
         # Add high platforms for advanced routes
         for _ in range(section_random.randint(2, 4)):
-            x = start_x + section_random.randint(2, 16) * self.block_size
-            y = ground_y - section_random.randint(9, 14) * self.block_size
-            length = section_random.randint(2, 4)
+            x = start_x + section_random.randint(2, 16) * bs
+            dy = -section_random.randint(9, 14) * bs
+            runs.append((x, dy, section_random.randint(2, 4)))
+        
+        return runs
+
+    def build_section_tiles(self, section_index, ground_y):
+        """Generate one section of my-style level as pure tile data."""
+        tiles = array('i')
+        bs = self.block_size
+        for x, dy, length in self.section_runs(section_index):
+            y = ground_y + dy
             for j in range(length):
-                blocks.append(Block(x + j * self.block_size, y, self.block_size))
+                tiles.extend((x + j * bs, y))
+        return tiles
+
+    def generate_sections(self, sections, ground_y):
+        """
+        Stamp many sections at once into one flat tile array.
+        Returns (tiles, offsets): section k occupies tiles[offsets[k]:offsets[k + 1]].
+        Uses NumPy when available; layouts match section_tiles exactly.
+        """
+        xs, dys, lengths, counts = [], [], [], []
+        for s in sections:
+            runs = self.section_runs(s)
+            for x, dy, length in runs:
+                xs.append(x)
+                dys.append(dy)
+                lengths.append(length)
+            counts.append(sum(run[2] for run in runs))
+
+        if np is None:
+            tiles = array('i')
+            offsets = array('i', [0])
+            run = 0
+            for count in counts:
+                stamped = 0
+                while stamped < count:
+                    for j in range(lengths[run]):
+                        tiles.extend((xs[run] + j * self.block_size, ground_y + dys[run]))
+                    stamped += lengths[run]
+                    run += 1
+                offsets.append(len(tiles))
+            return tiles, offsets
+
+        lengths = np.asarray(lengths, dtype=np.int32)
+        run_of_tile = np.repeat(np.arange(len(lengths)), lengths)
+        run_starts = np.cumsum(lengths) - lengths
+        j = np.arange(int(lengths.sum()), dtype=np.int32) - np.repeat(run_starts, lengths)
+        tiles = np.empty(2 * len(j), dtype=np.int32)
+        tiles[0::2] = np.asarray(xs, dtype=np.int32)[run_of_tile] + j * self.block_size
+        tiles[1::2] = np.asarray(dys, dtype=np.int32)[run_of_tile] + ground_y
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return tiles, offsets * 2
+
+    def generate_section(self, section_index, ground_y):
+        """Generate one section of my-style level as Block sprites."""
+        if section_index in self.generated_sections:
+            return []
         
-        return blocks
+        self.generated_sections.add(section_index)
+        with tracer.span("generate_section", "worldgen", {"section": section_index}):
+            tiles = self.section_tiles(section_index, ground_y)
+            return materialise(tiles, self.block_size, section_index)
     
     def generate_region(self, min_x, max_x, ground_y):
         """Generate all sections in a horizontal range."""
@@ -180,7 +336,40 @@ class WorldGenerator:
             blocks.extend(section_blocks)
         
         return blocks
+
+    def snapshot(self):
+        """
+        Capture the current tile data. remove_tile never mutates an array in
+        place, so a shallow copy of the section table is enough.
+        """
+        return dict(self.sections)
+
+    def restore(self, sections):
+        """Undo tile edits since snapshot(); untouched sections are kept as they are."""
+        for s in self.modified_sections:
+            if s in sections:
+                self.sections[s] = sections[s]
+            else:
+                self.sections.pop(s, None)
+        self.modified_sections.clear()
+
+    def remove_tile(self, section_index, x, y):
+        """Drop one tile from a section (e.g. after a stomp) without touching other sections."""
+        tiles = self.sections.get(section_index)
+        if tiles is None:
+            return
+        kept = array('i')
+        for i in range(0, len(tiles), 2):
+            if tiles[i] != x or tiles[i + 1] != y:
+                kept.extend((tiles[i], tiles[i + 1]))
+        self.sections[section_index] = kept
+        self.modified_sections.add(section_index)
     
+    def drop_section(self, section_index):
+        """Forget a section's tile data unless it was edited; it regenerates identically."""
+        if section_index not in self.modified_sections:
+            self.sections.pop(section_index, None)
+
     def cleanup_far_sections(self, player_x, cleanup_distance):
         """Remove sections that are too far from player."""
         player_section = player_x // (self.section_width * self.block_size)
@@ -188,4 +377,125 @@ class WorldGenerator:
         
         sections_to_remove = [s for s in self.generated_sections if s < cleanup_sections]
         for s in sections_to_remove:
-            self.generated_sections.discard(s)
\ No newline at end of file
+            self.generated_sections.discard(s)
+        # Unmodified sections are cheap to regenerate, so drop their tile data too
+        for s in [s for s in self.sections if s < cleanup_sections]:
+            self.drop_section(s)
+
+
+class WorldSnapshot:
+    """Section tiles and Block sprites captured by SectionStream.snapshot()."""
+    def __init__(self, ground_y, sections, active, pending):
+        self.ground_y = ground_y
+        self.sections = sections
+        self.active = active
+        self.pending = pending
+
+
+class SectionStream:
+    """
+    Keeps Block sprites only for sections inside an active window around the player.
+    Sprites, masks and surfaces are built when a section enters the window and
+    dropped when it leaves, along with the section's tile data unless a stomp
+    edited it (the generator rebuilds untouched tiles identically).
+    """
+    def __init__(self, generator, ground_y, behind, ahead):
+        self.generator = generator
+        self.ground_y = ground_y
+        self.behind = behind
+        self.ahead = ahead
+        self.active = {}  # section_index -> list of Blocks
+        self.pending = 0  # window sections not built yet
+        self.visited = set()  # sections built at least once since the last restore
+
+    def update(self, player_x, objects, max_new=None):
+        """
+        Sync objects with the window around player_x; return the blocks of
+        sections built for the first time. A section re-entered after being
+        dropped is rebuilt but not returned, so callers that populate new
+        sections (monster spawning) do so once per section.
+        max_new limits how many sections are built in this call, nearest to the
+        player first, so the rest of the window can stream in over later frames.
+        """
+        gen = self.generator
+        first = gen.section_at(player_x - self.behind)
+        last = gen.section_at(player_x + self.ahead)
+
+        evicted = [s for s in self.active if s < first or s > last]
+        if evicted:
+            dead = set()
+            for s in evicted:
+                dead.update(id(b) for b in self.active.pop(s))
+                gen.drop_section(s)
+            objects[:] = [o for o in objects if id(o) not in dead]
+
+        missing = [s for s in range(first, last + 1) if s not in self.active]
+        if max_new is not None and len(missing) > max_new:
+            here = gen.section_at(player_x)
+            missing = sorted(missing, key=lambda s: abs(s - here))[:max_new]
+        self.pending = last + 1 - first - len(self.active) - len(missing)
+        new_blocks = []
+        for s in missing:
+            with tracer.span("build_section", "worldgen", {"section": s}):
+                blocks = materialise(gen.section_tiles(s, self.ground_y), gen.block_size, s)
+            self.active[s] = blocks
+            objects.extend(blocks)
+            if s not in self.visited:
+                self.visited.add(s)
+                new_blocks.extend(blocks)
+        return new_blocks
+
+    @property
+    def complete(self):
+        """True once every section in the current window has been built."""
+        return self.pending == 0
+
+    def snapshot(self):
+        """
+        Capture the streamed world as it is now, sections still to stream in
+        included, so restore() puts back exactly this state: a restored world
+        streams the rest of its window in just as it did the first time.
+        """
+        return WorldSnapshot(self.ground_y, self.generator.snapshot(),
+                             {s: tuple(blocks) for s, blocks in self.active.items()}, self.pending)
+
+    def restore(self, snapshot, objects):
+        """
+        Return to a snapshot, appending its blocks to objects.
+        Blocks are never changed after they are built, so the captured sprites
+        are reused as they are, including ones that were stomped since.
+        """
+        self.generator.restore(snapshot.sections)
+        self.active = {s: list(blocks) for s, blocks in snapshot.active.items()}
+        self.visited = set(self.active)
+        self.pending = snapshot.pending
+        for blocks in snapshot.active.values():
+            objects.extend(blocks)
+
+    def remove_block(self, block):
+        """Forget a streamed block so it stays gone if its section is rebuilt."""
+        s = getattr(block, "section", None)
+        if s is None:
+            return
+        blocks = self.active.get(s)
+        if blocks is not None and block in blocks:
+            blocks.remove(block)
+        self.generator.remove_tile(s, block.rect.x, block.rect.y)
+
+
+def benchmark(sections=2000, block_size=96, ground_y=416):
+    """Print generation throughput in sections per second."""
+    gen = WorldGenerator(block_size)
+    start = time.perf_counter()
+    for s in range(sections):
+        gen.build_section_tiles(s, ground_y)
+    single = sections / (time.perf_counter() - start)
+    start = time.perf_counter()
+    gen.generate_sections(range(sections), ground_y)
+    batch = sections / (time.perf_counter() - start)
+    print(f"per-section: {single:,.0f} sections/s")
+    print(f"batch ({'numpy' if np is not None else 'array'}): {batch:,.0f} sections/s")
+
+
+if __name__ == "__main__":
+    benchmark()